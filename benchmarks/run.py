@@ -0,0 +1,221 @@
+"""Throughput/memory benchmarks for the ingestion, query and strategy hot paths.
+
+    PYTHONPATH=src python benchmarks/run.py                      # compare with benchmarks/baseline.json
+    PYTHONPATH=src python benchmarks/run.py --update-baseline    # record a new baseline
+    PYTHONPATH=src python benchmarks/run.py --db                 # include TimescaleDB benchmarks (DB_* env)
+
+Every benchmark runs on deterministic synthetic CandleV1 data (pimiopilot_data.synthetic).
+Rows/sec is the best of --repeat timed runs; peak memory is measured in a separate run
+under tracemalloc (Python and numpy allocations). Exits 1 when a result is slower or
+uses more memory than the baseline by more than --threshold.
+"""
+from __future__ import annotations
+import argparse
+import gc
+import json
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from pimiopilot_data.synthetic import as_yfinance, synthetic_candles
+
+BASELINE = Path(__file__).with_name("baseline.json")
+# rows per benchmark input at --scale 1; iterrows-based paths get fewer
+_SIZES = {"small": 1.0, "medium": 5.0, "large": 25.0}
+# peak memory below this is noise, not a regression
+_MIN_PEAK_MB = 1.0
+
+@dataclass
+class Bench:
+    name: str
+    setup: Callable[[float, Path], Any]     # (scale, workdir) -> state
+    run: Callable[[Any], int]               # state -> rows processed
+    db: bool = False
+
+def _candles(scale: float, rows: int, interval: str = "1m") -> pd.DataFrame:
+    # 270 one-minute bars per session day, 261 sessions per year, 10 symbols
+    years = max(rows * scale / (10 * 270 * 261), 1 / 261)
+    return synthetic_candles(10, interval, years)
+
+def _lake(scale: float, work: Path) -> Dict[str, Any]:
+    from pimiopilot_data.io.parquet_writer import write_parquet
+    df = _candles(scale, 500_000)
+    meta = {"pimiopilot.schema_version": "CandleV1", "pimiopilot.interval": "1m"}
+    write_parquet(df, work / "lake", "data.parquet", metadata=meta)
+    return {"work": work, "symbols": sorted(df["symbol"].unique()), "rows": len(df),
+            "start": df["ts"].min().isoformat(), "end": (df["ts"].max() + pd.Timedelta(minutes=1)).isoformat()}
+
+def _query_spec(state: Dict[str, Any], fmt: str, backend: str) -> Dict[str, Any]:
+    spec = {
+        "symbols": state["symbols"],
+        "intervals": ["1m"],
+        "time_range": {"start": state["start"], "end": state["end"]},
+        "columns": ["ts", "symbol", "open", "high", "low", "close", "volume"],
+        "backend": backend,
+        "output": {"format": fmt, "path": str(state["work"] / "q"), "filename": f"{backend}-{fmt}"},
+    }
+    if backend == "parquet":
+        spec["lake_path"] = str(state["work"] / "lake")
+    return spec
+
+def _run_query(fmt: str, backend: str) -> Callable[[Any], int]:
+    def run(state):
+        from pimiopilot_data.query_runner import run_query
+        summary, _ = run_query(_query_spec(state, fmt, backend))
+        return int(summary["artifacts"]["rows"])
+    return run
+
+def _normalize(state):
+    from pimiopilot_data.runner import _normalize_candle_df
+    return len(_normalize_candle_df(state, "S0000.TW"))
+
+def _iter_rows(state):
+    from pimiopilot_data.sinks.timescaledb import _iter_rows
+    return sum(1 for _ in _iter_rows(state, "1m"))
+
+def _write_parquet(state):
+    from pimiopilot_data.io.parquet_writer import write_parquet
+    df, work = state
+    write_parquet(df, work, "bench.parquet", metadata={"pimiopilot.schema_version": "CandleV1"})
+    return len(df)
+
+def _sma(state):
+    from pimiopilot_strategies.features import FeatureCache
+    from pimiopilot_strategies.sma_crossover import SMACrossover
+    # a fresh cache per run, so this measures the computation rather than cache hits
+    strat = SMACrossover(fast=10, slow=30, signals_format="frame", feature_cache=FeatureCache())
+    strat.generate_signal(state)
+    return len(state)
+
+def _db_setup(scale: float, work: Path) -> Dict[str, Any]:
+    from pimiopilot_data.sinks.timescaledb import TSConfig, upsert_prices
+    state = _lake(scale, work)
+    df = _candles(scale, 100_000).assign(symbol=lambda d: "BENCH" + d["symbol"])
+    state.update(df=df, cfg=TSConfig.from_env(), symbols=sorted(df["symbol"].unique()),
+                 start=df["ts"].min().isoformat(), end=(df["ts"].max() + pd.Timedelta(minutes=1)).isoformat())
+    upsert_prices(df, interval="1m", cfg=state["cfg"])  # rows for the query benchmarks
+    return state
+
+def _upsert(state):
+    from pimiopilot_data.sinks.timescaledb import upsert_prices
+    return upsert_prices(state["df"], interval="1m", cfg=state["cfg"])
+
+def _iter_query_chunks(state):
+    from pimiopilot_data.queries import iter_query_chunks
+    spec = _query_spec(state, "csv", "timescaledb")
+    return sum(len(c) for c in iter_query_chunks(spec, chunksize=50_000))
+
+def _db_cleanup(state) -> None:
+    from pimiopilot_data.sinks.timescaledb import purge_older_than
+    purge_older_than(state["cfg"], "9999-01-01", state["symbols"])
+
+BENCHMARKS: List[Bench] = [
+    Bench("normalize_candle_df", lambda s, w: as_yfinance(synthetic_candles(1, "1m", 2 * s)), _normalize),
+    Bench("timescaledb_iter_rows", lambda s, w: _candles(s, 20_000), _iter_rows),
+    Bench("write_parquet", lambda s, w: (_candles(s, 500_000), w), _write_parquet),
+    Bench("sma_crossover_generate_signal", lambda s, w: _candles(s, 500_000), _sma),
+    *[Bench(f"run_query_parquet_{fmt}", _lake, _run_query(fmt, "parquet")) for fmt in ("csv", "ndjson", "parquet", "arrow")],
+    Bench("timescaledb_upsert_prices", _db_setup, _upsert, db=True),
+    Bench("queries_iter_query_chunks", _db_setup, _iter_query_chunks, db=True),
+    *[Bench(f"run_query_timescaledb_{fmt}", _db_setup, _run_query(fmt, "timescaledb"), db=True)
+      for fmt in ("csv", "ndjson", "parquet", "arrow")],
+]
+
+def measure(bench: Bench, scale: float = 1.0, repeat: int = 3) -> Dict[str, Any]:
+    """Best-of-`repeat` rows/sec, plus peak traced memory of one more run."""
+    work = Path(tempfile.mkdtemp(prefix=f"ppbench-{bench.name}-"))
+    try:
+        state = bench.setup(scale, work)
+        best = float("inf")
+        rows = 0
+        for _ in range(max(1, repeat)):
+            gc.collect()
+            t0 = time.perf_counter()
+            rows = bench.run(state)
+            best = min(best, time.perf_counter() - t0)
+        gc.collect()
+        tracemalloc.start()
+        try:
+            bench.run(state)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        if bench.db:
+            _db_cleanup(state)
+        return {"rows": rows, "seconds": round(best, 6), "rows_per_sec": round(rows / best, 1) if best > 0 else None,
+                "peak_mb": round(peak / 2**20, 2)}
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+def compare(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]], threshold: float) -> List[str]:
+    """Human-readable regressions: throughput below, or peak memory above, baseline by > threshold."""
+    problems = []
+    for name, cur in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        if base.get("rows_per_sec") and cur.get("rows_per_sec") is not None \
+                and cur["rows_per_sec"] < base["rows_per_sec"] * (1 - threshold):
+            problems.append(f"{name}: {cur['rows_per_sec']:,.0f} rows/s vs baseline {base['rows_per_sec']:,.0f}")
+        if base.get("peak_mb") is not None and cur["peak_mb"] > max(base["peak_mb"] * (1 + threshold), _MIN_PEAK_MB):
+            problems.append(f"{name}: peak {cur['peak_mb']} MB vs baseline {base['peak_mb']} MB")
+    return problems
+
+def _meta(scale: str, repeat: int) -> Dict[str, Any]:
+    import pyarrow
+    return {"python": platform.python_version(), "machine": platform.machine(), "pandas": pd.__version__,
+            "numpy": np.__version__, "pyarrow": pyarrow.__version__, "scale": scale, "repeat": repeat}
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="PimioPilot throughput/memory benchmarks")
+    ap.add_argument("--only", nargs="*", help="Benchmark names (substring match)")
+    ap.add_argument("--scale", choices=sorted(_SIZES), default="small")
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--db", action="store_true", help="Also run TimescaleDB benchmarks (needs DB_* env)")
+    ap.add_argument("--baseline", default=str(BASELINE))
+    ap.add_argument("--threshold", type=float, default=0.25, help="Allowed relative regression (0.25 = 25%%)")
+    ap.add_argument("--update-baseline", action="store_true", help="Write results as the new baseline")
+    ap.add_argument("--out", help="Also write results JSON here")
+    args = ap.parse_args(argv)
+
+    selected = [b for b in BENCHMARKS if (args.db or not b.db)
+                and (not args.only or any(o in b.name for o in args.only))]
+    results: Dict[str, Dict[str, Any]] = {}
+    for bench in selected:
+        results[bench.name] = r = measure(bench, _SIZES[args.scale], args.repeat)
+        print(f"{bench.name:34s} {r['rows']:>10,d} rows  {r['rows_per_sec'] or 0:>14,.0f} rows/s  "
+              f"{r['peak_mb']:>9.2f} MB peak", flush=True)
+
+    doc = {"meta": _meta(args.scale, args.repeat), "results": results}
+    if args.out:
+        Path(args.out).write_text(json.dumps(doc, indent=2) + "\n", encoding="utf-8")
+    baseline_path = Path(args.baseline)
+    if args.update_baseline:
+        old = json.loads(baseline_path.read_text(encoding="utf-8")) if baseline_path.exists() else {"results": {}}
+        doc["results"] = {**old.get("results", {}), **results}  # keep entries not re-run (e.g. --db ones)
+        baseline_path.write_text(json.dumps(doc, indent=2) + "\n", encoding="utf-8")
+        print(f"baseline written: {baseline_path}")
+        return 0
+    if not baseline_path.exists():
+        print(f"no baseline at {baseline_path}; run with --update-baseline", file=sys.stderr)
+        return 0
+    baseline = json.loads(baseline_path.read_text(encoding="utf-8"))
+    if baseline.get("meta", {}).get("scale") != args.scale:
+        print(f"baseline was recorded at scale {baseline.get('meta', {}).get('scale')!r}; not comparing", file=sys.stderr)
+        return 0
+    problems = compare(results, baseline.get("results", {}), args.threshold)
+    for p in problems:
+        print("REGRESSION", p, file=sys.stderr)
+    return 1 if problems else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,18 @@
+-- Strategy signals, one row per (strategy, parameter set, symbol, bar)
+CREATE TABLE IF NOT EXISTS strategy_signals (
+  strategy       text        NOT NULL,
+  params_hash    text        NOT NULL,
+  symbol         text        NOT NULL,
+  ts             timestamptz NOT NULL,
+  action         text,
+  target_weight  double precision,
+  confidence     double precision,
+  params         jsonb,
+  extras         jsonb,
+  updated_at     timestamptz NOT NULL DEFAULT now(),
+  PRIMARY KEY (strategy, params_hash, symbol, ts)
+);
+
+SELECT create_hypertable('strategy_signals','ts', if_not_exists => true, chunk_time_interval => interval '30 days');
+-- latest signal per symbol: backward scan of (strategy, params_hash, symbol, ts DESC)
+CREATE INDEX IF NOT EXISTS idx_strategy_signals_latest ON strategy_signals (strategy, params_hash, symbol, ts DESC);
@@ -0,0 +1,5 @@
+-- Intervals derived from the same fetched bars share timestamps (09:00 is a 5m, 15m and 1h bar),
+-- so rows are keyed by interval as well. Safe to re-run on an existing database:
+--   psql "$DB_DSN" -f db/init/03_interval_key.sql
+ALTER TABLE tw_ticks DROP CONSTRAINT IF EXISTS tw_ticks_pkey;
+ALTER TABLE tw_ticks ADD PRIMARY KEY (symbol, src_interval, ts);
@@ -79,22 +79,21 @@ def _to_python_scalars(df: pd.DataFrame) -> pd.DataFrame:
     return df
 
 def upsert_ticks(conn, df: pd.DataFrame) -> int:
-    """Batch upsert into `tw_ticks` with the primary key `(symbol, ts)`."""
+    """Batch upsert into `tw_ticks` with the primary key `(symbol, src_interval, ts)`."""
     if df is None or df.empty:
         return 0
     sql = """
         INSERT INTO tw_ticks
             (ts, symbol, "open", high, low, "close", volume, dividends, stock_splits, src_interval)
         VALUES %s
-        ON CONFLICT (symbol, ts) DO UPDATE SET
+        ON CONFLICT (symbol, src_interval, ts) DO UPDATE SET
             "open" = EXCLUDED."open",
             high = EXCLUDED.high,
             low  = EXCLUDED.low,
             "close" = EXCLUDED."close",
             volume = EXCLUDED.volume,
             dividends = EXCLUDED.dividends,
-            stock_splits = EXCLUDED.stock_splits,
-            src_interval = EXCLUDED.src_interval;
+            stock_splits = EXCLUDED.stock_splits;
     """
     df = _to_python_scalars(df)
     rows = list(df.itertuples(index=False, name=None))
@@ -0,0 +1,2 @@
+from .engine import run_backtest, BacktestResult
+__all__ = ["run_backtest", "BacktestResult"]
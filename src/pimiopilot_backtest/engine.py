@@ -0,0 +1,134 @@
+from __future__ import annotations
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+import numpy as np
+import pandas as pd
+
+# BUY/SELL map to a long/short unit per symbol; HOLD keeps the previous target.
+_ACTION_UNITS = {"BUY": 1.0, "SELL": -1.0}
+
+@dataclass
+class BacktestResult:
+    weights: pd.DataFrame      # ts x symbol, portfolio weight held over the next bar
+    returns: pd.DataFrame      # ts x symbol, simple bar returns of the price column
+    portfolio: pd.DataFrame    # ts: gross, turnover, cost, net, equity, drawdown
+    stats: Dict[str, Any] = field(default_factory=dict)
+
+def _to_utc(ts: pd.Series) -> pd.DatetimeIndex:
+    """pd.to_datetime(utc=True), parsing each distinct value once (bars share timestamps across symbols)."""
+    codes, uniques = pd.factorize(ts, use_na_sentinel=False)
+    return pd.DatetimeIndex(pd.to_datetime(pd.Index(uniques), utc=True)).take(codes)
+
+def _scatter(rows: np.ndarray, cols: np.ndarray, values: np.ndarray, shape: tuple[int, int]) -> np.ndarray:
+    """Dense ts x symbol matrix from long-format data (NaN where absent, later rows win)."""
+    out = np.full(shape, np.nan)
+    ok = (rows >= 0) & (cols >= 0)
+    out[rows[ok], cols[ok]] = values[ok]
+    return out
+
+def _signals_frame(signals: Any) -> pd.DataFrame:
+    """Accept a signals list/DataFrame, a strategy output dict, or a runner envelope."""
+    if isinstance(signals, dict):
+        signals = signals.get("strategy_output", signals).get("signals", [])
+    df = signals if isinstance(signals, pd.DataFrame) else pd.DataFrame(list(signals))
+    if df.empty:
+        return pd.DataFrame(columns=["ts", "symbol", "target", "from_action"])
+    missing = {"ts", "symbol"} - set(df.columns)
+    if missing:
+        raise ValueError(f"signals missing columns: {missing}")
+
+    target = pd.Series(np.nan, index=df.index)
+    from_action = pd.Series(False, index=df.index)
+    if "action" in df.columns:
+        target = df["action"].map(_ACTION_UNITS).astype("float64")
+        from_action = target.notna()
+    if "target_weight" in df.columns:
+        # explicit weights take precedence over actions
+        tw = df["target_weight"].astype("float64")
+        target = tw.where(tw.notna(), target)
+        from_action = from_action & tw.isna()
+    return pd.DataFrame({"ts": _to_utc(df["ts"]), "symbol": df["symbol"], "target": target, "from_action": from_action})
+
+def run_backtest(
+    bars: pd.DataFrame,
+    signals: Any,
+    *,
+    price_col: str = "close",
+    cost_bps: float = 0.0,
+    allow_short: bool = True,
+    action_scale: Optional[float] = None,
+    periods_per_year: int = 252,
+) -> BacktestResult:
+    """Vectorized backtest of strategy signals over CandleV1 bars, all symbols at once.
+
+    A signal at bar t sets the weight held from t to t+1 (trade at t's price).
+    Actions become +/-action_scale per symbol (default 1/n_symbols, so gross
+    exposure is at most 1); `target_weight` values are used as portfolio weights
+    as-is. HOLD and bars without a signal keep the previous weight. Costs are
+    `cost_bps` per unit of turnover, charged on the bar the weight changes.
+    """
+    missing = {"ts", "symbol", price_col} - set(bars.columns)
+    if missing:
+        raise ValueError(f"bars missing columns: {missing}")
+
+    ts = _to_utc(bars["ts"])
+    index = pd.DatetimeIndex(ts.unique()).sort_values()
+    columns = pd.Index(pd.unique(bars["symbol"])).sort_values()
+    symbols: List[str] = list(columns)
+    shape = (len(index), len(columns))
+    px = _scatter(index.get_indexer(ts), columns.get_indexer(bars["symbol"]), bars[price_col].to_numpy(dtype="float64"), shape)
+
+    sig = _signals_frame(signals)
+    scale = action_scale if action_scale is not None else 1.0 / max(len(symbols), 1)
+    target = np.where(sig["from_action"].to_numpy(dtype=bool), sig["target"].to_numpy(dtype="float64") * scale, sig["target"].to_numpy(dtype="float64"))
+    targets = _scatter(index.get_indexer(pd.DatetimeIndex(sig["ts"])), columns.get_indexer(sig["symbol"]), target, shape)
+    # HOLD / no signal -> keep the previous weight; flat before the first signal
+    weights = pd.DataFrame(targets).ffill().fillna(0.0).to_numpy()
+    if not allow_short:
+        weights = np.maximum(weights, 0.0)
+
+    # a missing bar (halt, gap) carries the last price forward: its own return is 0 and the
+    # next observed bar gets the whole move since the last observed price
+    filled = pd.DataFrame(px).ffill().to_numpy()
+    rets = np.zeros_like(filled)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rets[1:] = filled[1:] / filled[:-1] - 1.0
+    rets = np.where(np.isfinite(rets), rets, 0.0)  # before a symbol's first bar
+
+    prev = np.vstack([np.zeros((1, len(symbols))), weights[:-1]])  # weight held into each bar
+    gross = (prev * rets).sum(axis=1)
+    turnover = np.abs(weights - prev).sum(axis=1)
+    cost = turnover * cost_bps / 1e4
+    net = gross - cost
+    equity = np.cumprod(1.0 + net)
+    drawdown = equity / np.maximum.accumulate(equity) - 1.0 if len(equity) else equity
+
+    portfolio = pd.DataFrame(
+        {"gross": gross, "turnover": turnover, "cost": cost, "net": net, "equity": equity, "drawdown": drawdown},
+        index=index,
+    )
+    return BacktestResult(
+        weights=pd.DataFrame(weights, index=index, columns=symbols),
+        returns=pd.DataFrame(rets, index=index, columns=symbols),
+        portfolio=portfolio,
+        stats=_stats(portfolio, periods_per_year),
+    )
+
+def _stats(p: pd.DataFrame, periods_per_year: int) -> Dict[str, Any]:
+    n = len(p)
+    if n == 0:
+        return {"bars": 0}
+    net = p["net"].to_numpy()
+    total = float(p["equity"].iloc[-1] - 1.0)
+    vol = float(net.std(ddof=1) * np.sqrt(periods_per_year)) if n > 1 else 0.0
+    ann = float((1.0 + total) ** (periods_per_year / n) - 1.0) if total > -1 else -1.0
+    return {
+        "bars": n,
+        "total_return": total,
+        "annual_return": ann,
+        "annual_vol": vol,
+        "sharpe": float(net.mean() / net.std(ddof=1) * np.sqrt(periods_per_year)) if n > 1 and net.std(ddof=1) > 0 else 0.0,
+        "max_drawdown": float(p["drawdown"].min()),
+        "avg_turnover": float(p["turnover"].mean()),
+        "total_cost": float(p["cost"].sum()),
+    }
@@ -1,2 +1,9 @@
-from .runner import run_job
+# run_job pulls in yfinance/pandas/pyarrow; resolve it on first use so that
+# light entry points (query, serve, loggers) do not pay for it
 __all__=["run_job"]
+
+def __getattr__(name):
+    if name == "run_job":
+        from .runner import run_job
+        return run_job
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -3,9 +3,8 @@ import argparse
 from pathlib import Path
 import json
 
-from .validator import load_and_validate
-from .runner import run_job
-from .query_runner import run_query
+# Subcommand dependencies are imported inside their branch: `query` never loads
+# yfinance, `run` never loads the query stack.
 
 def main():
     ap = argparse.ArgumentParser(description="PimioPilot Data Module — Fetch & Query")
@@ -21,11 +20,44 @@ def main():
     q.add_argument("--config", required=True, help="Path to query YAML/JSON")
     q.add_argument("--schema", default=str(Path("schemas") / "query.schema.json"), help="Path to JSON Schema")
 
+    # Query service (long-lived)
+    srv = sub.add_parser("serve", help="Serve query specs over a Unix socket or localhost HTTP")
+    srv.add_argument("--schema", default=str(Path("schemas") / "query.schema.json"), help="Path to JSON Schema")
+    srv.add_argument("--socket", help="Unix socket path (default: HTTP on --host/--port)")
+    srv.add_argument("--host", default="127.0.0.1")
+    srv.add_argument("--port", type=int, default=8765)
+    srv.add_argument("--pool-size", type=int, default=4, help="Max pooled DB connections")
+    srv.add_argument("--log", default="out/query_service.log.ndjson", help="NDJSON log path")
+    srv.add_argument("--metrics-port", type=int, help="Serve Prometheus /metrics on this port (HTTP mode also serves it on --port)")
+
+    # Resident scheduler (replaces per-run cron process startup)
+    sch = sub.add_parser("schedule", help="Run fetch jobs on cron schedules in one long-lived process")
+    sch.add_argument("--config", required=True, help="Schedule YAML (jobs: [{config, schedule}])")
+    sch.add_argument("--schema", default=str(Path("schemas") / "job.schema.json"), help="JSON Schema for job configs")
+    sch.add_argument("--schedule-schema", default=str(Path("schemas") / "schedule.schema.json"), help="JSON Schema for the schedule")
+    sch.add_argument("--log", default="out/scheduler.log.ndjson", help="NDJSON log path")
+    sch.add_argument("--metrics-port", type=int, help="Serve Prometheus /metrics on this port")
+
+    # Gap scan / targeted repair against the trading calendar
+    gp = sub.add_parser("gaps", help="Find missing bars of a fetch job's range and optionally re-fetch only those")
+    gp.add_argument("--config", required=True, help="Path to job YAML (symbols, interval, range, source)")
+    gp.add_argument("--schema", default=str(Path("schemas") / "job.schema.json"), help="Path to JSON Schema")
+    gp.add_argument("--backend", choices=["timescaledb", "parquet"], default="timescaledb", help="Where stored bars are read/repaired")
+    gp.add_argument("--lake-path", help="Parquet lake root for --backend parquet (default PPDATA_LAKE_PATH or out)")
+    gp.add_argument("--calendar", help="Trading calendar JSON (default PPDATA_CALENDAR or calendars/twse.json)")
+    gp.add_argument("--repair", action="store_true", help="Re-fetch the missing ranges")
+
     args = ap.parse_args()
 
     if args.cmd == "run":
+        from .validator import load_and_validate
+        from .runner import run_job
+        from . import metrics
         cfg = load_and_validate(args.config, args.schema)
-        summary = run_job(cfg)
+        try:
+            summary = run_job(cfg)
+        finally:
+            metrics.write_textfile_from_env(cfg["task_id"])
         print(json.dumps({
             "status": summary["status"],
             "rows": summary["artifacts"]["rows"],
@@ -33,8 +65,14 @@ def main():
         }, ensure_ascii=False))
 
     elif args.cmd == "query":
+        from .validator import load_and_validate
+        from .query_runner import run_query
+        from . import metrics
         cfg = load_and_validate(args.config, args.schema)
-        summary, _ = run_query(cfg)
+        try:
+            summary, _ = run_query(cfg)
+        finally:
+            metrics.write_textfile_from_env("query")
         print(json.dumps({
             "status": summary["status"],
             "rows": summary["artifacts"]["rows"],
@@ -42,5 +80,46 @@ def main():
             "out": summary["artifacts"]["out_dir"]
         }, ensure_ascii=False))
 
+    elif args.cmd == "gaps":
+        from .validator import load_and_validate
+        from .runner import _materialize_job
+        from .gaps import scan_and_repair
+        from .trading_calendar import default_calendar
+        from .io.ndjson_logger import NDJSONLogger
+        from . import metrics
+        job = _materialize_job(load_and_validate(args.config, args.schema))
+        out_dir = Path(job.outputs.out_dir)
+        with NDJSONLogger(out_dir / "gaps.log.ndjson") as logger:
+            try:
+                summary = scan_and_repair(job, backend=args.backend, lake_path=args.lake_path, do_repair=args.repair,
+                                          calendar=default_calendar(args.calendar), index_path=out_dir / "gaps.json",
+                                          logger=logger)
+            finally:
+                metrics.write_textfile_from_env(f"{job.task_id}_gaps")
+        print(json.dumps(summary, ensure_ascii=False))
+
+    elif args.cmd == "serve":
+        from .query_service import QueryService, serve
+        if args.metrics_port:
+            from .metrics import serve_metrics
+            serve_metrics(args.metrics_port)
+        service = QueryService(args.schema, pool_size=args.pool_size, log_path=args.log)
+        serve(service, socket_path=args.socket, host=args.host, port=args.port)
+
+    elif args.cmd == "schedule":
+        import signal
+        from .scheduler import Scheduler
+        if args.metrics_port:
+            from .metrics import serve_metrics
+            serve_metrics(args.metrics_port)
+        scheduler = Scheduler(args.config, job_schema=args.schema, schedule_schema=args.schedule_schema, log_path=args.log)
+        signal.signal(signal.SIGTERM, lambda *_: scheduler.request_stop())
+        try:
+            scheduler.run_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            scheduler.stop()
+
 if __name__ == "__main__":
     main()
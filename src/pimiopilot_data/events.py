@@ -0,0 +1,141 @@
+from __future__ import annotations
+import json
+import os
+import select
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+import pandas as pd
+
+INGEST_COMPLETE = "ingest_complete"
+_DEFAULT_CHANNEL = "pimiopilot_ingest"
+# Postgres rejects NOTIFY payloads of 8000 bytes or more
+_MAX_NOTIFY_BYTES = 7900
+
+def ingest_event(task_id: Any, interval: str, df: pd.DataFrame, *, parquet: Optional[str] = None,
+                 out_dir: Optional[str] = None, rows: Optional[int] = None, repair: bool = False) -> Dict[str, Any]:
+    """Completion event for an ingestion run: which symbols got bars, over which ts range.
+
+    `rows` overrides len(df), for callers passing only each symbol's first/last bar.
+    `repair` marks bars filled into an already stored range (gap repair), which
+    subscribers must recompute rather than skip as seen.
+    """
+    ts = pd.to_datetime(df["ts"], utc=True) if "ts" in df.columns and not df.empty else None
+    return {
+        "event": INGEST_COMPLETE,
+        "task_id": task_id,
+        "interval": interval,
+        "symbols": sorted(map(str, df["symbol"].dropna().unique())) if "symbol" in df.columns else [],
+        "start": ts.min().isoformat() if ts is not None else None,
+        "end": ts.max().isoformat() if ts is not None else None,
+        "rows": int(len(df) if rows is None else rows),
+        "parquet": parquet,
+        "out_dir": out_dir,
+        "repair": repair,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+    }
+
+class FileEventBus:
+    """Local stand-in for a message bus: events appended to an NDJSON spool file.
+
+    Subscribers tail the file from a byte offset, which they can persist to resume.
+    """
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+
+    def publish(self, event: Dict[str, Any]) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        line = json.dumps(event, ensure_ascii=False, default=str) + "\n"
+        # one write() per event on an O_APPEND handle, so concurrent publishers do not interleave
+        with self.path.open("a", encoding="utf-8") as f:
+            f.write(line)
+
+    def subscribe(self, offset: int = 0, poll_seconds: float = 0.5, timeout: Optional[float] = None) -> Iterator[tuple[int, Dict[str, Any]]]:
+        """Yield (offset after the event, event); stops after `timeout` seconds without events."""
+        idle_since = time.monotonic()
+        while True:
+            got = False
+            if self.path.exists():
+                with self.path.open("rb") as f:
+                    f.seek(offset)
+                    for raw in f:
+                        if not raw.endswith(b"\n"):
+                            break  # partial line still being written
+                        offset += len(raw)
+                        got = True
+                        if raw.strip():
+                            yield offset, json.loads(raw)
+            if got:
+                idle_since = time.monotonic()
+            elif timeout is not None and time.monotonic() - idle_since >= timeout:
+                return
+            else:
+                time.sleep(poll_seconds)
+
+class PostgresEventBus:
+    """Events over Postgres LISTEN/NOTIFY; large symbol lists are split across notifications."""
+    def __init__(self, channel: str = _DEFAULT_CHANNEL, cfg=None):
+        self.channel = channel
+        self.cfg = cfg
+
+    def _connect(self):
+        from .sinks.timescaledb import TSConfig, _connect
+        return _connect(self.cfg or TSConfig.from_env())
+
+    def _payloads(self, event: Dict[str, Any]) -> List[str]:
+        payload = json.dumps(event, ensure_ascii=False, default=str)
+        symbols = event.get("symbols") or []
+        if len(payload.encode("utf-8")) <= _MAX_NOTIFY_BYTES or len(symbols) <= 1:
+            return [payload]
+        half = len(symbols) // 2
+        return self._payloads({**event, "symbols": symbols[:half]}) + self._payloads({**event, "symbols": symbols[half:]})
+
+    def publish(self, event: Dict[str, Any]) -> None:
+        conn = self._connect()
+        try:
+            with conn, conn.cursor() as cur:
+                for payload in self._payloads(event):
+                    cur.execute("SELECT pg_notify(%s, %s)", (self.channel, payload))
+        finally:
+            conn.close()
+
+    def subscribe(self, offset: int = 0, poll_seconds: float = 5.0, timeout: Optional[float] = None) -> Iterator[tuple[int, Dict[str, Any]]]:
+        """Yield (0, event) as notifications arrive. Events sent while not listening are not replayed."""
+        conn = self._connect()
+        conn.autocommit = True
+        try:
+            with conn.cursor() as cur:
+                cur.execute(f'LISTEN "{self.channel}"')
+            idle_since = time.monotonic()
+            while True:
+                if select.select([conn], [], [], poll_seconds) == ([], [], []):
+                    if timeout is not None and time.monotonic() - idle_since >= timeout:
+                        return
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    note = conn.notifies.pop(0)
+                    idle_since = time.monotonic()
+                    yield 0, json.loads(note.payload)
+        finally:
+            conn.close()
+
+def bus_from_url(url: Optional[str] = None):
+    """Event bus from PPDATA_EVENTS-style url: "file:PATH", "postgres[:CHANNEL]" or "none" (None)."""
+    url = url if url is not None else os.getenv("PPDATA_EVENTS", "file:out/events.ndjson")
+    kind, _, arg = url.partition(":")
+    if kind == "none" or not kind:
+        return None
+    if kind == "file":
+        return FileEventBus(arg or "out/events.ndjson")
+    if kind == "postgres":
+        return PostgresEventBus(arg or _DEFAULT_CHANNEL)
+    raise ValueError(f"Unsupported event bus: {url}")
+
+def publish(event: Dict[str, Any], url: Optional[str] = None) -> bool:
+    bus = bus_from_url(url)
+    if bus is None:
+        return False
+    bus.publish(event)
+    return True
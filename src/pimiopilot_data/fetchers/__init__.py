@@ -0,0 +1,45 @@
+# Fetcher registry. A fetcher is any object with
+#   fetch(symbols, *, interval, start, end, options) -> DataFrame
+# returning yf_client-shaped rows (symbol, ts, open, high, low, close, adj_close?, volume),
+# sorted by symbol, ts. Factories take the job and import their dependencies lazily.
+from __future__ import annotations
+import os
+from typing import Any, Callable, Dict, List, Optional, Protocol
+
+class Fetcher(Protocol):
+    def fetch(self, symbols: List[str], *, interval: str, start: str, end: Optional[str],
+              options: Dict[str, Any]) -> Any: ...
+
+_FETCHERS: Dict[str, Callable[[Any], Fetcher]] = {}
+
+def register_fetcher(name: str, factory: Callable[[Any], Fetcher]) -> None:
+    """Register `factory(job) -> Fetcher` under a job `source` name (replaces an existing entry)."""
+    _FETCHERS[name] = factory
+
+def available_fetchers() -> List[str]:
+    return sorted(_FETCHERS)
+
+def fetcher_for(job: Any) -> Fetcher:
+    """Fetcher for `job.source`; wrapped in a recorder when PPDATA_RECORD names a directory."""
+    factory = _FETCHERS.get(job.source)
+    if factory is None:
+        raise ValueError(f"Unsupported source: {job.source}")
+    fetcher = factory(job)
+    record_dir = os.getenv("PPDATA_RECORD")
+    if record_dir and job.source != "replay":
+        from .replay import RecordingFetcher
+        fetcher = RecordingFetcher(fetcher, record_dir)
+    return fetcher
+
+def _yfinance(job: Any) -> Fetcher:
+    from . import yf_client
+    return yf_client
+
+def _replay(job: Any) -> Fetcher:
+    from .replay import ReplayFetcher
+    opts = getattr(job, "replay_options", None)
+    opts = opts if isinstance(opts, dict) else vars(opts) if opts is not None else {}
+    return ReplayFetcher(**opts)
+
+register_fetcher("yfinance", _yfinance)
+register_fetcher("replay", _replay)
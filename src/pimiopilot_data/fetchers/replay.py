@@ -0,0 +1,99 @@
+from __future__ import annotations
+import hashlib
+import json
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+import pandas as pd
+
+# fetch options that change the returned bars (threads does not)
+_DATA_OPTIONS = ("auto_adjust", "actions", "prepost")
+
+def _options_tag(options: Dict[str, Any]) -> str:
+    defaults = {"auto_adjust": True, "actions": False, "prepost": False}  # as in yf_client
+    key = {k: bool(options.get(k, defaults[k])) for k in _DATA_OPTIONS}
+    return hashlib.sha1(json.dumps(key, sort_keys=True).encode("utf-8")).hexdigest()[:8]
+
+def cassette_path(root: str | Path, symbol: str, interval: str, options: Dict[str, Any]) -> Path:
+    """Recorded bars of one symbol/interval/option set: ROOT/INTERVAL/SYMBOL.TAG.parquet."""
+    return Path(root) / interval / f"{symbol}.{_options_tag(options)}.parquet"
+
+def _between(df: pd.DataFrame, start: Optional[str], end: Optional[str]) -> pd.DataFrame:
+    """Rows with start <= ts < end (end exclusive, as for yfinance); bounds in the ts column's timezone."""
+    ts = df["ts"]
+    tz = getattr(ts.dt, "tz", None)
+    mask = pd.Series(True, index=df.index)
+    for bound, keep in ((start, lambda b: ts >= b), (end, lambda b: ts < b)):
+        if bound:
+            b = pd.Timestamp(bound)
+            if tz is not None:
+                b = b.tz_localize(tz) if b.tzinfo is None else b.tz_convert(tz)
+            elif b.tzinfo is not None:
+                b = b.tz_convert("UTC").tz_localize(None)
+            mask &= keep(b)
+    return df[mask]
+
+class RecordingFetcher:
+    """Wrap a fetcher and save what it returns, one Parquet cassette per symbol.
+
+    New responses are merged into an existing cassette (later rows win per ts), so
+    repeated recordings widen the covered range. ReplayFetcher serves the result.
+    """
+    def __init__(self, inner, root: str | Path):
+        self.inner = inner
+        self.root = Path(root)
+        self._lock = threading.Lock()
+
+    def fetch(self, symbols: List[str], *, interval: str, start: str, end: Optional[str],
+              options: Dict[str, Any]) -> pd.DataFrame:
+        df = self.inner.fetch(symbols, interval=interval, start=start, end=end, options=options)
+        if df is not None and not df.empty:
+            with self._lock:
+                for symbol, part in df.groupby("symbol", sort=False):
+                    self._save(cassette_path(self.root, str(symbol), interval, options), part)
+        return df
+
+    def _save(self, path: Path, part: pd.DataFrame) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if path.exists():
+            part = pd.concat([pd.read_parquet(path), part], ignore_index=True)
+        part = part.drop_duplicates(subset=["ts"], keep="last").sort_values("ts", kind="stable")
+        tmp = path.with_suffix(".tmp")
+        part.to_parquet(tmp, index=False)
+        tmp.replace(path)
+
+class ReplayFetcher:
+    """Serve recorded cassettes instead of calling the provider; no network access.
+
+    Each call sleeps `latency_seconds + latency_per_symbol * len(symbols)` to stand in
+    for provider round trips, so pipeline throughput can be measured deterministically.
+    Cassettes are read once per instance and kept in memory.
+    """
+    def __init__(self, dir: str | Path = "fixtures/yfinance", latency_seconds: float = 0.0,
+                 latency_per_symbol: float = 0.0):
+        self.root = Path(dir)
+        self.latency_seconds = float(latency_seconds)
+        self.latency_per_symbol = float(latency_per_symbol)
+        self._cache: Dict[Path, pd.DataFrame] = {}
+        self._lock = threading.Lock()
+
+    def _cassette(self, path: Path) -> pd.DataFrame:
+        with self._lock:
+            df = self._cache.get(path)
+            if df is None:
+                df = self._cache[path] = pd.read_parquet(path)
+            return df
+
+    def fetch(self, symbols: List[str], *, interval: str, start: str, end: Optional[str],
+              options: Dict[str, Any]) -> pd.DataFrame:
+        paths = {s: cassette_path(self.root, s, interval, options) for s in symbols}
+        missing = [str(p) for p in paths.values() if not p.exists()]
+        if missing:
+            raise FileNotFoundError(f"no recorded data (record with PPDATA_RECORD={self.root}): {missing}")
+        delay = self.latency_seconds + self.latency_per_symbol * len(symbols)
+        if delay > 0:
+            time.sleep(delay)
+        frames = [_between(self._cassette(p), start, end) for p in paths.values()]
+        out = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+        return out.sort_values(["symbol", "ts"], kind="stable").reset_index(drop=True) if not out.empty else out
@@ -0,0 +1,52 @@
+from __future__ import annotations
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import pandas as pd
+
+Window = Tuple[str, str]
+
+def _day(value: Optional[str], default: date) -> date:
+    return pd.Timestamp(value).date() if value else default
+
+def plan_windows(start: str, end: Optional[str], *, window_days: int, history_days: Optional[int] = None,
+                 today: Optional[date] = None) -> List[Window]:
+    """Split [start, end) (dates, end exclusive; None means through today) into windows of at most
+    `window_days`, after clipping start to the provider's `history_days` lookback.
+
+    Returns (start, end) date strings, oldest first; empty when nothing is left after clipping.
+    """
+    today = today or datetime.now(timezone.utc).date()
+    first = _day(start, today)
+    stop = _day(end, today + timedelta(days=1))
+    if history_days is not None:
+        first = max(first, today - timedelta(days=history_days))
+    windows = []
+    while first < stop:
+        nxt = min(first + timedelta(days=window_days), stop)
+        windows.append((first.isoformat(), nxt.isoformat()))
+        first = nxt
+    return windows
+
+def fetch_windows(fetch_one: Callable[..., pd.DataFrame], symbols: List[str], *, interval: str,
+                  windows: List[Window], options: Dict[str, Any], max_workers: int = 8) -> pd.DataFrame:
+    """Fetch every window with `fetch_one(symbols, interval=, start=, end=, options=)`, up to
+    `max_workers` at a time, and stitch the results: one row per (symbol, ts), sorted.
+
+    Where windows overlap, the later window's row wins.
+    """
+    if not windows:
+        return pd.DataFrame()
+    def one(w: Window) -> pd.DataFrame:
+        return fetch_one(symbols, interval=interval, start=w[0], end=w[1], options=options)
+    if len(windows) == 1 or max_workers <= 1:
+        frames = [one(w) for w in windows]
+    else:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(windows)), thread_name_prefix="ppfetch") as pool:
+            frames = list(pool.map(one, windows))  # results in window order
+    frames = [f for f in frames if f is not None and not f.empty]
+    if not frames:
+        return pd.DataFrame()
+    df = pd.concat(frames, ignore_index=True)
+    df = df.drop_duplicates(subset=["symbol", "ts"], keep="last")
+    return df.sort_values(["symbol", "ts"], kind="stable").reset_index(drop=True)
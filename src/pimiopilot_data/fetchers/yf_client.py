@@ -3,11 +3,28 @@ from typing import List, Dict, Any
 import pandas as pd
 import yfinance as yf
 
+from .windows import fetch_windows, plan_windows
+
 _VALID_INTERVALS = {"1d", "1h", "30m", "15m", "5m", "1m"}
+# Yahoo intraday limits: (days per request, days of history), kept a day inside the
+# documented 8/60/730-day limits so that windows ending today are not rejected
+_INTRADAY_LIMITS = {"1m": (7, 29), "5m": (59, 59), "15m": (59, 59), "30m": (59, 59), "1h": (729, 729)}
+DEFAULT_MAX_CONCURRENCY = 8
 
 def fetch(symbols: List[str], *, interval: str, start: str, end: str | None, options: Dict[str, Any]) -> pd.DataFrame:
+    """Bars of `symbols` over [start, end); intraday ranges are split into provider-sized windows
+    fetched concurrently (options["max_concurrency"], default 8) and stitched by (symbol, ts)."""
     if interval not in _VALID_INTERVALS:
         raise ValueError(f"Unsupported interval: {interval}")
+    limits = _INTRADAY_LIMITS.get(interval)
+    if limits is None:
+        return _download(symbols, interval=interval, start=start, end=end, options=options)
+    window_days, history_days = limits
+    windows = plan_windows(start, end, window_days=window_days, history_days=history_days)
+    return fetch_windows(_download, symbols, interval=interval, windows=windows, options=options,
+                         max_workers=int(options.get("max_concurrency") or DEFAULT_MAX_CONCURRENCY))
+
+def _download(symbols: List[str], *, interval: str, start: str, end: str | None, options: Dict[str, Any]) -> pd.DataFrame:
     df = yf.download(
         tickers=symbols,
         start=start,
@@ -0,0 +1,228 @@
+from __future__ import annotations
+import hashlib
+import json
+from dataclasses import asdict, dataclass
+from datetime import timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+import numpy as np
+import pandas as pd
+
+from . import metrics
+from .trading_calendar import TradingCalendar, bar_delta, default_calendar
+
+# Gap scanning compares stored bars per (symbol, interval) with the bars the trading
+# calendar expects; missing bars that are consecutive in session order (across nights,
+# weekends and holidays) form one gap. Repairs re-fetch whole local days, merged per
+# symbol and grouped across symbols, so the request count follows the damage.
+
+@dataclass(frozen=True)
+class Gap:
+    symbol: str
+    interval: str
+    start: pd.Timestamp     # open time (UTC) of the first missing bar
+    end: pd.Timestamp       # end (UTC, exclusive) of the last missing bar
+    bars: int
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"symbol": self.symbol, "interval": self.interval, "start": self.start.isoformat(),
+                "end": self.end.isoformat(), "bars": self.bars}
+
+@dataclass
+class RepairRequest:
+    symbols: List[str]
+    interval: str
+    start: str              # local dates, end exclusive (as passed to fetchers)
+    end: str
+    bars: int
+
+def _local_midnight_utc(day, tz: str) -> pd.Timestamp:
+    return pd.Timestamp(day).tz_localize(tz).tz_convert("UTC")
+
+def _slots(ts: pd.Series, interval: str, calendar: TradingCalendar) -> pd.DatetimeIndex:
+    """Stored timestamps mapped onto the calendar's bar grid."""
+    idx = pd.DatetimeIndex(pd.to_datetime(ts, utc=True))
+    if interval == "1d":
+        return idx.tz_convert(calendar.timezone).normalize().tz_convert("UTC")
+    return idx.floor(bar_delta(interval))
+
+def find_gaps(stored_ts: pd.Series, *, symbol: str, interval: str, start, end,
+              calendar: Optional[TradingCalendar] = None) -> List[Gap]:
+    """Missing bars of one symbol for sessions with start <= day < end, as merged ranges."""
+    calendar = calendar or default_calendar()
+    expected = calendar.bar_slots(interval, start, end)
+    if expected.empty:
+        return []
+    missing = np.flatnonzero(~expected.isin(_slots(stored_ts, interval, calendar)))
+    if missing.size == 0:
+        return []
+    runs = np.split(missing, np.flatnonzero(np.diff(missing) != 1) + 1)
+    gaps = []
+    for run in runs:
+        first, last = expected[run[0]], expected[run[-1]]
+        if interval == "1d":
+            stop = _local_midnight_utc(last.tz_convert(calendar.timezone).date() + timedelta(days=1), calendar.timezone)
+        else:
+            stop = last + bar_delta(interval)
+        gaps.append(Gap(symbol, interval, first, stop, len(run)))
+    return gaps
+
+def load_stored(symbols: List[str], interval: str, start_utc: pd.Timestamp, end_utc: pd.Timestamp, *,
+                backend: str = "timescaledb", lake_path: Optional[str] = None, cfg=None) -> pd.DataFrame:
+    """(symbol, ts) of stored bars in [start_utc, end_utc) from TimescaleDB or the Parquet lake."""
+    if backend == "parquet":
+        from .lake import lake_query_to_dataframe
+        spec = {"symbols": symbols, "intervals": [interval], "columns": ["symbol", "ts"],
+                "time_range": {"start": start_utc.isoformat(), "end": end_utc.isoformat()}}
+        return lake_query_to_dataframe(spec, root=lake_path)
+    if backend != "timescaledb":
+        raise ValueError(f"Unsupported gap scan backend: {backend}")
+    from .sinks.timescaledb import TSConfig, _connect
+    cfg = cfg or TSConfig.from_env()
+    sql = f"SELECT symbol, ts FROM {cfg.table} WHERE symbol = ANY(%s) AND src_interval = %s AND ts >= %s AND ts < %s"
+    with _connect(cfg) as conn:
+        with conn.cursor() as cur:
+            cur.execute(sql, [list(symbols), interval, start_utc.to_pydatetime(), end_utc.to_pydatetime()])
+            rows = cur.fetchall()
+    metrics.DB_ROUND_TRIPS.inc(op="query")
+    return pd.DataFrame(rows, columns=["symbol", "ts"])
+
+def scan_gaps(symbols: List[str], interval: str, start, end, *, backend: str = "timescaledb",
+              lake_path: Optional[str] = None, calendar: Optional[TradingCalendar] = None, cfg=None) -> List[Gap]:
+    """Gaps of every symbol for sessions with start <= day < end (local dates), one storage read."""
+    calendar = calendar or default_calendar()
+    stored = load_stored(symbols, interval, _local_midnight_utc(start, calendar.timezone),
+                         _local_midnight_utc(end, calendar.timezone), backend=backend, lake_path=lake_path, cfg=cfg)
+    by_symbol = {str(s): part["ts"] for s, part in stored.groupby("symbol", sort=False)}
+    gaps: List[Gap] = []
+    for symbol in symbols:
+        ts = by_symbol.get(symbol, pd.Series([], dtype="datetime64[ns, UTC]"))
+        gaps.extend(find_gaps(ts, symbol=symbol, interval=interval, start=start, end=end, calendar=calendar))
+    return gaps
+
+def plan_repairs(gaps: List[Gap], calendar: Optional[TradingCalendar] = None,
+                 max_symbols: int = 50) -> List[RepairRequest]:
+    """Fewest fetch requests covering `gaps`.
+
+    Each gap widens to whole local days; per symbol, day ranges that overlap or are separated
+    only by non-session days are merged; symbols with identical ranges share a request
+    (at most `max_symbols` per request).
+    """
+    calendar = calendar or default_calendar()
+    tz = calendar.timezone
+    per_symbol: Dict[tuple, List[List[Any]]] = {}
+    for g in sorted(gaps, key=lambda g: (g.symbol, g.interval, g.start)):
+        first = g.start.tz_convert(tz).date()
+        stop = (g.end - pd.Timedelta(1, "ns")).tz_convert(tz).date() + timedelta(days=1)
+        ranges = per_symbol.setdefault((g.symbol, g.interval), [])
+        if ranges and (first <= ranges[-1][1] or not calendar.sessions(ranges[-1][1], first)):
+            ranges[-1][1] = max(ranges[-1][1], stop)
+            ranges[-1][2] += g.bars
+        else:
+            ranges.append([first, stop, g.bars])
+    grouped: Dict[tuple, Dict[str, int]] = {}
+    for (symbol, interval), ranges in per_symbol.items():
+        for first, stop, bars in ranges:
+            grouped.setdefault((interval, first, stop), {})[symbol] = bars
+    requests = []
+    for (interval, first, stop), bars in sorted(grouped.items()):
+        symbols = sorted(bars)
+        for i in range(0, len(symbols), max_symbols):
+            part = symbols[i:i + max_symbols]
+            requests.append(RepairRequest(part, interval, first.isoformat(), stop.isoformat(), sum(bars[s] for s in part)))
+    return requests
+
+def _write_lake(df: pd.DataFrame, lake_path: str, req: RepairRequest, source: str) -> str:
+    from .io.parquet_writer import write_parquet
+    from .runner import _normalize_candle_df
+    cols = ["ts", "symbol", "open", "high", "low", "close", "volume", "adj_close"]
+    df = _normalize_candle_df(df, req.symbols[0])
+    tag = hashlib.sha1(",".join(req.symbols).encode("utf-8")).hexdigest()[:8]
+    meta = {"pimiopilot.schema_version": "CandleV1", "pimiopilot.ts_tz": "UTC", "pimiopilot.interval": req.interval,
+            "pimiopilot.source": source, "pimiopilot.repair": f"{req.start}/{req.end}"}
+    # a new run directory; the lake prefers the newest file when bars overlap
+    out = Path(lake_path) / "repairs" / f"{req.interval}-{req.start}-{req.end}-{tag}"
+    return write_parquet(df[cols], out, "data.parquet", metadata=meta, fields=cols)
+
+def repair(job, requests: List[RepairRequest], *, backend: str = "timescaledb", lake_path: Optional[str] = None,
+           logger=None, cfg=None) -> int:
+    """Fetch each request with the job's fetcher and store it; returns rows stored."""
+    from .fetchers import fetcher_for
+    fetcher = fetcher_for(job)
+    opts = job.yfinance_options
+    options = opts if isinstance(opts, dict) else vars(opts)
+    labels = metrics.job_labels(job.task_id, job.symbols, job.interval)
+    total = 0
+    for req in requests:
+        df = fetcher.fetch(req.symbols, interval=req.interval, start=req.start, end=req.end, options=options)
+        metrics.ROWS_FETCHED.inc(len(df), **labels)
+        path = None
+        if df.empty:
+            rows = 0
+        elif backend == "parquet":
+            path = _write_lake(df, lake_path, req, job.source)
+            rows = len(df)
+        else:
+            from .sinks.timescaledb import upsert_prices
+            rows = upsert_prices(df, interval=req.interval, cfg=cfg)
+            metrics.ROWS_UPSERTED.inc(rows, **labels)
+        total += rows
+        if logger is not None:
+            logger.log("gap_repaired", symbols=req.symbols, interval=req.interval, start=req.start, end=req.end,
+                       bars=req.bars, rows=rows)
+        if rows:
+            _publish_repair(job, req, df, path, logger)
+    return total
+
+def _publish_repair(job, req: RepairRequest, df: pd.DataFrame, path: Optional[str], logger=None) -> None:
+    """Tell subscribers the range was filled in, so they recompute it; never fails the repair."""
+    from . import events
+    try:
+        event = events.ingest_event(job.task_id, req.interval, df, parquet=path, repair=True)
+        if events.publish(event) and logger is not None:
+            logger.log("event_published", event=event["event"], symbols=len(event["symbols"]), repair=True)
+    except Exception as e:
+        if logger is not None:
+            logger.log("event_publish_error", error=str(e))
+
+def write_index(path: str | Path, gaps: List[Gap], requests: List[RepairRequest], **extra: Any) -> Path:
+    """Gap index: the missing ranges and the requests that cover them."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    doc = {"gaps": [g.to_dict() for g in gaps], "missing_bars": sum(g.bars for g in gaps),
+           "requests": [asdict(r) for r in requests], **extra}
+    path.write_text(json.dumps(doc, ensure_ascii=False, indent=2), encoding="utf-8")
+    return path
+
+def scan_and_repair(job, *, backend: str = "timescaledb", lake_path: Optional[str] = None, do_repair: bool = False,
+                    calendar: Optional[TradingCalendar] = None, index_path: Optional[str | Path] = None,
+                    logger=None, cfg=None) -> Dict[str, Any]:
+    """Scan the job's symbols/interval/range for gaps, optionally repair them, and write the index.
+
+    After a repair the range is scanned again; what is still missing (e.g. a closure the
+    calendar does not know about, or a provider hole) is reported as `remaining`.
+    """
+    from .runner import resolve_date_range
+    calendar = calendar or default_calendar()
+    if backend == "parquet" and not lake_path:
+        from .lake import lake_path_from_env
+        lake_path = lake_path_from_env()
+    start, end = resolve_date_range(job.range, tz=calendar.timezone)
+    labels = metrics.job_labels(job.task_id, job.symbols, job.interval)
+    kw = dict(backend=backend, lake_path=lake_path, calendar=calendar, cfg=cfg)
+    gaps = scan_gaps(job.symbols, job.interval, start, end, **kw)
+    requests = plan_repairs(gaps, calendar)
+    summary: Dict[str, Any] = {"task_id": job.task_id, "interval": job.interval, "range": {"start": start, "end": end},
+                               "gaps": len(gaps), "missing_bars": sum(g.bars for g in gaps), "requests": len(requests)}
+    if logger is not None:
+        logger.log("gaps_scanned", **summary)
+    remaining = gaps
+    if do_repair and requests:
+        summary["repaired_rows"] = repair(job, requests, backend=backend, lake_path=lake_path, logger=logger, cfg=cfg)
+        remaining = scan_gaps(job.symbols, job.interval, start, end, **kw)
+        summary["remaining_bars"] = sum(g.bars for g in remaining)
+    metrics.MISSING_BARS.set(sum(g.bars for g in remaining), **labels)
+    if index_path is not None:
+        summary["index"] = str(write_index(index_path, gaps, requests, range=summary["range"],
+                                           remaining=[g.to_dict() for g in remaining] if do_repair else None))
+    return summary
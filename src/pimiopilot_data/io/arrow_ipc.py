@@ -0,0 +1,83 @@
+from __future__ import annotations
+import json
+from pathlib import Path
+from typing import Iterable, List, Optional
+import pandas as pd
+import pyarrow as pa
+
+# query.schema.json output.compression -> Arrow IPC codec.
+# "auto" stays uncompressed so readers can memory-map buffers without copying.
+_CODECS = {"auto": None, "none": None, "lz4": "lz4", "zstd": "zstd"}
+
+def _codec(compression: Optional[str]) -> Optional[str]:
+    key = compression or "auto"
+    if key not in _CODECS:
+        raise ValueError(f"Unsupported compression for Arrow IPC: {compression}")
+    return _CODECS[key]
+
+# Arrow types of query result columns (candles and signals). Fixing them up front keeps
+# every chunk on one schema (a chunk whose column is all null would otherwise infer
+# `null`) and gives empty results their columns. jsonb columns travel as JSON text.
+_TS = pa.timestamp("us", tz="UTC")
+_COLUMN_TYPES = {
+    "ts": _TS, "updated_at": _TS,
+    "open": pa.float64(), "high": pa.float64(), "low": pa.float64(), "close": pa.float64(),
+    "adj_close": pa.float64(), "volume": pa.float64(), "dividends": pa.float64(), "stock_splits": pa.float64(),
+    "target_weight": pa.float64(), "confidence": pa.float64(),
+}
+_JSON_COLUMNS = {"params", "extras"}
+
+def query_schema(columns: List[str]) -> pa.Schema:
+    """Arrow schema of a query returning `columns` (unknown columns are strings)."""
+    return pa.schema([(c, _COLUMN_TYPES.get(c, pa.string())) for c in columns])
+
+def to_record_batch(chunk: pd.DataFrame, schema: pa.Schema) -> pa.RecordBatch:
+    """`chunk` converted to `schema` (columns selected and cast; timestamps as UTC)."""
+    df = chunk[schema.names].copy()
+    for f in schema:
+        if pa.types.is_timestamp(f.type):
+            df[f.name] = pd.to_datetime(df[f.name], utc=True)
+        elif f.name in _JSON_COLUMNS:
+            df[f.name] = [v if v is None or isinstance(v, str) else json.dumps(v, ensure_ascii=False, default=str)
+                          for v in df[f.name]]
+    return pa.RecordBatch.from_pandas(df, schema=schema, preserve_index=False)
+
+def write_arrow_ipc(frames: Iterable[pd.DataFrame], path: str | Path, compression: Optional[str] = None,
+                    schema: Optional[pa.Schema] = None) -> int:
+    """Write DataFrame chunks as record batches of one Arrow IPC (Feather v2) file.
+
+    Each chunk is appended as it arrives, so callers can stream straight from a cursor.
+    With `schema` (e.g. query_schema(columns)) every chunk is cast to it and an empty
+    result still carries the columns; without it the first chunk's schema is used.
+    Returns the number of rows written.
+    """
+    out_path = Path(path)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    options = pa.ipc.IpcWriteOptions(compression=_codec(compression))
+    rows = 0
+    writer = None
+    try:
+        for chunk in frames:
+            if chunk.empty:
+                continue
+            if schema is not None:
+                table = pa.Table.from_batches([to_record_batch(chunk, schema)])
+            else:
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                schema = table.schema
+            if writer is None:
+                writer = pa.ipc.new_file(str(out_path), schema, options=options)
+            writer.write_table(table)
+            rows += len(chunk)
+        if writer is None:
+            # still produce a readable (empty) file
+            writer = pa.ipc.new_file(str(out_path), schema or pa.schema([]), options=options)
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows
+
+def read_arrow_ipc(path: str | Path, memory_map: bool = True) -> pa.Table:
+    """Open an Arrow IPC/Feather file; with memory_map, uncompressed buffers are shared, not copied."""
+    source = pa.memory_map(str(path), "r") if memory_map else pa.OSFile(str(path), "rb")
+    return pa.ipc.open_file(source).read_all()
@@ -1,9 +1,8 @@
 from __future__ import annotations
-import json
 from pathlib import Path
 from typing import Any, Dict
-from jsonschema import validate, Draft202012Validator
+
+from ..validator import compiled_validator
 
 def validate_json(data: Dict[str, Any], schema_path: str | Path) -> None:
-    schema = json.loads(Path(schema_path).read_text(encoding="utf-8"))
-    validate(instance=data, schema=schema)
\ No newline at end of file
+    compiled_validator(schema_path).validate(data)
@@ -3,7 +3,7 @@ import json, hashlib, time
 from pathlib import Path
 from typing import Any, Dict
 
-from jsonschema import validate
+from ..validator import compiled_validator
 
 def stable_spec(obj: Dict[str, Any]) -> Dict[str, Any]:
     # Minimize non-deterministic fields
@@ -16,8 +16,7 @@ def spec_hash(spec: Dict[str, Any]) -> str:
 
 def write_manifest(path: str | Path, manifest: Dict[str, Any], *, schema_path: str | Path) -> str:
     # Validate against schema
-    schema = json.loads(Path(schema_path).read_text(encoding="utf-8"))
-    validate(instance=manifest, schema=schema)
+    compiled_validator(schema_path).validate(manifest)
     p = Path(path)
     p.parent.mkdir(parents=True, exist_ok=True)
     p.write_text(json.dumps(manifest, ensure_ascii=False, indent=2), encoding="utf-8")
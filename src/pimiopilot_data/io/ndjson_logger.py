@@ -1,14 +1,158 @@
 from __future__ import annotations
-import json, time
+import atexit
+import itertools
+import json
+import threading
+import time
+import weakref
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, Iterator, List, Optional
+
+# Live loggers, flushed by one shared background thread and at interpreter exit
+_LOGGERS: "weakref.WeakSet[NDJSONLogger]" = weakref.WeakSet()
+_FLUSHER: Optional[threading.Thread] = None
+_FLUSHER_LOCK = threading.Lock()
+_FLUSHER_TICK = 0.25
+
+def _live() -> List["NDJSONLogger"]:
+    with _FLUSHER_LOCK:
+        return list(_LOGGERS)
+
+def _flusher_loop() -> None:
+    while True:
+        time.sleep(_FLUSHER_TICK)
+        now = time.monotonic()
+        for logger in _live():
+            if logger._pending and now - logger._last_flush >= logger.flush_interval:
+                try:
+                    logger.flush()
+                except OSError:
+                    pass  # e.g. the log directory was removed; keep serving the other loggers
+
+def _register(logger: "NDJSONLogger") -> None:
+    global _FLUSHER
+    with _FLUSHER_LOCK:
+        _LOGGERS.add(logger)
+        if _FLUSHER is None or not _FLUSHER.is_alive():
+            _FLUSHER = threading.Thread(target=_flusher_loop, name="ndjson-flush", daemon=True)
+            _FLUSHER.start()
+
+@atexit.register
+def flush_all() -> None:
+    """Flush every live logger (also runs at interpreter exit)."""
+    for logger in _live():
+        try:
+            logger.flush()
+        except OSError:
+            pass
 
 class NDJSONLogger:
-    def __init__(self, path: str | Path):
+    """NDJSON event log with buffered writes.
+
+    Records are serialized when logged and appended to the file in batches: when the
+    buffer reaches `max_bytes`, every `flush_interval` seconds (shared background
+    thread), on flush()/close() and at interpreter exit. Safe to use from several
+    threads. `flush_interval=0` writes through on every event.
+    """
+    def __init__(self, path: str | Path, *, flush_interval: float = 1.0, max_bytes: int = 64 * 1024):
         self.path = Path(path)
         self.path.parent.mkdir(parents=True, exist_ok=True)
         self.path.write_text("", encoding="utf-8")
-    def log(self, event: str, **fields: Dict[str, Any]) -> None:
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self._buf: List[str] = []
+        self._pending = 0
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._span_ids = itertools.count(1)
+        if flush_interval > 0:
+            _register(self)
+
+    def log(self, event: str, **fields: Any) -> None:
         rec = {"ts": time.time(), "event": event} | fields
-        with self.path.open("a", encoding="utf-8") as f:
-            f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+        line = json.dumps(rec, ensure_ascii=False, default=str) + "\n"
+        with self._lock:
+            self._buf.append(line)
+            self._pending += len(line)
+            full = self._pending >= self.max_bytes or self.flush_interval <= 0
+        if full:
+            self.flush()
+
+    def flush(self) -> None:
+        with self._lock:
+            if not self._buf:
+                return
+            data = "".join(self._buf)
+            self._buf.clear()
+            self._pending = 0
+            self._last_flush = time.monotonic()
+            # written under the lock so batches from different threads keep their order
+            with self.path.open("a", encoding="utf-8") as f:
+                f.write(data)
+
+    def close(self) -> None:
+        self.flush()
+        with _FLUSHER_LOCK:
+            _LOGGERS.discard(self)
+
+    @contextmanager
+    def span(self, name: str, **fields: Any) -> Iterator[Dict[str, Any]]:
+        """Time a phase; logs one "span" record with start/end/seconds when it exits.
+
+        Spans opened inside another span (in the same thread) record its `parent_id`
+        and a slash-joined `path`, e.g. "job/fetch". The yielded dict can be updated
+        with fields known only at the end (rows, bytes, ...); an exception is recorded
+        as `error` and re-raised.
+        """
+        stack = self._local.__dict__.setdefault("stack", [])
+        parent = stack[-1] if stack else None
+        span_id = next(self._span_ids)
+        path = f"{parent[1]}/{name}" if parent else name
+        stack.append((span_id, path))
+        extra: Dict[str, Any] = dict(fields)
+        start = time.time()
+        t0 = time.perf_counter()
+        try:
+            yield extra
+        except BaseException as e:
+            extra["error"] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            seconds = time.perf_counter() - t0
+            stack.pop()
+            self.log("span", name=name, path=path, span_id=span_id, parent_id=parent[0] if parent else None,
+                     start=start, end=start + seconds, seconds=round(seconds, 6), **extra)
+
+    def current_span(self) -> Optional[tuple]:
+        """(span_id, path) of the innermost open span in this thread, for adopt() elsewhere."""
+        stack = self._local.__dict__.get("stack")
+        return stack[-1] if stack else None
+
+    @contextmanager
+    def adopt(self, parent: Optional[tuple]) -> Iterator[None]:
+        """Parent this thread's spans under `parent` (from current_span() in another thread)."""
+        stack = self._local.__dict__.setdefault("stack", [])
+        if parent is None:
+            yield
+            return
+        stack.append(parent)
+        try:
+            yield
+        finally:
+            stack.pop()
+
+    def __del__(self) -> None:
+        # a logger dropped without close() (e.g. on an exception path) still writes its tail
+        if getattr(self, "_buf", None):
+            try:
+                self.flush()
+            except Exception:
+                pass
+
+    def __enter__(self) -> "NDJSONLogger":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
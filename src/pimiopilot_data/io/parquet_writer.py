@@ -29,4 +29,48 @@ def write_parquet(df: pd.DataFrame, out_dir: str | Path, filename: str, metadata
             to_write.to_parquet(out_path, engine="fastparquet")
         except Exception as e:
             raise RuntimeError(f"Failed writing parquet with both pyarrow and fastparquet: {e}")
-    return str(out_path)
\ No newline at end of file
+    return str(out_path)
+
+class ParquetStreamWriter:
+    """Append DataFrames to one Parquet file, one row group per write().
+
+    The file schema (and `metadata`) comes from the first non-empty frame; later frames
+    are cast to it, so e.g. an all-integer volume batch still lands as double. close()
+    returns the path; a writer that saw no rows writes nothing and returns None.
+    """
+    def __init__(self, out_dir: str | Path, filename: str, metadata: Optional[Dict[str, str]] = None,
+                 fields: Optional[List[str]] = None):
+        self.path = Path(out_dir) / filename
+        self.metadata = metadata
+        self.fields = fields
+        self.rows = 0
+        self._writer = None
+        self._schema = None
+
+    def write(self, df: pd.DataFrame) -> None:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        if df is None or df.empty:
+            return
+        to_write = df[self.fields] if self.fields else df
+        if "ts" in to_write.columns:
+            to_write = to_write.copy()
+            to_write["ts"] = pd.to_datetime(to_write["ts"], utc=True)
+        if self._writer is None:
+            table = pa.Table.from_pandas(to_write, preserve_index=False)
+            if self.metadata:
+                existing = table.schema.metadata or {}
+                table = table.replace_schema_metadata(existing | {k.encode(): str(v).encode() for k, v in self.metadata.items()})
+            self._schema = table.schema
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._writer = pq.ParquetWriter(str(self.path), self._schema)
+        else:
+            table = pa.Table.from_pandas(to_write, schema=self._schema, preserve_index=False)
+        self._writer.write_table(table)
+        self.rows += len(to_write)
+
+    def close(self) -> Optional[str]:
+        if self._writer is None:
+            return None
+        self._writer.close()
+        return str(self.path)
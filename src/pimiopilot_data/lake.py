@@ -0,0 +1,215 @@
+from __future__ import annotations
+import os
+from pathlib import Path
+from typing import Optional, Iterable, Iterator, List, Dict
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from .queries import _ALLOWED_COLUMNS
+from .trading_calendar import bar_delta
+
+_DEFAULT_LAKE_PATH = "out"
+
+def lake_path_from_env() -> str:
+    return os.getenv("PPDATA_LAKE_PATH", _DEFAULT_LAKE_PATH)
+
+# path -> (mtime_ns, size, interval or None for non-CandleV1 files). Directory mtimes
+# would miss a run rewriting data.parquet in place, so each file is keyed on its own stat.
+_DISCOVERED: Dict[str, tuple[int, int, Optional[str]]] = {}
+
+def _file_interval(p: Path, st: os.stat_result) -> Optional[str]:
+    key = str(p)
+    hit = _DISCOVERED.get(key)
+    if hit is not None and hit[:2] == (st.st_mtime_ns, st.st_size):
+        return hit[2]
+    try:
+        meta = pq.read_schema(p).metadata or {}
+    except Exception:
+        meta = {}
+    interval = None
+    if meta.get(b"pimiopilot.schema_version") == b"CandleV1":
+        interval = meta.get(b"pimiopilot.interval", b"").decode()
+    _DISCOVERED[key] = (st.st_mtime_ns, st.st_size, interval)
+    return interval
+
+def _discover(root: str | Path) -> Dict[str, List[str]]:
+    """Map interval -> CandleV1 parquet files under root (oldest first).
+
+    Only files written by the fetch side (schema metadata pimiopilot.schema_version=CandleV1)
+    are considered, so query exports living under the same tree are ignored. A file's
+    schema is read once and again only after it changes, so repeated queries only stat.
+    """
+    root = Path(root)
+    if not root.exists():
+        raise FileNotFoundError(f"Parquet lake not found: {root}")
+    found: Dict[str, List[tuple[int, str]]] = {}
+    for p in root.rglob("*.parquet"):
+        try:
+            st = p.stat()
+        except OSError:
+            continue
+        interval = _file_interval(p, st)
+        if interval is not None:
+            found.setdefault(interval, []).append((st.st_mtime_ns, str(p)))
+    return {k: [path for _, path in sorted(v)] for k, v in found.items()}
+
+def _ts_scalar(value: str, field_type: pa.DataType) -> pa.Scalar:
+    ts = pd.Timestamp(value)
+    if ts.tzinfo is None:
+        ts = ts.tz_localize("UTC")
+    if pa.types.is_timestamp(field_type) and field_type.tz is None:
+        ts = ts.tz_convert("UTC").tz_localize(None)
+    return pa.scalar(ts, type=field_type)
+
+def _parse_order_by(order_by: List[str]) -> List[tuple[str, bool]]:
+    keys = []
+    for item in order_by:
+        parts = item.split()
+        col = parts[0]
+        direction = parts[1].upper() if len(parts) > 1 else "ASC"
+        if col not in _ALLOWED_COLUMNS or direction not in ("ASC", "DESC") or len(parts) > 2:
+            raise ValueError(f"Unsupported order_by for parquet backend: {item}")
+        keys.append((col, direction == "ASC"))
+    return keys
+
+def _scan_interval(dataset: ds.Dataset, spec: dict, interval: str, cols: List[str]) -> pd.DataFrame:
+    schema = dataset.schema
+    tr = spec["time_range"]
+    expr = ds.field("symbol").isin(spec["symbols"])
+    if "ts" in schema.names:
+        ts_type = schema.field("ts").type
+        expr = expr & (ds.field("ts") >= _ts_scalar(tr["start"], ts_type)) & (ds.field("ts") < _ts_scalar(tr["end"], ts_type))
+
+    # Projection pushdown: only read stored columns that are needed for output/dedup/sort
+    stored = [c for c in cols if c in schema.names]
+    # Fragments come back in file order (oldest first), so newer runs win on dedup later
+    df = dataset.to_table(columns=stored, filter=expr).to_pandas()
+    if "ts" in df.columns:
+        df["ts"] = pd.to_datetime(df["ts"], utc=True)
+    for c in cols:
+        if c == "src_interval":
+            df[c] = interval
+        elif c not in df.columns:
+            df[c] = None
+    return df[cols]
+
+def _plan(spec: dict) -> tuple[List[str], List[tuple[str, bool]], List[str]]:
+    """(output columns, order keys, columns to read) of a spec; ValueError if unsupported."""
+    if spec.get("filters"):
+        raise ValueError("filters are SQL expressions and are not supported by the parquet backend")
+    if spec.get("dataset", "candles") != "candles":
+        raise ValueError("the parquet backend only serves dataset=candles")
+
+    cols = spec.get("columns")
+    if not cols:
+        cols = sorted(_ALLOWED_COLUMNS)
+    else:
+        unknown = [c for c in cols if c not in _ALLOWED_COLUMNS]
+        if unknown:
+            raise ValueError(f"Unknown columns in query: {unknown}")
+
+    order_keys = _parse_order_by(spec.get("order_by") or ["ts ASC"])
+    needed = list(dict.fromkeys(list(cols) + ["symbol", "ts"] + [k for k, _ in order_keys]))
+    return list(cols), order_keys, needed
+
+def _datasets(by_interval: Dict[str, List[str]], intervals: List[str]) -> Dict[str, ds.Dataset]:
+    """One dataset per requested interval with files; built once per query, so footers
+    are read once however many partitions scan it."""
+    return {i: ds.dataset(by_interval[i], format="parquet") for i in intervals if by_interval.get(i)}
+
+def _query(spec: dict, datasets: Dict[str, ds.Dataset], intervals: List[str], cols: List[str],
+           order_keys: List[tuple[str, bool]], needed: List[str]) -> pd.DataFrame:
+    frames = []
+    for interval in intervals:
+        dataset = datasets.get(interval)
+        if dataset is not None:
+            # tw_ticks is keyed by (symbol, src_interval, ts); mirror that when runs overlap
+            part = _scan_interval(dataset, spec, interval, needed)
+            frames.append(part.drop_duplicates(subset=["symbol", "ts"], keep="last"))
+    if not frames:
+        return pd.DataFrame(columns=cols)
+    df = pd.concat(frames, ignore_index=True)
+    return df.sort_values([k for k, _ in order_keys], ascending=[a for _, a in order_keys], kind="stable")
+
+def lake_query_to_dataframe(spec: dict, root: Optional[str | Path] = None) -> pd.DataFrame:
+    """Answer a query spec from local CandleV1 Parquet artifacts instead of TimescaleDB."""
+    cols, order_keys, needed = _plan(spec)
+    by_interval = _discover(root or spec.get("lake_path") or lake_path_from_env())
+    intervals = spec.get("intervals") or sorted(by_interval)
+    df = _query(spec, _datasets(by_interval, intervals), intervals, cols, order_keys, needed)
+
+    limit = spec.get("limit")
+    if limit:
+        df = df.head(int(limit))
+    return df[cols].reset_index(drop=True)
+
+def _bar(interval: str) -> pd.Timedelta:
+    try:
+        return bar_delta(interval)
+    except ValueError:
+        return pd.Timedelta(minutes=1)
+
+# Upper bound on the scans of one chunked query. Wide universes over long fine-grained
+# ranges would otherwise be split into tens of thousands of windows, mostly outside
+# trading hours; past the cap a part holds about 1/_MAX_PARTS of the result instead.
+_MAX_PARTS = 512
+
+def _partitions(spec: dict, intervals: List[str], order_keys: List[tuple[str, bool]], chunksize: int) -> Iterator[dict]:
+    """Sub-specs, in output order, that each match about `chunksize` rows at most.
+
+    A row holds at most one bar per (symbol, interval) slot, so a time window of
+    chunksize * bar / (symbols * intervals) bounds a scan ordered by ts first; ordered by
+    symbol first, whole symbols are grouped the same way. Any other leading key has no
+    such bound and yields the spec unsplit. At most _MAX_PARTS sub-specs are produced.
+    """
+    key, ascending = order_keys[0]
+    tr = spec["time_range"]
+    start, end = (pd.Timestamp(tr[k]) for k in ("start", "end"))
+    start = start.tz_localize("UTC") if start.tzinfo is None else start.tz_convert("UTC")
+    end = end.tz_localize("UTC") if end.tzinfo is None else end.tz_convert("UTC")
+    symbols = list(spec["symbols"])
+    per_bar = max(1, len(symbols)) * max(1, len(intervals))
+    bar = min((_bar(i) for i in intervals), default=pd.Timedelta(minutes=1))
+    if start >= end:
+        return
+    if key == "ts":
+        step = max(bar, bar * (chunksize // per_bar), (end - start) / _MAX_PARTS)
+        edges = list(pd.date_range(start, end, freq=step))
+        if edges[-1] < end:
+            edges.append(end)
+        windows = list(zip(edges[:-1], edges[1:]))
+        for lo, hi in (windows if ascending else reversed(windows)):
+            yield {**spec, "time_range": {"start": lo.isoformat(), "end": hi.isoformat()}}
+    elif key == "symbol":
+        bars = max(1, int((end - start) / bar)) * max(1, len(intervals))
+        group = max(1, chunksize // bars, -(-len(symbols) // _MAX_PARTS))
+        ordered = sorted(symbols, reverse=not ascending)
+        for i in range(0, len(ordered), group):
+            yield {**spec, "symbols": ordered[i:i + group]}
+    else:
+        yield spec
+
+def iter_lake_chunks(spec: dict, root: Optional[str | Path] = None, chunksize: int = 100_000) -> Iterable[pd.DataFrame]:
+    """Chunked variant matching iter_query_chunks (same rows, same order).
+
+    The scan is split by the leading order key (time windows or symbol groups, see
+    _partitions) so each scan materializes about `chunksize` rows instead of the whole
+    result; dedup and sort happen within a part, which is exact because parts never
+    share a (symbol, ts).
+    """
+    cols, order_keys, needed = _plan(spec)
+    by_interval = _discover(root or spec.get("lake_path") or lake_path_from_env())
+    intervals = spec.get("intervals") or sorted(by_interval)
+    datasets = _datasets(by_interval, intervals)
+    remaining = int(spec["limit"]) if spec.get("limit") else None
+    for part_spec in _partitions(spec, intervals, order_keys, chunksize):
+        df = _query(part_spec, datasets, intervals, cols, order_keys, needed)[cols]
+        if remaining is not None:
+            df = df.head(remaining)
+            remaining -= len(df)
+        for i in range(0, len(df), chunksize):
+            yield df.iloc[i:i + chunksize].reset_index(drop=True)
+        if remaining == 0:
+            return
@@ -0,0 +1,239 @@
+from __future__ import annotations
+import bisect
+import hashlib
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+# Prometheus text exposition (format 0.0.4) without a client library: counters, gauges
+# and histograms in a process-wide registry, exported as a textfile for the node_exporter
+# textfile collector (cron runs) or over HTTP at /metrics (daemon modes).
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+DEFAULT_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+_SYMBOL_SET_MAX = 3
+
+def _fmt(v: float) -> str:
+    if math.isinf(v):
+        return "+Inf" if v > 0 else "-Inf"
+    v = float(v)
+    return str(int(v)) if v.is_integer() and abs(v) < 1e15 else repr(v)
+
+def _escape(v: str) -> str:
+    return v.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], Any] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} takes labels {list(self.labelnames)}, got {sorted(labels)}")
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+    def _samples(self) -> Iterator[Tuple[str, str, float]]:
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, v in items:
+            yield self.name, _labels(self.labelnames, key), v
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        lines += [f"{name}{labels} {_fmt(v)}" for name, labels, v in self._samples()]
+        return lines
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        if amount < 0:
+            raise ValueError("counters only go up")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: Any) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def set(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(float(b) for b in buckets if not math.isinf(b)))
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key) or ([0] * (len(self.buckets) + 1), 0.0)
+            counts[bisect.bisect_left(self.buckets, value)] += 1
+            self._values[key] = (counts, total + value)
+
+    @contextmanager
+    def time(self, **labels: Any) -> Iterator[None]:
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - t0, **labels)
+
+    def count(self, **labels: Any) -> int:
+        with self._lock:
+            entry = self._values.get(self._key(labels))
+        return sum(entry[0]) if entry else 0
+
+    def _samples(self) -> Iterator[Tuple[str, str, float]]:
+        with self._lock:
+            items = sorted((k, (list(c), s)) for k, (c, s) in self._values.items())
+        for key, (counts, total) in items:
+            running = 0
+            for bound, n in zip(self.buckets + (math.inf,), counts):
+                running += n
+                yield f"{self.name}_bucket", _labels(self.labelnames, key, f'le="{_fmt(bound)}"'), running
+            yield f"{self.name}_sum", _labels(self.labelnames, key), total
+            yield f"{self.name}_count", _labels(self.labelnames, key), running
+
+class Registry:
+    """Named metrics of one process; `counter()` etc. return the existing metric on repeat calls."""
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name: str, help: str, labelnames: Sequence[str], **kw) -> Any:
+        with self._lock:
+            m = self._metrics.get(name)
+            if m is None:
+                m = self._metrics[name] = cls(name, help, labelnames, **kw)
+            elif type(m) is not cls or m.labelnames != tuple(labelnames):
+                raise ValueError(f"metric {name} already registered as {m.kind} {list(m.labelnames)}")
+            return m
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._get(Counter, name, help, labelnames)
+
+    def gauge(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._get(Gauge, name, help, labelnames)
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._get(Histogram, name, help, labelnames, buckets=buckets)
+
+    def clear(self) -> None:
+        """Reset every value (metrics stay registered)."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for m in metrics:
+            m.clear()
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda m: m.name)
+        return "".join(line + "\n" for m in metrics for line in m.render())
+
+REGISTRY = Registry()
+
+def symbol_set(symbols: Iterable[str]) -> str:
+    """Bounded-cardinality label for a job's symbols: "2317.TW,2330.TW", or "12:1a2b3c4d" for large sets."""
+    syms = sorted(set(map(str, symbols)))
+    if len(syms) <= _SYMBOL_SET_MAX:
+        return ",".join(syms)
+    return f"{len(syms)}:{hashlib.sha1(','.join(syms).encode('utf-8')).hexdigest()[:8]}"
+
+def job_labels(task_id: Any, symbols: Iterable[str], interval: str) -> Dict[str, str]:
+    return {"task_id": str(task_id), "symbols": symbol_set(symbols), "interval": str(interval)}
+
+_JOB = ("task_id", "symbols", "interval")
+
+JOBS = REGISTRY.counter("pimiopilot_jobs_total", "Ingestion job runs by outcome", _JOB + ("status",))
+PHASE_SECONDS = REGISTRY.histogram("pimiopilot_phase_seconds", "Duration of ingestion job phases", _JOB + ("phase",))
+ROWS_FETCHED = REGISTRY.counter("pimiopilot_rows_fetched_total", "Rows returned by the fetcher", _JOB)
+ROWS_UPSERTED = REGISTRY.counter("pimiopilot_rows_upserted_total", "Rows upserted into TimescaleDB", _JOB)
+ROWS_DELETED = REGISTRY.counter("pimiopilot_rows_deleted_total", "Rows deleted by retention", _JOB)
+FETCH_ERRORS = REGISTRY.counter("pimiopilot_fetch_errors_total", "Fetch calls that raised", _JOB)
+FETCH_RETRIES = REGISTRY.counter("pimiopilot_fetch_retries_total", "Fetch calls retried after an error", _JOB)
+JOB_ROWS_PER_SECOND = REGISTRY.gauge("pimiopilot_job_rows_per_second", "Rows per second of the last successful run", _JOB)
+JOB_LAST_SUCCESS = REGISTRY.gauge("pimiopilot_job_last_success_timestamp_seconds", "Unix time of the last successful run", _JOB)
+MISSING_BARS = REGISTRY.gauge("pimiopilot_missing_bars", "Bars missing against the trading calendar at the last gap scan", _JOB)
+DB_ROUND_TRIPS = REGISTRY.counter("pimiopilot_db_round_trips_total", "Statements and cursor fetches sent to the database", ("op",))
+QUERY_SECONDS = REGISTRY.histogram("pimiopilot_query_seconds", "Duration of query runs", ("format", "backend"))
+ROWS_EXPORTED = REGISTRY.counter("pimiopilot_rows_exported_total", "Rows written by queries", ("format", "backend"))
+BYTES_EXPORTED = REGISTRY.counter("pimiopilot_bytes_exported_total", "Bytes written by queries", ("format", "backend"))
+
+def write_textfile(path: str | Path, registry: Optional[Registry] = None) -> Path:
+    """Write the registry atomically (tmp + rename), as the textfile collector expects."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp.write_text((registry or REGISTRY).render(), encoding="utf-8")
+    tmp.replace(path)
+    return path
+
+def write_textfile_from_env(name: str, registry: Optional[Registry] = None) -> Optional[Path]:
+    """Write PPDATA_METRICS_DIR/pimiopilot_<name>.prom if PPDATA_METRICS_DIR is set."""
+    root = os.getenv("PPDATA_METRICS_DIR")
+    if not root:
+        return None
+    safe = "".join(c if c.isalnum() or c in "-_" else "_" for c in str(name))
+    return write_textfile(Path(root) / f"pimiopilot_{safe}.prom", registry)
+
+def send_metrics(handler: BaseHTTPRequestHandler, registry: Optional[Registry] = None) -> None:
+    """Answer a GET on an http.server handler: /metrics gets the exposition, anything else 404."""
+    if handler.path.partition("?")[0] != "/metrics":
+        handler.send_error(404)
+        return
+    body = (registry or REGISTRY).render().encode("utf-8")
+    handler.send_response(200)
+    handler.send_header("Content-Type", CONTENT_TYPE)
+    handler.send_header("Content-Length", str(len(body)))
+    handler.end_headers()
+    handler.wfile.write(body)
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        send_metrics(self, self.server.registry)
+
+    def log_message(self, format, *args):
+        pass
+
+def serve_metrics(port: int, host: str = "0.0.0.0", registry: Optional[Registry] = None) -> ThreadingHTTPServer:
+    """Serve GET /metrics from a daemon thread; call shutdown() on the result to stop."""
+    srv = ThreadingHTTPServer((host, port), _MetricsHandler)
+    srv.daemon_threads = True
+    srv.registry = registry or REGISTRY
+    threading.Thread(target=srv.serve_forever, name="metrics-http", daemon=True).start()
+    return srv
@@ -18,6 +18,7 @@ class OutputSpec:
     parquet_filename: str = "data.parquet"
     manifest_filename: str = "manifest.json"
     logs_filename: str = "logs.ndjson"
+    upsert_timescaledb: bool = False  # also upsert every interval into tw_ticks (DB_* env)
     # backward compat flags (ignored if parquet is enabled)
     write_csv: bool = False
     csv_filename: str = "data.csv"
@@ -28,6 +29,21 @@ class YFOpts:
     actions: bool = False
     prepost: bool = False
     threads: str | int = "auto"
+    max_concurrency: int = 8
+
+@dataclass
+class ReplayOpts:
+    dir: str = "fixtures/yfinance"
+    latency_seconds: float = 0.0
+    latency_per_symbol: float = 0.0
+
+@dataclass
+class PipelineOpts:
+    batch_size: int = 50        # symbols per fetch batch
+    queue_depth: int = 2        # batches buffered between stages
+    fetch_workers: int = 1      # batches downloading at once
+    fetch_retries: int = 2      # extra attempts per batch after a fetch error
+    retry_backoff_seconds: float = 1.0  # doubled after each failed attempt
 
 @dataclass
 class Job:
@@ -39,4 +55,7 @@ class Job:
     outputs: OutputSpec
     yfinance_options: YFOpts = field(default_factory=YFOpts)
     retention: Optional[RetentionSpec] = None
+    replay_options: Optional[ReplayOpts] = None
+    derive_intervals: List[str] = field(default_factory=list)
+    pipeline: PipelineOpts = field(default_factory=PipelineOpts)
     raw: Dict[str, Any] = field(default_factory=dict)
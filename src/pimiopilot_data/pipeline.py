@@ -0,0 +1,131 @@
+from __future__ import annotations
+import queue
+import threading
+from contextlib import nullcontext
+from dataclasses import dataclass
+from typing import Any, Callable, ContextManager, Dict, Iterable, List, Optional, Sequence
+
+# A stage pipeline over bounded queues: every stage runs in its own thread(s) and hands
+# results to the next stage through a queue of at most `queue_depth` items, so batch k+1
+# is fetched while batch k is validated and written. Memory is bounded by the queue
+# depths plus one item per worker; wall time approaches that of the slowest stage.
+
+_DONE = object()
+_POLL = 0.1
+
+@dataclass(frozen=True)
+class Stage:
+    name: str
+    fn: Callable[[Any], Any]
+    workers: int = 1
+    # hand items to `fn` in input order (needs workers=1); upstream stages with several
+    # workers can finish items out of order, and sinks such as file writers care
+    ordered: bool = False
+
+def run_pipeline(items: Iterable[Any], stages: Sequence[Stage], *, queue_depth: int = 2,
+                 context: Optional[Callable[[], ContextManager]] = None) -> List[Any]:
+    """Push `items` through `stages` concurrently; returns the last stage's results.
+
+    Results are in input order when the last stage is `ordered`, in completion order
+    otherwise. The first exception in any stage (or while iterating `items`) stops
+    the pipeline and is re-raised here once every thread has exited. `context`, if
+    given, is entered around each worker thread (e.g. to parent log spans).
+    """
+    if not stages:
+        raise ValueError("run_pipeline needs at least one stage")
+    for st in stages:
+        if st.ordered and st.workers != 1:
+            raise ValueError(f"ordered stage {st.name!r} must have a single worker")
+    depth = max(1, int(queue_depth))
+    queues: List[queue.Queue] = [queue.Queue(maxsize=depth) for _ in stages]
+    stop = threading.Event()
+    lock = threading.Lock()
+    errors: List[BaseException] = []
+    results: List[Any] = []
+    running = [st.workers for st in stages]
+
+    def fail(e: BaseException) -> None:
+        with lock:
+            errors.append(e)
+        stop.set()
+
+    def put(q: queue.Queue, item: Any) -> bool:
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=_POLL)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def get(q: queue.Queue) -> Any:
+        while not stop.is_set():
+            try:
+                return q.get(timeout=_POLL)
+            except queue.Empty:
+                continue
+        return _DONE
+
+    def feed() -> None:
+        try:
+            for seq, item in enumerate(items):
+                if not put(queues[0], (seq, item)):
+                    return
+        except BaseException as e:
+            fail(e)
+        finally:
+            for _ in range(stages[0].workers):
+                put(queues[0], _DONE)
+
+    def work(i: int) -> None:
+        stage = stages[i]
+        out = queues[i + 1] if i + 1 < len(stages) else None
+        pending: Dict[int, Any] = {}
+        expected = 0
+
+        def emit(seq: int, item: Any) -> bool:
+            result = stage.fn(item)
+            if out is None:
+                with lock:
+                    results.append(result)
+                return True
+            return put(out, (seq, result))
+
+        try:
+            with (context() if context else nullcontext()):
+                while True:
+                    got = get(queues[i])
+                    if got is _DONE:
+                        break
+                    seq, item = got
+                    if not stage.ordered:
+                        if not emit(seq, item):
+                            break
+                        continue
+                    # hold early arrivals until the gap before them is filled
+                    pending[seq] = item
+                    while expected in pending:
+                        if not emit(expected, pending.pop(expected)):
+                            return
+                        expected += 1
+        except BaseException as e:
+            fail(e)
+        finally:
+            with lock:
+                running[i] -= 1
+                last = running[i] == 0
+            if last and out is not None:
+                for _ in range(stages[i + 1].workers):
+                    put(out, _DONE)
+
+    threads = [threading.Thread(target=feed, name="pppipe-feed", daemon=True)]
+    for i, st in enumerate(stages):
+        threads += [threading.Thread(target=work, args=(i,), name=f"pppipe-{st.name}-{w}", daemon=True)
+                    for w in range(st.workers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    if errors:
+        raise errors[0]
+    return results
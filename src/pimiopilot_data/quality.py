@@ -0,0 +1,134 @@
+from __future__ import annotations
+from pathlib import Path
+from typing import Any, Dict, List
+import numpy as np
+import pandas as pd
+
+from .validator import compiled_validator
+
+CANDLE_SCHEMA = Path("schemas") / "candle_v1.schema.json"
+_PRICES = ["open", "high", "low", "close"]
+# |log(close_t / close_t-1)| above this (about +65% / -40%) counts as a spike
+DEFAULT_SPIKE_THRESHOLD = 0.5
+
+def candle_columns(schema_path: str | Path = CANDLE_SCHEMA) -> tuple[List[str], List[str]]:
+    """(required columns, number-typed columns) of the CandleV1 row schema."""
+    schema = compiled_validator(schema_path).schema
+    props = schema.get("properties", {})
+    return list(schema.get("required", [])), [c for c, p in props.items() if p.get("type") == "number"]
+
+def _ts_ns(ts: pd.Series) -> tuple[np.ndarray, int]:
+    """ts as int64 UTC epoch ns, plus the number of rows not carrying a UTC-aware time.
+
+    Epoch numbers are UTC by definition; datetimes must be tz-aware and strings must
+    carry an offset. Unparseable values become NaT (int64 min) and count as not UTC.
+    """
+    if pd.api.types.is_numeric_dtype(ts):
+        ns = pd.to_datetime(ts, unit="s", utc=True)
+        naive = np.zeros(len(ts), dtype=bool)
+    elif isinstance(ts.dtype, pd.DatetimeTZDtype):
+        ns = ts.dt.tz_convert("UTC")
+        naive = np.zeros(len(ts), dtype=bool)
+    elif pd.api.types.is_datetime64_dtype(ts):
+        ns = ts.dt.tz_localize("UTC")
+        naive = np.ones(len(ts), dtype=bool)
+    else:
+        s = ts.astype("string")
+        ns = pd.to_datetime(s, utc=True, errors="coerce", format="ISO8601")
+        naive = ~s.str.contains(r"(?:Z|[+-]\d{2}:?\d{2})$", regex=True, na=False).to_numpy(dtype=bool)
+    bad = naive | ns.isna().to_numpy()
+    return ns.to_numpy(dtype="datetime64[ns]").view("int64"), int(bad.sum())
+
+def check_candles(df: pd.DataFrame, *, schema_path: str | Path = CANDLE_SCHEMA,
+                  spike_threshold: float = DEFAULT_SPIKE_THRESHOLD) -> Dict[str, Any]:
+    """Columnar data-quality checks for a CandleV1 frame; returns violation counts.
+
+    Every check is an array operation over the whole frame (no per-row JSON
+    validation), so this is cheap enough to run on every fetch before upsert:
+
+    - missing_columns: required schema columns absent from the frame
+    - non_numeric: values in number-typed columns that are not numbers (NaN excluded)
+    - symbol_null: rows without a symbol
+    - ohlc_inconsistent: high below open/close/low, or low above open/close/high
+    - negative_volume: volume < 0
+    - ts_not_utc: naive or unparseable timestamps
+    - ts_not_monotonic / duplicate_ts: per symbol, in row order
+    - nan_prices: rows with a NaN open/high/low/close
+    - price_spikes: close-to-close log moves above `spike_threshold` within a symbol
+    """
+    required, numeric = candle_columns(schema_path)
+    counts: Dict[str, int] = {}
+    missing = [c for c in required if c not in df.columns]
+    n = int(len(df))
+
+    num: Dict[str, np.ndarray] = {}
+    non_numeric = 0
+    for c in numeric:
+        if c not in df.columns:
+            continue
+        col = df[c]
+        if not pd.api.types.is_numeric_dtype(col):
+            coerced = pd.to_numeric(col, errors="coerce")
+            non_numeric += int((coerced.isna() & col.notna()).sum())
+            col = coerced
+        num[c] = col.to_numpy(dtype="float64", na_value=np.nan)
+    counts["non_numeric"] = non_numeric
+
+    symbols = df["symbol"] if "symbol" in df.columns else pd.Series([None] * n, index=df.index)
+    counts["symbol_null"] = int(symbols.isna().sum()) if "symbol" in df.columns else 0
+
+    nan = np.full(n, np.nan)
+    o, h, l, c = (num.get(k, nan) for k in _PRICES)
+    with np.errstate(invalid="ignore"):
+        bad_high = (h < np.fmax(np.fmax(o, c), l))
+        bad_low = (l > np.fmin(np.fmin(o, c), h))
+        counts["ohlc_inconsistent"] = int((bad_high | bad_low).sum())
+        counts["negative_volume"] = int((num["volume"] < 0).sum()) if "volume" in num else 0
+    present = [num[k] for k in _PRICES if k in num]
+    counts["nan_prices"] = int(np.logical_or.reduce([np.isnan(a) for a in present]).sum()) if present else 0
+
+    if "ts" in df.columns and n:
+        ts, counts["ts_not_utc"] = _ts_ns(df["ts"])
+        codes, _ = pd.factorize(symbols)
+        if (codes[1:] >= codes[:-1]).all():
+            order = slice(None)  # already grouped by symbol (the fetchers sort by symbol, ts)
+        else:
+            order = np.argsort(codes, kind="stable")  # row order kept within each symbol
+        same = codes[order][1:] == codes[order][:-1]
+        t = ts[order]
+        counts["ts_not_monotonic"] = int((same & (t[1:] < t[:-1])).sum())
+        counts["duplicate_ts"] = int((same & (t[1:] == t[:-1])).sum())
+        if "close" in num:
+            cl = num["close"][order]
+            with np.errstate(divide="ignore", invalid="ignore"):
+                moves = np.abs(np.log(cl[1:] / cl[:-1]))
+            counts["price_spikes"] = int((same & (moves > spike_threshold)).sum())
+        else:
+            counts["price_spikes"] = 0
+    else:
+        counts.update(ts_not_utc=0, ts_not_monotonic=0, duplicate_ts=0, price_spikes=0)
+
+    return {
+        "rows": n,
+        "missing_columns": missing,
+        "violations": counts,
+        "total": sum(counts.values()) + len(missing),
+    }
+
+def merge_quality(reports: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """One report from check_candles() reports of frames that split the rows by symbol.
+
+    Every check is per row or within a symbol, so the counts simply add up.
+    """
+    counts: Dict[str, int] = {}
+    missing: List[str] = []
+    for r in reports:
+        for k, v in r["violations"].items():
+            counts[k] = counts.get(k, 0) + int(v)
+        missing += [c for c in r["missing_columns"] if c not in missing]
+    return {
+        "rows": sum(int(r["rows"]) for r in reports),
+        "missing_columns": missing,
+        "violations": counts,
+        "total": sum(counts.values()) + len(missing),
+    }
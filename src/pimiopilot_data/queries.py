@@ -6,6 +6,8 @@ import psycopg2
 import psycopg2.extras
 import pandas as pd
 
+from . import metrics
+
 @dataclass
 class DBConn:
     host: Optional[str] = None
@@ -47,7 +49,52 @@ _ALLOWED_COLUMNS = {
     "ts","symbol","open","high","low","close","adj_close","volume","dividends","stock_splits","src_interval"
 }
 
+_SIGNAL_COLUMNS = {
+    "strategy","params_hash","symbol","ts","action","target_weight","confidence","params","extras","updated_at"
+}
+_SIGNAL_DEFAULT_COLUMNS = ["strategy", "params_hash", "symbol", "ts", "action", "target_weight", "confidence"]
+
+def query_columns(spec: dict) -> List[str]:
+    """Columns a spec returns, in order (spec.columns or the dataset's default)."""
+    if spec.get("columns"):
+        return list(spec["columns"])
+    return list(_SIGNAL_DEFAULT_COLUMNS) if spec.get("dataset") == "signals" else sorted(_ALLOWED_COLUMNS)
+
+def _build_signals_sql(spec: dict) -> tuple[str, list]:
+    """dataset=signals: rows of the strategy_signals hypertable, or the latest one per symbol."""
+    from .sinks.signals import SIGNALS_TABLE, build_latest_sql
+    cols = query_columns(spec)
+    unknown = [c for c in cols if c not in _SIGNAL_COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown columns in query: {unknown}")
+    if not spec.get("strategy"):
+        raise ValueError("dataset=signals requires strategy")
+    if spec.get("latest"):
+        return build_latest_sql(spec["strategy"], spec["symbols"], spec.get("params_hash"), columns=cols)
+
+    where = ["strategy = %s", "symbol = ANY(%s)", "ts >= %s AND ts < %s"]
+    tr = spec["time_range"]
+    placeholders: list = [spec["strategy"], spec["symbols"], tr["start"], tr["end"]]
+    if spec.get("params_hash"):
+        where.append("params_hash = %s")
+        placeholders.append(spec["params_hash"])
+    for filt in spec.get("filters", []) or []:
+        where.append(f"({filt})")
+    order_sql = ", ".join(spec.get("order_by") or ["ts ASC"])
+    limit = spec.get("limit")
+    limit_sql = f" LIMIT {int(limit)}" if limit else ""
+    sql = f"""
+    SELECT {", ".join(cols)}
+    FROM {SIGNALS_TABLE}
+    WHERE {' AND '.join(where)}
+    ORDER BY {order_sql}
+    {limit_sql}
+    """.strip()
+    return sql, placeholders
+
 def build_sql(spec: dict) -> tuple[str, list]:
+    if spec.get("dataset") == "signals":
+        return _build_signals_sql(spec)
     cols = spec.get("columns")
     if not cols:
         cols = sorted(_ALLOWED_COLUMNS)
@@ -111,6 +158,7 @@ def query_to_dataframe(spec: dict, conn: Optional[DBConn] = None, chunk_rows: Op
             cur.execute(sql, params)
             cols = [desc[0] for desc in cur.description]
             rows = cur.fetchall()
+    metrics.DB_ROUND_TRIPS.inc(op="query")
     return pd.DataFrame(rows, columns=cols)
 
 def iter_query_chunks(spec: dict, conn: Optional[DBConn] = None, chunksize: int = 100_000) -> Iterable[pd.DataFrame]:
@@ -123,7 +171,8 @@ def iter_query_chunks(spec: dict, conn: Optional[DBConn] = None, chunksize: int
             cur.itersize = chunksize
             cur.execute(sql, params)
             while True:
-                rows = cur.fetchmany(chunksize)
+                rows = cur.fetchmany(chunksize)  # one FETCH on the server-side cursor
+                metrics.DB_ROUND_TRIPS.inc(op="fetch")
                 if not rows:
                     break
                 yield pd.DataFrame(rows, columns=[desc[0] for desc in cur.description])
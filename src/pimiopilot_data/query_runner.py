@@ -4,12 +4,38 @@ from pathlib import Path
 from typing import Tuple, List, Optional
 import pandas as pd
 
-from .validator import load_and_validate
 from .io.ndjson_logger import NDJSONLogger
-from .io.csv_writer import write_csv
-from .queries import query_to_dataframe, iter_query_chunks
+from . import metrics
 from .timeutil import parse_relative_range
 
+_BACKENDS = ("timescaledb", "parquet")
+
+def backend_name(spec: dict) -> str:
+    """spec.backend, else PPDATA_QUERY_BACKEND, else timescaledb."""
+    return spec.get("backend") or os.getenv("PPDATA_QUERY_BACKEND", "timescaledb")
+
+def _select_backend(spec: dict):
+    """Resolve (name, to_dataframe, iter_chunks) from spec.backend or PPDATA_QUERY_BACKEND."""
+    name = backend_name(spec)
+    if name not in _BACKENDS:
+        raise ValueError(f"Unsupported query backend: {name}")
+    if name == "parquet":
+        from .lake import lake_query_to_dataframe, iter_lake_chunks
+        return name, lake_query_to_dataframe, iter_lake_chunks
+    from .queries import query_to_dataframe, iter_query_chunks
+    return name, query_to_dataframe, iter_query_chunks
+
+def resolve_time_range(spec: dict) -> dict:
+    """Expand time_range.relative into start/end in place (relative takes precedence)."""
+    tr = spec.get("time_range") or {}
+    rel = tr.get("relative")
+    if rel:
+        intervals = spec.get("intervals") or []
+        start_iso, end_iso = parse_relative_range(rel, intervals=intervals)
+        tr["start"], tr["end"] = start_iso, end_iso
+        spec["time_range"] = tr
+    return spec
+
 def _default_filename(spec: dict) -> str:
     syms = "-".join(sorted(spec["symbols"]))[:40].replace("/","_")
     start = spec["time_range"]["start"].replace(":","").replace("-","").replace("T","").replace("Z","")
@@ -24,14 +50,7 @@ def run_query(spec: dict, schema_version: str = "1") -> Tuple[dict, Optional[pd.
     out_dir = Path(out_cfg["path"])
     out_dir.mkdir(parents=True, exist_ok=True)
 
-    # --- relative support: expand to start/end if time_range.relative is provided ---
-    tr = spec.get("time_range") or {}
-    rel = tr.get("relative")
-    if rel:
-        intervals = spec.get("intervals") or []
-        start_iso, end_iso = parse_relative_range(rel, intervals=intervals)
-        tr["start"], tr["end"] = start_iso, end_iso
-        spec["time_range"] = tr
+    resolve_time_range(spec)
 
     base = out_cfg.get("filename") or _default_filename(spec)
     fmt = out_cfg["format"]
@@ -45,7 +64,8 @@ def run_query(spec: dict, schema_version: str = "1") -> Tuple[dict, Optional[pd.
     manifest_path = out_dir / f"{base}.manifest.json"
     logger = NDJSONLogger(log_path)
 
-    logger.log("query_start", spec=spec)
+    backend, fetch_df, fetch_chunks = _select_backend(spec)
+    logger.log("query_start", spec=spec, backend=backend)
 
     rows_written = 0
     file_path = None
@@ -58,7 +78,7 @@ def run_query(spec: dict, schema_version: str = "1") -> Tuple[dict, Optional[pd.
             # stream
             mode = "w"
             header = include_header
-            for chunk in iter_query_chunks(spec, chunksize=chunk_size):
+            for chunk in fetch_chunks(spec, chunksize=chunk_size):
                 if chunk.empty:
                     continue
                 chunk.to_csv(csv_path, index=False, mode=mode, header=header)
@@ -66,7 +86,7 @@ def run_query(spec: dict, schema_version: str = "1") -> Tuple[dict, Optional[pd.
                 mode = "a"
                 header = False
         else:
-            df = query_to_dataframe(spec)
+            df = fetch_df(spec)
             if not df.empty:
                 df.to_csv(csv_path, index=False, header=include_header)
                 rows_written = len(df)
@@ -79,11 +99,11 @@ def run_query(spec: dict, schema_version: str = "1") -> Tuple[dict, Optional[pd.
         nd_path = out_dir / (base + ".ndjson")
         file_path = nd_path
         with nd_path.open("w", encoding="utf-8") as f:
-            for chunk in iter_query_chunks(spec, chunksize=chunk_size or 100_000):
+            for chunk in fetch_chunks(spec, chunksize=chunk_size or 100_000):
                 if chunk.empty:
                     continue
                 for rec in chunk.to_dict(orient="records"):
-                    f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+                    f.write(json.dumps(rec, ensure_ascii=False, default=str) + "\n")
                 rows_written += len(chunk)
 
     elif fmt == "parquet":
@@ -94,7 +114,7 @@ def run_query(spec: dict, schema_version: str = "1") -> Tuple[dict, Optional[pd.
             # accumulate chunks in memory cautiously
             frames: List[pd.DataFrame] = []
             n = 0
-            for chunk in iter_query_chunks(spec, chunksize=chunk_size):
+            for chunk in fetch_chunks(spec, chunksize=chunk_size):
                 if not chunk.empty:
                     frames.append(chunk)
                     rows_written += len(chunk)
@@ -102,13 +122,30 @@ def run_query(spec: dict, schema_version: str = "1") -> Tuple[dict, Optional[pd.
             df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
             df.to_parquet(pq_path, index=False)
         else:
-            df = query_to_dataframe(spec)
+            df = fetch_df(spec)
             rows_written = len(df)
             df.to_parquet(pq_path, index=False)
+    elif fmt in ("arrow", "feather"):
+        # Arrow IPC file (Feather v2): record batches appended as chunks leave the cursor
+        from .io.arrow_ipc import query_schema, write_arrow_ipc
+        from .queries import query_columns
+        ipc_path = out_dir / (base + "." + fmt)
+        file_path = ipc_path
+        rows_written = write_arrow_ipc(
+            fetch_chunks(spec, chunksize=chunk_size or 100_000),
+            ipc_path,
+            compression=out_cfg.get("compression"),
+            schema=query_schema(query_columns(spec)),
+        )
     else:
         raise ValueError(f"Unsupported output.format: {fmt}")
 
     elapsed = round(time.time() - t0, 3)
+    labels = {"format": fmt, "backend": backend}
+    metrics.QUERY_SECONDS.observe(time.time() - t0, **labels)
+    metrics.ROWS_EXPORTED.inc(rows_written, **labels)
+    if file_path is not None and file_path.exists():
+        metrics.BYTES_EXPORTED.inc(file_path.stat().st_size, **labels)
     summary = {
         "schema": {"query_config_schema": "schemas/query.schema.json", "version": schema_version},
         "query": {
@@ -116,6 +153,7 @@ def run_query(spec: dict, schema_version: str = "1") -> Tuple[dict, Optional[pd.
             "intervals": spec.get("intervals"),
             "time_range": spec["time_range"],
             "columns": spec.get("columns"),
+            "backend": backend,
         },
         "artifacts": {
             "result": str(file_path) if file_path else None,
@@ -130,6 +168,7 @@ def run_query(spec: dict, schema_version: str = "1") -> Tuple[dict, Optional[pd.
 
     Path(manifest_path).write_text(json.dumps(summary, ensure_ascii=False, indent=2), encoding="utf-8")
     logger.log("query_end", seconds=elapsed, rows=rows_written)
+    logger.close()
 
     # For convenience: if result is small and format is parquet/csv w/o streaming, return df; else None
     df_out = None
@@ -155,9 +194,11 @@ def run_query(spec: dict, schema_version: str = "1") -> Tuple[dict, Optional[pd.
         legacy_csv = out_dir / f"{base}.csv"
         legacy_log = out_dir / f"{base}.log.ndjson"
         legacy_manifest = out_dir / f"{base}.manifest.json"
+        legacy_ipc = out_dir / f"{base}.{fmt}"
 
         # Fetch-style destinations
         dst_csv = run_dir / "data.csv"
+        dst_ipc = run_dir / f"data.{fmt}"
         dst_log = run_dir / "logs.ndjson"
         dst_summary = run_dir / "summary.json"
 
@@ -169,6 +210,8 @@ def run_query(spec: dict, schema_version: str = "1") -> Tuple[dict, Optional[pd.
                 shutil.move(str(legacy_log), str(dst_log))
             if legacy_manifest.exists():
                 shutil.move(str(legacy_manifest), str(dst_summary))
+            if fmt in ("arrow", "feather") and legacy_ipc.exists():
+                shutil.move(str(legacy_ipc), str(dst_ipc))
         except Exception:
             # best-effort; don't fail overall query
             pass
@@ -177,6 +220,7 @@ def run_query(spec: dict, schema_version: str = "1") -> Tuple[dict, Optional[pd.
         new_artifacts = {
             "out_dir": str(run_dir),
             "csv": str(dst_csv) if dst_csv.exists() else artifacts.get("csv"),
+            "data": str(dst_ipc) if fmt in ("arrow", "feather") and dst_ipc.exists() else None,
             "log_ndjson": str(dst_log) if dst_log.exists() else artifacts.get("log_ndjson"),
             "result": str(dst_summary) if dst_summary.exists() else artifacts.get("result"),
             "rows": artifacts.get("rows"),
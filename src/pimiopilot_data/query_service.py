@@ -0,0 +1,359 @@
+from __future__ import annotations
+import json, os, socket, socketserver, threading, time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, BinaryIO, Callable, Dict, Iterable, Optional
+import pandas as pd
+import psycopg2.pool
+from jsonschema import Draft202012Validator
+
+from .io.ndjson_logger import NDJSONLogger
+from . import metrics
+from .queries import DBConn, build_sql, query_columns, _maybe_debug
+from .query_runner import backend_name, resolve_time_range, _select_backend
+
+_FORMATS = ("ndjson", "arrow")
+_CONTENT_TYPES = {"ndjson": "application/x-ndjson", "arrow": "application/vnd.apache.arrow.stream"}
+
+class QueryService:
+    """Warm query executor: compiled spec schema + pooled DB connections.
+
+    Specs are the same as for `cli query`, except that `output` is optional
+    (results are streamed back to the caller instead of written to disk).
+    """
+    def __init__(
+        self,
+        schema_path: str | Path = Path("schemas") / "query.schema.json",
+        conn: Optional[DBConn] = None,
+        pool_size: int = 4,
+        log_path: str | Path = "out/query_service.log.ndjson",
+        chunk_rows: int = 10_000,
+    ):
+        schema = json.loads(Path(schema_path).read_text(encoding="utf-8"))
+        schema["required"] = [r for r in schema.get("required", []) if r != "output"]
+        self._validator = Draft202012Validator(schema)
+        self._conn_cfg = conn
+        self._pool_size = pool_size
+        self._pool: Optional[psycopg2.pool.ThreadedConnectionPool] = None
+        self._pool_lock = threading.Lock()
+        # ThreadedConnectionPool raises when exhausted; make callers wait instead
+        self._slots = threading.BoundedSemaphore(pool_size)
+        self.chunk_rows = chunk_rows
+        self.logger = NDJSONLogger(log_path)
+        self.logger.log("service_init", pool_size=pool_size)
+
+    def _get_pool(self) -> psycopg2.pool.ThreadedConnectionPool:
+        with self._pool_lock:
+            if self._pool is None:
+                cfg = self._conn_cfg or DBConn.from_env()
+                if cfg.dsn:
+                    self._pool = psycopg2.pool.ThreadedConnectionPool(1, self._pool_size, cfg.dsn)
+                else:
+                    self._pool = psycopg2.pool.ThreadedConnectionPool(
+                        1, self._pool_size,
+                        host=cfg.host, dbname=cfg.dbname, user=cfg.user, password=cfg.password, port=cfg.port,
+                    )
+            return self._pool
+
+    @contextmanager
+    def connection(self):
+        with self._slots:
+            pool = self._get_pool()
+            c = pool.getconn()
+            broken = False
+            try:
+                yield c
+                c.rollback()  # end the read transaction; keep the connection clean for the next caller
+            except Exception:
+                broken = c.closed != 0
+                raise
+            finally:
+                pool.putconn(c, close=broken)
+
+    def close(self) -> None:
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.closeall()
+                self._pool = None
+        self.logger.close()
+
+    def prepare(self, spec: Dict[str, Any]) -> Dict[str, Any]:
+        self._validator.validate(spec)
+        return resolve_time_range(spec)
+
+    def iter_frames(self, spec: Dict[str, Any]) -> Iterable[pd.DataFrame]:
+        backend, _, fetch_chunks = _select_backend(spec)
+        if backend != "timescaledb":
+            yield from fetch_chunks(spec, chunksize=self.chunk_rows)
+            return
+        sql, params = build_sql(spec)
+        _maybe_debug(sql, params)
+        with self.connection() as c:
+            # named = server-side cursor: rows stay on the server until fetched, a chunk at a time
+            with c.cursor(name="pp_service_stream") as cur:
+                cur.itersize = self.chunk_rows
+                cur.execute(sql, params)
+                metrics.DB_ROUND_TRIPS.inc(op="query")
+                while True:
+                    rows = cur.fetchmany(self.chunk_rows)  # one FETCH on the server-side cursor
+                    metrics.DB_ROUND_TRIPS.inc(op="fetch")
+                    if not rows:
+                        break
+                    yield pd.DataFrame(rows, columns=[d[0] for d in cur.description])
+
+    def stream(self, spec: Dict[str, Any], fmt: str, out: BinaryIO,
+               on_start: Optional[Callable[[], None]] = None) -> int:
+        """Run a validated spec and write results to `out`. Returns rows written.
+
+        The first chunk is fetched before anything is written, and `on_start` (e.g.
+        sending response headers) runs just before the first byte. An exception raised
+        before then leaves `out` untouched, so the caller can still report it; one
+        raised later means a truncated stream, which only the transport can signal.
+        """
+        if fmt not in _FORMATS:
+            raise ValueError(f"Unsupported stream format: {fmt}")
+        t0 = time.perf_counter()
+        out = _CountingWriter(out)
+        started = False
+
+        def start() -> None:
+            nonlocal started
+            if not started:
+                started = True
+                if on_start is not None:
+                    on_start()
+
+        rows = 0
+        if fmt == "ndjson":
+            for chunk in self.iter_frames(spec):
+                lines = [json.dumps(rec, ensure_ascii=False, default=str) for rec in chunk.to_dict(orient="records")]
+                if lines:
+                    start()
+                    out.write(("\n".join(lines) + "\n").encode("utf-8"))
+                rows += len(chunk)
+            start()
+        else:
+            import pyarrow as pa
+            from .io.arrow_ipc import query_schema, to_record_batch
+            schema = query_schema(query_columns(spec))
+            writer = None
+            for chunk in self.iter_frames(spec):
+                if chunk.empty:
+                    continue
+                batch = to_record_batch(chunk, schema)
+                if writer is None:
+                    start()
+                    writer = pa.ipc.new_stream(out, schema)
+                writer.write_batch(batch)
+                rows += len(chunk)
+            if writer is None:
+                start()
+                writer = pa.ipc.new_stream(out, schema)
+            writer.close()
+        out.flush()
+        seconds = time.perf_counter() - t0
+        labels = {"format": fmt, "backend": backend_name(spec)}
+        metrics.QUERY_SECONDS.observe(seconds, **labels)
+        metrics.ROWS_EXPORTED.inc(rows, **labels)
+        metrics.BYTES_EXPORTED.inc(out.bytes, **labels)
+        self.logger.log("query_served", format=fmt, rows=rows, bytes=out.bytes, seconds=round(seconds, 6))
+        return rows
+
+class _CountingWriter:
+    """Binary stream wrapper that counts bytes written (pyarrow accepts any object with write())."""
+    def __init__(self, raw: BinaryIO):
+        self.raw = raw
+        self.bytes = 0
+
+    def write(self, data) -> int:
+        self.raw.write(data)
+        n = memoryview(data).nbytes
+        self.bytes += n
+        return n
+
+    def flush(self) -> None:
+        self.raw.flush()
+
+    @property
+    def closed(self) -> bool:
+        return getattr(self.raw, "closed", False)
+
+def _status_line(status: str, **fields: Any) -> bytes:
+    return (json.dumps({"status": status, **fields}, ensure_ascii=False) + "\n").encode("utf-8")
+
+def _error_line(e: Exception) -> bytes:
+    return _status_line("error", error=str(e))
+
+class _ChunkedWriter:
+    """HTTP/1.1 chunked transfer encoding over a handler's wfile.
+
+    finish() sends the terminating chunk; a body without it is an incomplete
+    transfer to every HTTP client, which is how a failure mid-stream is signalled.
+    """
+    def __init__(self, raw: BinaryIO):
+        self.raw = raw
+
+    def write(self, data) -> int:
+        n = memoryview(data).nbytes
+        if n:
+            self.raw.write(b"%x\r\n" % n)
+            self.raw.write(data)
+            self.raw.write(b"\r\n")
+        return n
+
+    def flush(self) -> None:
+        self.raw.flush()
+
+    def finish(self) -> None:
+        self.raw.write(b"0\r\n\r\n")
+        self.raw.flush()
+
+class _UnixHandler(socketserver.StreamRequestHandler):
+    """One request per connection: a JSON line {"spec": {...}, "format": "ndjson"|"arrow"}.
+
+    The response is the NDJSON/Arrow result followed by one status line,
+    {"status": "ok", "rows": N} or {"status": "error", "error": "..."}, also after a
+    failure mid-stream. A response without it was cut off (see split_response).
+    """
+    def handle(self):
+        service: QueryService = self.server.service
+        started = False
+
+        def start():
+            nonlocal started
+            started = True
+
+        try:
+            req = json.loads(self.rfile.readline())
+            fmt = req.get("format", "ndjson")
+            spec = service.prepare(req["spec"])
+            trailer = _status_line("ok", rows=service.stream(spec, fmt, self.wfile, on_start=start))
+        except Exception as e:
+            service.logger.log("query_error", error=str(e), streaming=started)
+            trailer = _error_line(e)
+        self.wfile.write(trailer)
+
+class _HTTPHandler(BaseHTTPRequestHandler):
+    """POST /query with the spec as JSON body; ?format=arrow for Arrow IPC. GET /metrics for Prometheus.
+
+    Results use chunked transfer encoding; the status line waits for the first chunk, so a
+    failing query is a 400/500 with a JSON error body. A failure after that drops the
+    connection without the final chunk, which clients see as an incomplete response.
+    """
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.close_connection = True
+        metrics.send_metrics(self)
+
+    def _send_error_json(self, status: int, e: Exception) -> None:
+        body = _error_line(e)
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        self.close_connection = True
+        service: QueryService = self.server.service
+        path, _, qs = self.path.partition("?")
+        if path != "/query":
+            self.send_error(404)
+            return
+        fmt = dict(p.split("=", 1) for p in qs.split("&") if "=" in p).get("format", "ndjson")
+        try:
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            spec = service.prepare(json.loads(body))
+            if fmt not in _FORMATS:
+                raise ValueError(f"Unsupported stream format: {fmt}")
+        except Exception as e:
+            self._send_error_json(400, e)
+            return
+        out = _ChunkedWriter(self.wfile)
+        started = False
+
+        def start():
+            nonlocal started
+            started = True
+            self.send_response(200)
+            self.send_header("Content-Type", _CONTENT_TYPES[fmt])
+            self.send_header("Transfer-Encoding", "chunked")
+            self.send_header("Connection", "close")
+            self.end_headers()
+
+        try:
+            service.stream(spec, fmt, out, on_start=start)
+            out.finish()
+        except Exception as e:
+            service.logger.log("query_error", error=str(e), streaming=started)
+            if not started:
+                self._send_error_json(500, e)
+
+    def log_message(self, format, *args):
+        pass  # requests are logged as NDJSON by the service
+
+class _FlushOnClose:
+    def server_close(self):
+        super().server_close()
+        self.service.logger.flush()
+
+class _UnixServer(_FlushOnClose, socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+class _HTTPServer(_FlushOnClose, ThreadingHTTPServer):
+    daemon_threads = True
+
+def make_server(service: QueryService, *, socket_path: Optional[str] = None, host: str = "127.0.0.1", port: int = 8765):
+    """Build a threaded server bound to a Unix socket (if given) or localhost HTTP."""
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        srv = _UnixServer(socket_path, _UnixHandler)
+    else:
+        srv = _HTTPServer((host, port), _HTTPHandler)
+    srv.service = service
+    return srv
+
+def serve(service: QueryService, **kwargs) -> None:
+    srv = make_server(service, **kwargs)
+    service.logger.log("service_start", address=str(srv.server_address))
+    try:
+        srv.serve_forever()
+    finally:
+        srv.server_close()
+        service.close()
+
+def split_response(body: bytes) -> tuple[bytes, Dict[str, Any]]:
+    """(result, status) of a Unix socket response; ValueError if it has no status line (truncated).
+
+    The status line starts at the last `{"status": ` of the body: JSON escapes quotes inside
+    values, so the line cannot contain that sequence again (an Arrow result need not end
+    with a newline, so "the last line" would not do).
+    """
+    cut = body.rfind(b'{"status": ')
+    status = None
+    if cut >= 0 and body.endswith(b"\n"):
+        try:
+            status = json.loads(body[cut:])
+        except ValueError:
+            pass
+    if not isinstance(status, dict) or status.get("status") not in ("ok", "error"):
+        raise ValueError("truncated response: no status line")
+    return body[:cut], status
+
+def query_socket(socket_path: str, spec: Dict[str, Any], fmt: str = "ndjson") -> bytes:
+    """Minimal client for the Unix socket API; returns the raw response body (result + status line)."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+        s.connect(socket_path)
+        s.sendall((json.dumps({"spec": spec, "format": fmt}) + "\n").encode("utf-8"))
+        s.shutdown(socket.SHUT_WR)
+        chunks = []
+        while True:
+            data = s.recv(65536)
+            if not data:
+                break
+            chunks.append(data)
+    return b"".join(chunks)
@@ -0,0 +1,53 @@
+from __future__ import annotations
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional
+import pandas as pd
+
+from .trading_calendar import TradingCalendar, bar_delta, default_calendar
+
+# Coarser bars built from fetched finer ones, so a job makes one provider call per
+# symbol however many intervals it stores. Intraday buckets are anchored at the session
+# open (09:00 Asia/Taipei for TWSE); 1d bars are one per local trading day, stamped at
+# local midnight like the provider's daily bars.
+
+_AGG = {"open": "first", "high": "max", "low": "min", "close": "last", "volume": "sum",
+        "adj_close": "last", "dividends": "sum", "stock_splits": "max"}
+
+def derivable(src: str, dst: str) -> bool:
+    """Whether `dst` bars can be built from `src` bars (a whole multiple, or 1d from intraday)."""
+    if src == "1d":
+        return False
+    if dst == "1d":
+        return True
+    s, d = bar_delta(src), bar_delta(dst)
+    return d > s and d % s == pd.Timedelta(0)
+
+def check_derivable(src: str, targets: Iterable[str]) -> List[str]:
+    """`targets` without duplicates or `src`; ValueError if one cannot be derived from `src`."""
+    out = [t for t in dict.fromkeys(targets) if t != src]
+    bad = [t for t in out if not derivable(src, t)]
+    if bad:
+        raise ValueError(f"cannot derive {bad} from {src} bars")
+    return out
+
+def resample_candles(df: pd.DataFrame, interval: str, calendar: Optional[TradingCalendar] = None) -> pd.DataFrame:
+    """OHLCV bars of `df` (CandleV1 rows, any symbols) aggregated to `interval`, sorted by symbol, ts."""
+    calendar = calendar or default_calendar()
+    if df is None or df.empty:
+        return df
+    ts = pd.to_datetime(df["ts"], utc=True)
+    if interval == "1d":
+        bucket = ts.dt.tz_convert(calendar.timezone).dt.normalize()
+    else:
+        step = bar_delta(interval)
+        origin = pd.Timestamp(datetime.combine(date(2000, 1, 3), calendar.open)).tz_localize(calendar.timezone)
+        bucket = origin + ((ts - origin) // step) * step
+    agg = {c: f for c, f in _AGG.items() if c in df.columns}
+    out = df.assign(ts=bucket.dt.tz_convert("UTC")).groupby(["symbol", "ts"], sort=True).agg(agg).reset_index()
+    return out[[c for c in df.columns if c in out.columns]]
+
+def derive_intervals(df: pd.DataFrame, src: str, targets: Iterable[str],
+                     calendar: Optional[TradingCalendar] = None) -> Dict[str, pd.DataFrame]:
+    """{interval: resampled frame} for each derivable target of `src` bars."""
+    calendar = calendar or default_calendar()
+    return {t: resample_candles(df, t, calendar) for t in check_derivable(src, targets)}
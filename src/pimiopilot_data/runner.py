@@ -1,5 +1,6 @@
 from __future__ import annotations
 import json, time, os
+from contextlib import contextmanager
 from pathlib import Path
 from types import SimpleNamespace
 from typing import Tuple
@@ -8,15 +9,19 @@ from datetime import datetime
 import pytz
 from dateutil.relativedelta import relativedelta
 
-from .models import Job, RangeSpec, OutputSpec, YFOpts, RetentionSpec
+from .models import Job, RangeSpec, OutputSpec, YFOpts, RetentionSpec, ReplayOpts, PipelineOpts
 from .io.ndjson_logger import NDJSONLogger
 from .io.csv_writer import write_csv
 
-from .io.parquet_writer import write_parquet
+from .io.parquet_writer import write_parquet, ParquetStreamWriter
 from .io.manifest import stable_spec, spec_hash, write_manifest
 from .io.json_validator import validate_json
+from .quality import check_candles, merge_quality
+from .resample import derive_intervals
+from .pipeline import Stage, run_pipeline
 
-from .fetchers import yf_client
+from .fetchers import fetcher_for
+from . import events, metrics
 from .sinks.timescaledb import upsert_prices, TSConfig, purge_older_than
 
 def _parse_relative(spec: str):
@@ -43,11 +48,72 @@ def resolve_date_range(rng: RangeSpec, tz: str = "Asia/Taipei") -> tuple[str, st
     else:
         return rng.start, rng.end or today.isoformat()
 
+@contextmanager
+def _phase(logger: NDJSONLogger, labels: dict, name: str, **fields):
+    """logger.span that also records the phase duration in metrics.PHASE_SECONDS."""
+    t0 = time.perf_counter()
+    try:
+        with logger.span(name, **fields) as sp:
+            yield sp
+    finally:
+        metrics.PHASE_SECONDS.observe(time.perf_counter() - t0, phase=name, **labels)
+
+def _fetch(job, labels: dict, *, fetcher=None, symbols=None, retries: int = 0, backoff: float = 1.0,
+           **kwargs) -> pd.DataFrame:
+    """fetcher.fetch with up to `retries` more attempts, `backoff` * 2**n seconds apart."""
+    fetcher = fetcher or fetcher_for(job)
+    for attempt in range(retries + 1):
+        try:
+            df = fetcher.fetch(job.symbols if symbols is None else symbols, **kwargs)
+            break
+        except Exception:
+            metrics.FETCH_ERRORS.inc(**labels)
+            if attempt == retries:
+                raise
+            metrics.FETCH_RETRIES.inc(**labels)
+            time.sleep(backoff * 2 ** attempt)
+    metrics.ROWS_FETCHED.inc(len(df), **labels)
+    return df
+
+def _retention_cutoff(val: str) -> str:
+    """delete_older_than ("30d", "6m", ... or a YYYY-MM-DD date) as a cutoff date."""
+    if val[-1] in "dwmy":
+        today = datetime.now(pytz.timezone("Asia/Taipei")).date()
+        return (today - _parse_relative(val)).isoformat()
+    return val
+
+def _apply_retention(job, logger: NDJSONLogger, labels: dict) -> int:
+    """Delete the job's rows older than retention.delete_older_than; failures are logged, not raised."""
+    retention = getattr(job, "retention", None)
+    val = getattr(retention, "delete_older_than", None)
+    if not val:
+        return 0
+    cutoff = _retention_cutoff(val)
+    try:
+        cfg = TSConfig.from_env()
+        with _phase(logger, labels, "retention", cutoff=cutoff) as sp:
+            deleted = purge_older_than(cfg, cutoff, job.symbols)
+            sp["rows"] = deleted
+        metrics.ROWS_DELETED.inc(deleted, **labels)
+        logger.log("retention_delete_done", cutoff=cutoff, rows=deleted)
+        return deleted
+    except Exception as e:
+        logger.log("retention_delete_error", error=str(e))
+        return 0
+
+def _job_succeeded(labels: dict, rows: int, seconds: float) -> None:
+    metrics.JOBS.inc(status="ok", **labels)
+    metrics.JOB_ROWS_PER_SECOND.set(rows / seconds if seconds > 0 else 0.0, **labels)
+    metrics.JOB_LAST_SUCCESS.set(time.time(), **labels)
+
 def _materialize_job(raw: dict) -> Job:
     rng = RangeSpec(**raw["range"])
     outs = OutputSpec(**raw["outputs"])
     yfopts = YFOpts(**raw.get("yfinance_options", {}))
     retention = RetentionSpec(**raw.get("retention", {})) if "retention" in raw else None
+    replay = ReplayOpts(**raw["replay_options"]) if "replay_options" in raw else None
+    derived = list(raw.get("derive_intervals") or [])
+    pipeline = PipelineOpts(**raw.get("pipeline", {}))
     job = Job(
         task_id=raw["task_id"],
         source=raw["source"],
@@ -57,6 +123,9 @@ def _materialize_job(raw: dict) -> Job:
         outputs=outs,
         yfinance_options=yfopts,
         retention=retention,
+        replay_options=replay,
+        derive_intervals=derived,
+        pipeline=pipeline,
         raw=raw,
     )
     return job
@@ -69,6 +138,7 @@ def run_job(validated_cfg: dict, schema_version: str = "2025-08-24") -> Tuple[di
     log_path = out_dir / "logs.ndjson"
     summary_path = out_dir / "summary.json"
     logger = NDJSONLogger(log_path)
+    labels = metrics.job_labels(job.task_id, job.symbols, job.interval)
     t0 = time.time()
 
     start, end = resolve_date_range(job.range)
@@ -76,18 +146,21 @@ def run_job(validated_cfg: dict, schema_version: str = "2025-08-24") -> Tuple[di
     logger.log("job_start", task_id=job.task_id, symbols=job.symbols, interval=job.interval, start=start, end=end)
 
     # Fetch data
-    df = yf_client.fetch(
-        job.symbols,
-        interval=job.interval,
-        start=start,
-        end=end,
-        options={
-            "auto_adjust": job.yfinance_options.auto_adjust,
-            "actions": job.yfinance_options.actions,
-            "prepost": job.yfinance_options.prepost,
-            "threads": job.yfinance_options.threads,
-        },
-    )
+    with _phase(logger, labels, "fetch", symbols=len(job.symbols)):
+        df = _fetch(
+            job,
+            labels,
+            interval=job.interval,
+            start=start,
+            end=end,
+            options={
+                "auto_adjust": job.yfinance_options.auto_adjust,
+                "actions": job.yfinance_options.actions,
+                "prepost": job.yfinance_options.prepost,
+                "threads": job.yfinance_options.threads,
+                "max_concurrency": job.yfinance_options.max_concurrency,
+            },
+        )
     logger.log("fetch_done", rows=int(df.shape[0]), cols=int(df.shape[1]))
 
     # Optional CSV output
@@ -96,31 +169,42 @@ def run_job(validated_cfg: dict, schema_version: str = "2025-08-24") -> Tuple[di
         csv_path = write_csv(df, job.outputs.out_dir, job.outputs.csv_filename, job.outputs.csv_fields)
         logger.log("csv_written", path=csv_path)
 
-    # TimescaleDB upsert
+    # Data-quality counts (reported, not enforced)
+    with _phase(logger, labels, "validate", rows=int(df.shape[0])):
+        quality = check_candles(df)
+    logger.log("quality_checked", total=quality["total"], violations=quality["violations"])
+
+    # Coarser intervals built locally from the fetched bars (no extra provider calls)
+    frames = {job.interval: df}
+    if job.derive_intervals:
+        with _phase(logger, labels, "derive", intervals=job.derive_intervals):
+            frames.update(derive_intervals(df, job.interval, job.derive_intervals))
+
+    # TimescaleDB upsert; each frame is tagged with its own src_interval
     upsert_rows = 0
     try:
         cfg = TSConfig.from_env()
-        upsert_rows = upsert_prices(df, interval=job.interval, cfg=cfg)
-        logger.log("timescaledb_upsert_done", rows=upsert_rows, table=cfg.table, db=cfg.dbname or "dsn")
+        for interval, frame in frames.items():
+            with _phase(logger, labels, "upsert", rows=int(frame.shape[0]), interval=interval):
+                n = upsert_prices(frame, interval=interval, cfg=cfg)
+            upsert_rows += n
+            metrics.ROWS_UPSERTED.inc(n, **labels)
+            logger.log("timescaledb_upsert_done", rows=n, interval=interval, table=cfg.table, db=cfg.dbname or "dsn")
     except Exception as e:
         logger.log("timescaledb_upsert_error", error=str(e))
+        logger.close()
+        metrics.JOBS.inc(status="error", **labels)
         # Propagate to mark job as failed
         raise
 
     deleted_rows = 0
     if job.retention and job.retention.delete_older_than:
-        cutoff = None
-        val = job.retention.delete_older_than
-        if val and (val[-1] in "dwmy"):
-            tzinfo = pytz.timezone("Asia/Taipei")
-            today = datetime.now(tzinfo).date()
-            cutoff = today - _parse_relative(val)
-            cutoff = cutoff.isoformat()
-        else:
-            cutoff = val
+        cutoff = _retention_cutoff(job.retention.delete_older_than)
         try:
             cfg = TSConfig.from_env()
-            deleted_rows = purge_older_than(cfg, cutoff, job.symbols)
+            with _phase(logger, labels, "retention", cutoff=cutoff):
+                deleted_rows = purge_older_than(cfg, cutoff, job.symbols)
+            metrics.ROWS_DELETED.inc(deleted_rows, **labels)
             logger.log("retention_delete_done", cutoff=cutoff, rows=deleted_rows)
         except Exception as e:
             logger.log("retention_delete_error", error=str(e))
@@ -131,11 +215,16 @@ def run_job(validated_cfg: dict, schema_version: str = "2025-08-24") -> Tuple[di
         "task": {"task_id": job.task_id, "source": job.source, "symbols": job.symbols, "interval": job.interval, "range": {"start": start, "end": end}},
         "artifacts": {"log_ndjson": str(log_path), "csv": csv_path, "rows": int(df.shape[0]), "cols": int(df.shape[1]), "out_dir": str(out_dir)},
         "db": {"table": cfg.table, "upserted": upsert_rows, "deleted": deleted_rows},
+        "intervals": {iv: {"rows": int(f.shape[0]), "derived_from": None if iv == job.interval else job.interval}
+                      for iv, f in frames.items()},
+        "quality": quality,
         "timing": {"seconds": round(elapsed, 3)},
         "status": "ok",
     }
     Path(summary_path).write_text(json.dumps(summary, ensure_ascii=False, indent=2), encoding="utf-8")
     logger.log("job_end", seconds=elapsed)
+    logger.close()
+    _job_succeeded(labels, upsert_rows, elapsed)
 
     return summary, df
 
@@ -201,68 +290,200 @@ def run_job(job):
     out_dir.mkdir(parents=True, exist_ok=True)
     logger = NDJSONLogger(out_dir / (job.outputs.logs_filename or "logs.ndjson"))
     logger.log("job.start", task_id=job.task_id, source=job.source)
+    labels = metrics.job_labels(job.task_id, job.symbols, job.interval)
+    t0 = time.perf_counter()
+    try:
+        summary = _run_job_phases(job, logger, labels, out_dir)
+    except Exception:
+        metrics.JOBS.inc(status="error", **labels)
+        raise
+    finally:
+        logger.close()
+    _job_succeeded(labels, summary["rows"], time.perf_counter() - t0)
+    return summary
 
-    start, end = resolve_date_range(job.range, tz="Asia/Taipei")
-    # Fetch
-    df = None
-    if job.source == "yfinance":
-        df = yf_client.fetch(job.symbols, interval=job.interval, start=start, end=end, options=job.yfinance_options.__dict__)
-        symbol = job.symbols[0]
-        df = _normalize_candle_df(df, symbol, assume_no_adjust=False)
-    else:
-        raise ValueError(f"Unsupported source: {job.source}")
-
-    # Normalize columns to CandleV1
-    cols = ["ts","symbol","open","high","low","close","volume","adj_close"]
-    missing = [c for c in cols if c not in df.columns]
-    if missing:
-        raise RuntimeError(f"Missing columns for CandleV1: {missing}")
-
-    # Write parquet + metadata
-    meta = {
-        "pimiopilot.schema_version": "CandleV1",
-        "pimiopilot.ts_tz": "UTC",
-        "pimiopilot.interval": job.interval,
-        "pimiopilot.adjustment": "auto" if job.yfinance_options.auto_adjust else "none",
-        "pimiopilot.source": job.source,
-    }
-    parquet_path = None
-    if job.outputs.write_parquet:
-        parquet_path = write_parquet(df[cols], out_dir, job.outputs.parquet_filename, metadata=meta, fields=cols)
-
-    # Build manifest
-    spec = stable_spec({
-        "source": job.source,
-        "symbols": job.symbols,
-        "interval": job.interval,
-        "range": job.range.__dict__,
-        "yfinance_options": job.yfinance_options.__dict__,
-    })
-    shash = spec_hash(spec)
-    manifest = {
-        "spec_hash": shash,
-        "source": job.source,
-        "symbols": job.symbols,
-        "range": {"start": start, "end": end, "relative": job.range.relative},
-        "interval": job.interval,
-        "timezone": "Asia/Taipei",
-        "adjustment": "auto" if job.yfinance_options.auto_adjust else "none",
-        "schema_version": "CandleV1",
-        "created_at": datetime.now(pytz.UTC).isoformat(),
-        "artifacts": {
-            "parquet": str(Path(job.outputs.parquet_filename)),
-            "logs": str(Path(job.outputs.logs_filename)),
-        },
-        "source_options": job.yfinance_options.__dict__,
-    }
-    logs_path = out_dir / (job.outputs.logs_filename or "logs.ndjson")
-    manifest_path = out_dir / (job.outputs.manifest_filename or "manifest.json")
-
-    # Validate manifest before write
-    validate_json(manifest, Path("schemas/manifest.schema.json"))
-    write_manifest(manifest_path, manifest, schema_path=Path("schemas/manifest.schema.json"))
+def _pipeline_opts(job) -> Tuple[int, int, int, int, float]:
+    """(batch_size, queue_depth, fetch_workers, fetch_retries, retry_backoff_seconds) from job.pipeline
+    (dataclass, namespace or dict)."""
+    opts = getattr(job, "pipeline", None) or {}
+    get = opts.get if isinstance(opts, dict) else (lambda k, d: getattr(opts, k, d))
+    return (max(1, int(get("batch_size", 50))), max(1, int(get("queue_depth", 2))),
+            max(1, int(get("fetch_workers", 1))), max(0, int(get("fetch_retries", 2))),
+            max(0.0, float(get("retry_backoff_seconds", 1.0))))
+
+def _run_job_phases(job, logger: NDJSONLogger, labels: dict, out_dir: Path) -> dict:
+    # phases below log as spans "job/fetch", "job/normalize", ... (one per symbol batch)
+    with _phase(logger, labels, "job", task_id=job.task_id) as job_span:
+        start, end = resolve_date_range(job.range, tz="Asia/Taipei")
+        cols = ["ts","symbol","open","high","low","close","volume","adj_close"]
+        derive = getattr(job, "derive_intervals", None) or []
+        meta = {
+            "pimiopilot.schema_version": "CandleV1",
+            "pimiopilot.ts_tz": "UTC",
+            "pimiopilot.interval": job.interval,
+            "pimiopilot.adjustment": "auto" if job.yfinance_options.auto_adjust else "none",
+            "pimiopilot.source": job.source,
+        }
+        base = Path(job.outputs.parquet_filename)
+        writers = {}
+        # every interval, fetched or derived, is upserted with its own src_interval
+        cfg = TSConfig.from_env() if getattr(job.outputs, "upsert_timescaledb", False) else None
+
+        def writer(interval: str) -> ParquetStreamWriter:
+            # data.parquet for the fetched interval; coarser intervals built locally from it
+            # (no extra provider calls) go to data.<interval>.parquet
+            if interval not in writers:
+                if interval == job.interval:
+                    writers[interval] = ParquetStreamWriter(out_dir, job.outputs.parquet_filename, metadata=meta, fields=cols)
+                else:
+                    writers[interval] = ParquetStreamWriter(out_dir, f"{base.stem}.{interval}{base.suffix}", fields=cols,
+                                                            metadata=meta | {"pimiopilot.interval": interval,
+                                                                             "pimiopilot.derived_from": job.interval})
+            return writers[interval]
+
+        # Symbol batches stream through fetch -> normalize/validate/derive -> write over bounded
+        # queues: batch k+1 downloads while batch k is checked and written, and at most
+        # queue_depth batches wait between stages.
+        batch_size, queue_depth, fetch_workers, retries, backoff = _pipeline_opts(job)
+        batches = [job.symbols[i:i + batch_size] for i in range(0, len(job.symbols), batch_size)]
+        fetcher = fetcher_for(job)
+
+        def fetch(batch):
+            with _phase(logger, labels, "fetch", symbols=len(batch)) as sp:
+                df = _fetch(job, labels, fetcher=fetcher, symbols=batch, retries=retries, backoff=backoff,
+                            interval=job.interval, start=start, end=end, options=job.yfinance_options.__dict__)
+                sp["rows"] = len(df)
+            return batch, df
+
+        def prepare(item):
+            batch, df = item
+            with _phase(logger, labels, "normalize", rows=len(df)):
+                df = _normalize_candle_df(df, batch[0], assume_no_adjust=False)
+            if df is None or df.empty:
+                return None
+            # Normalize columns to CandleV1
+            missing = [c for c in cols if c not in df.columns]
+            if missing:
+                raise RuntimeError(f"Missing columns for CandleV1: {missing}")
+            # Data-quality counts (reported, not enforced)
+            with _phase(logger, labels, "validate", rows=len(df)):
+                quality = check_candles(df)
+            frames = {job.interval: df}
+            if derive:
+                with _phase(logger, labels, "derive", intervals=derive):
+                    frames |= derive_intervals(df, job.interval, derive)
+            return frames, quality
+
+        def sink(item):
+            if item is None:
+                return None
+            frames, quality = item
+            if job.outputs.write_parquet:
+                for interval, frame in frames.items():
+                    with _phase(logger, labels, "write_parquet", rows=len(frame), interval=interval):
+                        writer(interval).write(frame[cols])
+            # first/last bar per symbol is all the completion event needs
+            df = frames[job.interval]
+            ts = pd.Series(pd.to_datetime(df["ts"], utc=True).to_numpy(), index=df["symbol"].to_numpy())
+            span = ts.groupby(level=0).agg(["min", "max"])
+            marks = pd.concat([span["min"], span["max"]]).rename("ts").rename_axis("symbol").reset_index()
+            return {"rows": {iv: len(f) for iv, f in frames.items()}, "quality": quality, "marks": marks,
+                    "frames": frames if cfg is not None else None, "upserted": 0}
+
+        def upsert(item):
+            # its own stage, so batch k is upserted while batch k+1 is written to Parquet
+            if item is None:
+                return None
+            for interval, frame in item.pop("frames").items():
+                try:
+                    with _phase(logger, labels, "upsert", rows=len(frame), interval=interval):
+                        n = upsert_prices(frame[cols], interval=interval, cfg=cfg)
+                except Exception as e:
+                    logger.log("timescaledb_upsert_error", interval=interval, error=str(e))
+                    raise
+                item["upserted"] += n
+                metrics.ROWS_UPSERTED.inc(n, **labels)
+                logger.log("timescaledb_upsert_done", rows=n, interval=interval, table=cfg.table)
+            return item
+
+        stages = [Stage("fetch", fetch, workers=fetch_workers), Stage("prepare", prepare), Stage("sink", sink, ordered=True)]
+        if cfg is not None:
+            stages.append(Stage("upsert", upsert, ordered=True))
+        parent = logger.current_span()
+        try:
+            done = [r for r in run_pipeline(batches, stages, queue_depth=queue_depth,
+                                            context=lambda: logger.adopt(parent)) if r is not None]
+        finally:
+            paths = {interval: w.close() for interval, w in writers.items()}
+        job_span.update(batches=len(batches))
+
+        quality = merge_quality([r["quality"] for r in done]) if done else check_candles(pd.DataFrame(columns=cols))
+        logger.log("quality_checked", total=quality["total"], violations=quality["violations"])
+        rows = sum(r["rows"][job.interval] for r in done)
+        upserted = sum(r["upserted"] for r in done)
+        # once per run, after every batch is stored
+        deleted = _apply_retention(job, logger, labels)
+
+        parquet_path = paths.get(job.interval)
+        if job.outputs.write_parquet and parquet_path is None:
+            # nothing fetched: still leave a readable (empty) CandleV1 file
+            parquet_path = write_parquet(pd.DataFrame(columns=cols), out_dir, job.outputs.parquet_filename,
+                                         metadata=meta, fields=cols)
+
+        intervals = {job.interval: {"derived_from": None, "rows": rows,
+                                    "parquet": str(base) if parquet_path else None}}
+        for interval in [iv for iv in dict.fromkeys(derive) if iv != job.interval]:
+            intervals[interval] = {"derived_from": job.interval, "method": "ohlcv_resample",
+                                   "rows": sum(r["rows"].get(interval, 0) for r in done),
+                                   "parquet": Path(paths[interval]).name if paths.get(interval) else None}
+
+        # Build manifest
+        spec = stable_spec({
+            "source": job.source,
+            "symbols": job.symbols,
+            "interval": job.interval,
+            "range": job.range.__dict__,
+            "yfinance_options": job.yfinance_options.__dict__,
+            **({"derive_intervals": derive} if derive else {}),
+        })
+        shash = spec_hash(spec)
+        manifest = {
+            "spec_hash": shash,
+            "source": job.source,
+            "symbols": job.symbols,
+            "range": {"start": start, "end": end, "relative": job.range.relative},
+            "interval": job.interval,
+            "timezone": "Asia/Taipei",
+            "adjustment": "auto" if job.yfinance_options.auto_adjust else "none",
+            "schema_version": "CandleV1",
+            "created_at": datetime.now(pytz.UTC).isoformat(),
+            "artifacts": {
+                "parquet": str(Path(job.outputs.parquet_filename)),
+                "logs": str(Path(job.outputs.logs_filename)),
+            },
+            "source_options": job.yfinance_options.__dict__,
+            "intervals": intervals,
+        }
+        logs_path = out_dir / (job.outputs.logs_filename or "logs.ndjson")
+        manifest_path = out_dir / (job.outputs.manifest_filename or "manifest.json")
+
+        # Validate manifest before write
+        with _phase(logger, labels, "manifest"):
+            validate_json(manifest, Path("schemas/manifest.schema.json"))
+            write_manifest(manifest_path, manifest, schema_path=Path("schemas/manifest.schema.json"))
+
+        # Tell subscribers (e.g. strategy runs) which symbols/ranges just landed; never fails the job
+        try:
+            marks = pd.concat([r["marks"] for r in done], ignore_index=True) if done else pd.DataFrame(columns=["symbol", "ts"])
+            event = events.ingest_event(job.task_id, job.interval, marks, parquet=str(parquet_path) if parquet_path else None,
+                                        out_dir=str(out_dir), rows=rows)
+            with _phase(logger, labels, "publish"):
+                published = events.publish(event)
+            if published:
+                logger.log("event_published", event=event["event"], symbols=len(event["symbols"]))
+        except Exception as e:
+            logger.log("event_publish_error", error=str(e))
 
-    rows = len(df) if df is not None else 0
     logger.log("job.end", task_id=job.task_id, rows=rows)
     summary = {
         "status": "ok",
@@ -280,7 +501,9 @@ def run_job(job):
         "parquet": str(parquet_path) if parquet_path else None,
         "manifest": str(manifest_path),
         "logs": str(logs_path),
-        "rows": rows
-
+        "rows": rows,
+        "quality": quality,
+        "intervals": intervals,
+        "db": {"table": (cfg or TSConfig.from_env()).table, "upserted": upserted, "deleted": deleted},
     }
     return summary
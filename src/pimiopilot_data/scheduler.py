@@ -0,0 +1,184 @@
+from __future__ import annotations
+import copy
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Set
+from zoneinfo import ZoneInfo
+
+from .io.ndjson_logger import NDJSONLogger
+from .validator import DefaultFillingValidator, compiled_validator, yaml_safe_load
+
+# weekday accepts 0-7, both 0 and 7 meaning Sunday
+_FIELDS = [("minute", 0, 59), ("hour", 0, 23), ("day", 1, 31), ("month", 1, 12), ("weekday", 0, 7)]
+
+def _parse_field(expr: str, lo: int, hi: int, name: str) -> Set[int]:
+    values: Set[int] = set()
+    for part in expr.split(","):
+        base, _, step_s = part.partition("/")
+        step = int(step_s) if step_s else 1
+        if base == "*":
+            start, end = lo, hi
+        elif "-" in base:
+            a, b = base.split("-", 1)
+            start, end = int(a), int(b)
+        else:
+            start = int(base)
+            end = hi if step_s else start
+        if step <= 0 or start < lo or end > hi or start > end:
+            raise ValueError(f"invalid cron {name} field: {part}")
+        values.update(range(start, end + 1, step))
+    if name == "weekday":
+        values = {v % 7 for v in values}
+    return values
+
+class CronSchedule:
+    """Five-field cron expression (minute hour day month weekday) with the usual */n, a-b and lists.
+
+    As in cron, when both day-of-month and day-of-week are restricted a day matches either.
+    """
+    def __init__(self, expr: str):
+        parts = expr.split()
+        if len(parts) != 5:
+            raise ValueError(f"cron expression needs 5 fields: {expr!r}")
+        self.expr = expr
+        self.minute, self.hour, self.day, self.month, self.weekday = (
+            _parse_field(p, lo, hi, name) for p, (name, lo, hi) in zip(parts, _FIELDS)
+        )
+        self._day_any = parts[2] == "*"
+        self._weekday_any = parts[4] == "*"
+
+    def _day_matches(self, dt: datetime) -> bool:
+        dom = dt.day in self.day
+        dow = (dt.weekday() + 1) % 7 in self.weekday  # cron: Sunday=0
+        if self._day_any or self._weekday_any:
+            return dom and dow
+        return dom or dow
+
+    def matches(self, dt: datetime) -> bool:
+        return dt.minute in self.minute and dt.hour in self.hour and dt.month in self.month and self._day_matches(dt)
+
+    def next_after(self, dt: datetime) -> datetime:
+        t = dt.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        for _ in range(366 * 24 * 60):
+            if t.month not in self.month or not self._day_matches(t):
+                t = (t + timedelta(days=1)).replace(hour=0, minute=0)
+                continue
+            if self.matches(t):
+                return t
+            t += timedelta(minutes=1)
+        raise ValueError(f"cron expression never matches: {self.expr!r}")
+
+@dataclass
+class ScheduledJob:
+    name: str
+    schedule: CronSchedule
+    config_path: Path
+    config: Dict[str, Any]
+    mtime: float
+    running: Optional[Future] = field(default=None, repr=False)
+    runs: int = 0
+    skipped: int = 0
+
+class Scheduler:
+    """Resident scheduler: runs fetch jobs on cron schedules in one warm process.
+
+    Imports, compiled schemas and job configs are loaded once; job configs are
+    re-validated only when their file changes. Jobs run on a thread pool; a job whose
+    previous run is still in progress is skipped for that tick (logged), never stacked.
+    """
+    def __init__(self, schedule_path: str | Path, *, job_schema: str | Path = Path("schemas") / "job.schema.json",
+                 schedule_schema: str | Path = Path("schemas") / "schedule.schema.json",
+                 log_path: str | Path = "out/scheduler.log.ndjson",
+                 run: Optional[Callable[[Dict[str, Any]], Any]] = None):
+        spec = yaml_safe_load(schedule_path)
+        compiled_validator(schedule_schema, DefaultFillingValidator).validate(spec)
+        self._job_validator = compiled_validator(job_schema, DefaultFillingValidator)
+        self.tz = ZoneInfo(spec.get("timezone", "Asia/Taipei"))
+        self.logger = NDJSONLogger(log_path)
+        base = Path(schedule_path).parent
+        self.jobs: List[ScheduledJob] = []
+        for entry in spec["jobs"]:
+            path = Path(entry["config"])
+            if not path.is_absolute() and not path.exists():
+                path = base / path
+            cfg, mtime = self._load(path)
+            self.jobs.append(ScheduledJob(entry.get("name") or cfg["task_id"], CronSchedule(entry["schedule"]), path, cfg, mtime))
+        if run is None:
+            from .runner import run_job  # heavy imports (yfinance, pyarrow) happen once, here
+            run = run_job
+        self._run = run
+        self._pool = ThreadPoolExecutor(max_workers=int(spec.get("max_workers", 4)), thread_name_prefix="ppjob")
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        now = datetime.now(self.tz)
+        self.logger.log("scheduler_init", jobs=[
+            {"name": j.name, "schedule": j.schedule.expr, "next": j.schedule.next_after(now).isoformat()} for j in self.jobs
+        ])
+
+    def _load(self, path: Path) -> tuple[Dict[str, Any], float]:
+        cfg = yaml_safe_load(path)
+        self._job_validator.validate(cfg)
+        return cfg, path.stat().st_mtime
+
+    def _refresh(self, job: ScheduledJob) -> None:
+        try:
+            mtime = job.config_path.stat().st_mtime
+            if mtime != job.mtime:
+                job.config, job.mtime = self._load(job.config_path)
+                self.logger.log("job_reloaded", name=job.name)
+        except Exception as e:
+            # keep the last valid config
+            self.logger.log("job_reload_error", name=job.name, error=str(e))
+
+    def _execute(self, job: ScheduledJob, due: datetime) -> None:
+        t0 = time.time()
+        self.logger.log("job_start", name=job.name, due=due.isoformat())
+        try:
+            self._run(copy.deepcopy(job.config))
+            self.logger.log("job_done", name=job.name, seconds=round(time.time() - t0, 3))
+        except Exception as e:
+            self.logger.log("job_error", name=job.name, error=f"{type(e).__name__}: {e}", seconds=round(time.time() - t0, 3))
+
+    def tick(self, now: Optional[datetime] = None) -> List[str]:
+        """Submit every job due at `now` (minute resolution); returns the names submitted."""
+        now = (now or datetime.now(self.tz)).astimezone(self.tz).replace(second=0, microsecond=0)
+        submitted = []
+        with self._lock:
+            for job in self.jobs:
+                if not job.schedule.matches(now):
+                    continue
+                if job.running is not None and not job.running.done():
+                    job.skipped += 1
+                    self.logger.log("job_skipped_overlap", name=job.name, due=now.isoformat())
+                    continue
+                self._refresh(job)
+                job.runs += 1
+                job.running = self._pool.submit(self._execute, job, now)
+                submitted.append(job.name)
+        return submitted
+
+    def run_forever(self) -> None:
+        """Tick at every minute boundary until stop() is called."""
+        last: Optional[datetime] = None
+        while not self._stop.is_set():
+            now = datetime.now(self.tz).replace(second=0, microsecond=0)
+            if now != last:
+                self.tick(now)
+                last = now
+            nxt = now + timedelta(minutes=1)
+            self._stop.wait(max(0.05, (nxt - datetime.now(self.tz)).total_seconds()))
+
+    def request_stop(self) -> None:
+        """Make run_forever return at its next wake-up (safe from signal handlers)."""
+        self._stop.set()
+
+    def stop(self, wait: bool = True) -> None:
+        """Stop ticking and wait for running jobs to finish."""
+        self._stop.set()
+        self._pool.shutdown(wait=wait)
+        self.logger.log("scheduler_stop")
+        self.logger.close()
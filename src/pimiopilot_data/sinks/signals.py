@@ -0,0 +1,118 @@
+from __future__ import annotations
+import hashlib
+import io
+import json
+from typing import Any, Dict, List, Optional
+import pandas as pd
+
+from .timescaledb import TSConfig, _connect
+
+SIGNALS_TABLE = "strategy_signals"
+
+# Column order of the COPY stream; params/extras are jsonb
+_COLS = ["strategy", "params_hash", "symbol", "ts", "action", "target_weight", "confidence", "params", "extras"]
+_UPDATE_COLS = ["action", "target_weight", "confidence", "params", "extras"]
+
+def params_hash(params: Optional[Dict[str, Any]]) -> str:
+    """Stable short hash of a strategy's parameters (key order and formatting do not matter)."""
+    canonical = json.dumps(params or {}, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha1(canonical.encode("utf-8")).hexdigest()[:16]
+
+def signals_frame(output: Any, *, strategy: str, params: Optional[Dict[str, Any]] = None) -> pd.DataFrame:
+    """Rows for the signals table from a strategy output, runner envelope, list or DataFrame."""
+    if isinstance(output, dict):
+        output = output.get("strategy_output", output).get("signals", [])
+    df = output if isinstance(output, pd.DataFrame) else pd.DataFrame(list(output))
+    if df.empty:
+        return pd.DataFrame(columns=_COLS)
+    missing = {"ts", "symbol"} - set(df.columns)
+    if missing:
+        raise ValueError(f"signals missing columns: {missing}")
+    out = pd.DataFrame({
+        "strategy": strategy,
+        "params_hash": params_hash(params),
+        "symbol": df["symbol"].astype(str),
+        "ts": pd.to_datetime(df["ts"], utc=True),
+    })
+    for c in ("action", "target_weight", "confidence"):
+        out[c] = df[c] if c in df.columns else None
+    out["params"] = json.dumps(params or {}, sort_keys=True, default=str)
+    out["extras"] = None
+    if "extras" in df.columns:
+        out["extras"] = df["extras"].map(lambda e: json.dumps(e, default=str) if isinstance(e, dict) else None)
+    # one row per key: ON CONFLICT cannot update the same row twice in one statement
+    return out.drop_duplicates(subset=["symbol", "ts"], keep="last")[_COLS]
+
+def upsert_signals(
+    output: Any,
+    *,
+    strategy: str,
+    params: Optional[Dict[str, Any]] = None,
+    cfg: Optional[TSConfig] = None,
+    table: str = SIGNALS_TABLE,
+) -> int:
+    """Bulk upsert signals keyed by (strategy, params_hash, symbol, ts).
+
+    Rows are streamed with COPY into a temporary staging table and merged with one
+    INSERT .. ON CONFLICT, so re-running a strategy over the same bars is idempotent.
+    Returns the number of rows loaded.
+    """
+    df = signals_frame(output, strategy=strategy, params=params)
+    if df.empty:
+        return 0
+    if cfg is None:
+        cfg = TSConfig.from_env()
+
+    buf = io.StringIO()
+    df.assign(ts=df["ts"].dt.strftime("%Y-%m-%d %H:%M:%S.%f+00")).to_csv(buf, index=False, header=False)
+    buf.seek(0)
+
+    cols_sql = ",".join(_COLS)
+    update_sql = ",".join(f"{c}=EXCLUDED.{c}" for c in _UPDATE_COLS)
+    with _connect(cfg) as conn:
+        with conn.cursor() as cur:
+            cur.execute(f"CREATE TEMP TABLE _pp_signals (LIKE {table} INCLUDING DEFAULTS) ON COMMIT DROP")
+            cur.copy_expert(f"COPY _pp_signals ({cols_sql}) FROM STDIN WITH (FORMAT csv)", buf)
+            cur.execute(f"""
+                INSERT INTO {table} ({cols_sql})
+                SELECT {cols_sql} FROM _pp_signals
+                ON CONFLICT (strategy, params_hash, symbol, ts) DO UPDATE SET
+                  {update_sql}, updated_at = now()
+            """)
+    return len(df)
+
+def build_latest_sql(strategy: str, symbols: List[str], params_hash: Optional[str] = None,
+                     columns: Optional[List[str]] = None, table: str = SIGNALS_TABLE) -> tuple[str, list]:
+    """Latest signal per symbol: one backward index scan per symbol (LATERAL ... LIMIT 1).
+
+    `params_hash` is required: without it the newest row could come from any parameter
+    set, and the scan could not use the (strategy, params_hash, symbol, ts) key.
+    """
+    if not params_hash:
+        raise ValueError("latest signals require params_hash (one parameter set per query)")
+    cols = columns or ["strategy", "params_hash", "symbol", "ts", "action", "target_weight", "confidence"]
+    where = ["t.strategy = %s", "t.params_hash = %s", "t.symbol = s.symbol"]
+    params: list = [symbols, strategy, params_hash]
+    sql = f"""
+    SELECT {", ".join("x." + c for c in cols)}
+    FROM unnest(%s::text[]) AS s(symbol)
+    CROSS JOIN LATERAL (
+      SELECT * FROM {table} t
+      WHERE {' AND '.join(where)}
+      ORDER BY t.ts DESC
+      LIMIT 1
+    ) x
+    ORDER BY x.symbol
+    """.strip()
+    return sql, params
+
+def latest_signals(strategy: str, symbols: List[str], params_hash: Optional[str] = None,
+                   cfg: Optional[TSConfig] = None, table: str = SIGNALS_TABLE) -> pd.DataFrame:
+    sql, params = build_latest_sql(strategy, symbols, params_hash, table=table)
+    cfg = cfg or TSConfig.from_env()
+    with _connect(cfg) as conn:
+        with conn.cursor() as cur:
+            cur.execute(sql, params)
+            cols = [d[0] for d in cur.description]
+            rows = cur.fetchall()
+    return pd.DataFrame(rows, columns=cols)
@@ -1,11 +1,16 @@
 from __future__ import annotations
 from dataclasses import dataclass
 from typing import Optional, Iterable, Any
+import math
 import os
 import psycopg2
 import psycopg2.extras
 import pandas as pd
 
+from .. import metrics
+
+_PAGE_SIZE = 1000
+
 @dataclass
 class TSConfig:
     dsn: Optional[str] = None
@@ -67,19 +72,20 @@ def upsert_prices(df: pd.DataFrame, *, interval: str, cfg: Optional[TSConfig] =
     # Build SQL
     cols_sql = ",".join(_COLS)
     placeholders = ",".join(["%s"] * len(_COLS))
-    update_cols = ["open","high","low","close","adj_close","volume","src_interval","dividends","stock_splits"]
+    update_cols = ["open","high","low","close","adj_close","volume","dividends","stock_splits"]
     update_sql = ",".join([f'{c}=EXCLUDED.{c}' for c in update_cols])
 
     sql = f"""    INSERT INTO {cfg.table} ({cols_sql})
     VALUES %s
-    ON CONFLICT (symbol, ts) DO UPDATE SET
+    ON CONFLICT (symbol, src_interval, ts) DO UPDATE SET
       {update_sql};
     """
 
     rows = list(_iter_rows(df, interval))
     with _connect(cfg) as conn:
         with conn.cursor() as cur:
-            psycopg2.extras.execute_values(cur, sql, rows, template=f"({placeholders})", page_size=1000)
+            psycopg2.extras.execute_values(cur, sql, rows, template=f"({placeholders})", page_size=_PAGE_SIZE)
+    metrics.DB_ROUND_TRIPS.inc(math.ceil(len(rows) / _PAGE_SIZE), op="upsert")
     return len(rows)
 
 def purge_older_than(cfg: TSConfig, cutoff: str, symbols: list[str] | None = None) -> int:
@@ -93,4 +99,5 @@ def purge_older_than(cfg: TSConfig, cutoff: str, symbols: list[str] | None = Non
         with conn.cursor() as cur:
             cur.execute(sql, params)
             deleted = cur.rowcount
+    metrics.DB_ROUND_TRIPS.inc(op="delete")
     return deleted
@@ -0,0 +1,60 @@
+from __future__ import annotations
+from typing import List, Optional, Sequence
+import numpy as np
+import pandas as pd
+
+# TWSE regular session 09:00-13:30 Asia/Taipei is 01:00-05:30 UTC (no DST)
+_SESSION_OPEN_UTC = pd.Timedelta(hours=1)
+_SESSION_MINUTES = 270
+_BAR_MINUTES = {"1m": 1, "5m": 5, "15m": 15, "30m": 30, "1h": 60}
+
+def bar_times(interval: str, start: str, years: float) -> pd.DatetimeIndex:
+    """UTC bar timestamps on weekdays: one per day for 1d, session bars for intraday intervals."""
+    days = pd.bdate_range(pd.Timestamp(start), periods=max(1, int(round(years * 261))), tz="UTC")
+    if interval == "1d":
+        return days
+    step = _BAR_MINUTES.get(interval)
+    if step is None:
+        raise ValueError(f"Unsupported interval: {interval}")
+    offsets = pd.to_timedelta(np.arange(0, _SESSION_MINUTES, step), unit="min") + _SESSION_OPEN_UTC
+    return pd.DatetimeIndex((days.values[:, None] + offsets.values[None, :]).ravel(), tz="UTC")
+
+def synthetic_candles(symbols: int | Sequence[str] = 10, interval: str = "1d", years: float = 1.0, *,
+                      start: str = "2015-01-05", seed: int = 0) -> pd.DataFrame:
+    """Deterministic CandleV1 frame (ts UTC, symbol, open, high, low, close, volume, adj_close).
+
+    Prices follow a geometric random walk per symbol; the same arguments always give the
+    same frame. Rows are sorted by symbol, ts. Sized by symbols x years x bars per day,
+    e.g. 100 symbols x 1 year of 1m bars is about 7M rows.
+    """
+    names: List[str] = [f"S{i:04d}.TW" for i in range(symbols)] if isinstance(symbols, int) else list(symbols)
+    ts = bar_times(interval, start, years)
+    n, k = len(ts), len(names)
+    rng = np.random.default_rng(seed)
+    vol = 0.02 / np.sqrt(max(1, _SESSION_MINUTES // _BAR_MINUTES.get(interval, _SESSION_MINUTES)))
+    start_px = rng.uniform(20, 1000, size=(k, 1))
+    close = start_px * np.exp(np.cumsum(rng.normal(0, vol, size=(k, n)), axis=1))
+    open_ = np.concatenate([start_px, close[:, :-1]], axis=1) * np.exp(rng.normal(0, vol / 4, size=(k, n)))
+    wick = np.abs(rng.normal(0, vol / 2, size=(k, n)))
+    high = np.maximum(open_, close) * np.exp(wick)
+    low = np.minimum(open_, close) * np.exp(-wick)
+    volume = rng.integers(1_000, 5_000_000, size=(k, n)).astype("float64")
+    return pd.DataFrame({
+        "ts": np.tile(ts, k),
+        "symbol": np.repeat(np.array(names, dtype=object), n),
+        "open": open_.ravel(),
+        "high": high.ravel(),
+        "low": low.ravel(),
+        "close": close.ravel(),
+        "volume": volume.ravel(),
+        "adj_close": close.ravel(),
+    })
+
+def as_yfinance(df: pd.DataFrame, symbol: Optional[str] = None) -> pd.DataFrame:
+    """One symbol of a CandleV1 frame in yfinance download shape (DatetimeIndex, capitalized columns)."""
+    part = df[df["symbol"] == (symbol or df["symbol"].iloc[0])]
+    return pd.DataFrame({
+        "Open": part["open"].to_numpy(), "High": part["high"].to_numpy(), "Low": part["low"].to_numpy(),
+        "Close": part["close"].to_numpy(), "Adj Close": part["adj_close"].to_numpy(),
+        "Volume": part["volume"].to_numpy(),
+    }, index=pd.DatetimeIndex(part["ts"], name="Date"))
@@ -0,0 +1,94 @@
+from __future__ import annotations
+import json
+import os
+from datetime import date, time as dtime, timedelta
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterable, List
+import numpy as np
+import pandas as pd
+
+DEFAULT_CALENDAR = Path("calendars") / "twse.json"
+_INTRADAY_MINUTES = {"1m": 1, "5m": 5, "15m": 15, "30m": 30, "1h": 60}
+
+def _as_date(value) -> date:
+    return value if type(value) is date else pd.Timestamp(value).date()
+
+def bar_delta(interval: str) -> pd.Timedelta:
+    """Length of one bar: 1 day for 1d, else the intraday interval."""
+    if interval == "1d":
+        return pd.Timedelta(days=1)
+    if interval not in _INTRADAY_MINUTES:
+        raise ValueError(f"Unsupported interval: {interval}")
+    return pd.Timedelta(minutes=_INTRADAY_MINUTES[interval])
+
+class TradingCalendar:
+    """Exchange sessions from a local calendar file (weekdays minus holidays, plus make-up sessions).
+
+    Years outside `years` fall back to plain weekdays, so an outdated file degrades to
+    reporting holidays as gaps instead of hiding missing bars.
+    """
+    def __init__(self, *, timezone: str = "Asia/Taipei", open: str = "09:00", close: str = "13:30",
+                 holidays: Iterable = (), extra_sessions: Iterable = (), years: Iterable[int] = ()):
+        self.timezone = timezone
+        self.open = dtime.fromisoformat(open)
+        self.close = dtime.fromisoformat(close)
+        self.holidays = frozenset(_as_date(d) for d in holidays)
+        self.extra_sessions = frozenset(_as_date(d) for d in extra_sessions)
+        self.years = frozenset(int(y) for y in years)
+
+    @classmethod
+    def load(cls, path: str | Path | None = None) -> "TradingCalendar":
+        """Calendar file at `path`, else PPDATA_CALENDAR, else calendars/twse.json."""
+        path = Path(path or os.getenv("PPDATA_CALENDAR") or DEFAULT_CALENDAR)
+        raw = json.loads(path.read_text(encoding="utf-8"))
+        session = raw.get("session", {})
+        return cls(timezone=raw.get("timezone", "Asia/Taipei"), open=session.get("open", "09:00"),
+                   close=session.get("close", "13:30"), holidays=raw.get("holidays", []),
+                   extra_sessions=raw.get("extra_sessions", []), years=raw.get("years", []))
+
+    def covers(self, day) -> bool:
+        return _as_date(day).year in self.years
+
+    def is_session(self, day) -> bool:
+        d = _as_date(day)
+        if d in self.extra_sessions:
+            return True
+        return d.weekday() < 5 and d not in self.holidays
+
+    def sessions(self, start, end) -> List[date]:
+        """Trading days with start <= day < end."""
+        d, stop = _as_date(start), _as_date(end)
+        out = []
+        while d < stop:
+            if self.is_session(d):
+                out.append(d)
+            d += timedelta(days=1)
+        return out
+
+    def bar_slots(self, interval: str, start, end) -> pd.DatetimeIndex:
+        """Expected bar open times (UTC) of sessions with start <= day < end.
+
+        Daily bars are stamped at local midnight, as yfinance returns them; intraday bars
+        every `interval` from the session open up to (not including) the close.
+        """
+        days = pd.DatetimeIndex([pd.Timestamp(d) for d in self.sessions(start, end)])
+        if interval == "1d":
+            return days.tz_localize(self.timezone).tz_convert("UTC")
+        step = _INTRADAY_MINUTES.get(interval)
+        if step is None:
+            raise ValueError(f"Unsupported interval: {interval}")
+        open_min = self.open.hour * 60 + self.open.minute
+        close_min = self.close.hour * 60 + self.close.minute
+        offsets = pd.to_timedelta(np.arange(open_min, close_min, step), unit="min")
+        local = (days.values[:, None] + offsets.values[None, :]).ravel()
+        return pd.DatetimeIndex(local).tz_localize(self.timezone).tz_convert("UTC")
+
+@lru_cache(maxsize=8)
+def _load_cached(path: str, mtime_ns: int) -> TradingCalendar:
+    return TradingCalendar.load(path)
+
+def default_calendar(path: str | Path | None = None) -> TradingCalendar:
+    """TradingCalendar.load, cached per file until the file changes."""
+    p = Path(path or os.getenv("PPDATA_CALENDAR") or DEFAULT_CALENDAR)
+    return _load_cached(str(p.resolve()), p.stat().st_mtime_ns)
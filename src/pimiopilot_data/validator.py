@@ -1,5 +1,7 @@
 import json
+import threading
 from pathlib import Path
+from typing import Dict, Tuple
 from jsonschema import Draft202012Validator, validators
 import yaml
 
@@ -15,11 +17,32 @@ def _extend_with_default(validator_class):
 
 DefaultFillingValidator = _extend_with_default(Draft202012Validator)
 
+# (validator class, resolved schema path) -> (mtime_ns, compiled validator)
+_COMPILED: Dict[Tuple[type, str], Tuple[int, object]] = {}
+_COMPILED_LOCK = threading.Lock()
+
+def compiled_validator(schema_path: str | Path, cls=Draft202012Validator):
+    """Validator for a schema file, compiled once per process (recompiled if the file changes).
+
+    The schema itself is checked on compile, so later validations skip that step.
+    """
+    path = Path(schema_path).resolve()
+    mtime = path.stat().st_mtime_ns
+    key = (cls, str(path))
+    with _COMPILED_LOCK:
+        hit = _COMPILED.get(key)
+        if hit is not None and hit[0] == mtime:
+            return hit[1]
+    schema = json.loads(path.read_text(encoding="utf-8"))
+    cls.check_schema(schema)
+    v = cls(schema)
+    with _COMPILED_LOCK:
+        _COMPILED[key] = (mtime, v)
+    return v
+
 def load_and_validate(config_path: str | Path, schema_path: str | Path) -> dict:
     cfg = yaml_safe_load(config_path)
-    schema = json.loads(Path(schema_path).read_text(encoding="utf-8"))
-    v = DefaultFillingValidator(schema)
-    v.validate(cfg)
+    compiled_validator(schema_path, DefaultFillingValidator).validate(cfg)
     return cfg
 
 def yaml_safe_load(path: str | Path) -> dict:
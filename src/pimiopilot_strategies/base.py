@@ -1,11 +1,33 @@
 from __future__ import annotations
-from typing import Protocol, Dict, Any
+from typing import Protocol, Dict, Any, Iterable
 import pandas as pd
 
 class Strategy(Protocol):
+    # Optional: `input_columns` (tuple of column names) lets loaders read only what the strategy uses.
+
     def generate_signal(self, df: pd.DataFrame) -> Dict[str, Any]:
         """
         Given a price DataFrame with at least columns ['ts','open','high','low','close','volume'],
         return a dict signal payload, deterministic for the same input+params.
         """
         ...
+
+class OnlineStrategy(Strategy, Protocol):
+    def update(self, df: pd.DataFrame) -> Dict[str, Any]:
+        """
+        Consume only newly arrived bars, keeping per-symbol state between calls, and
+        return the same payload shape as generate_signal with signals for the new bars.
+        Concatenating update() outputs over a history must equal generate_signal on it.
+        """
+        ...
+
+    def snapshot(self) -> Dict[str, Any]:
+        """JSON-serializable state, so an online session can be resumed with restore()."""
+        ...
+
+    def restore(self, state: Dict[str, Any]) -> None:
+        ...
+
+    def reset(self, symbols: Iterable[Any]) -> None:
+        """Drop the state of `symbols`, so their next bars are taken as the start of their history."""
+        ...
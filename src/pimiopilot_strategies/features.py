@@ -0,0 +1,288 @@
+from __future__ import annotations
+import hashlib
+import math
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+
+class RollingMean:
+    """O(1) rolling mean that reproduces pandas' `rolling(w, min_periods=1).mean()` bit for bit.
+
+    Mirrors pandas' roll_mean kernel: Kahan-compensated add/remove sums, the
+    same-value run guard and the sign guards applied when the mean is read.
+    """
+    __slots__ = ("window", "nobs", "sum", "neg", "comp_add", "comp_rem", "same", "prev")
+
+    def __init__(self, window: int):
+        self.window = window
+        self.nobs = self.neg = self.same = 0
+        self.sum = self.comp_add = self.comp_rem = 0.0
+        self.prev = math.nan
+
+    def _add(self, val: float) -> None:
+        if val == val:
+            self.nobs += 1
+            y = val - self.comp_add
+            t = self.sum + y
+            self.comp_add = t - self.sum - y
+            self.sum = t
+            if math.copysign(1.0, val) < 0:
+                self.neg += 1
+            self.same = self.same + 1 if val == self.prev else 1
+            self.prev = val
+
+    def _remove(self, val: float) -> None:
+        if val == val:
+            self.nobs -= 1
+            y = -val - self.comp_rem
+            t = self.sum + y
+            self.comp_rem = t - self.sum - y
+            self.sum = t
+            if math.copysign(1.0, val) < 0:
+                self.neg -= 1
+
+    def push(self, val: float, leaving: Optional[float], first: bool) -> float:
+        """Slide the window by one bar: `leaving` drops out (None while filling), `val` enters."""
+        if first or self.window == 1:
+            # pandas re-initialises when the new window does not overlap the previous one
+            self.__init__(self.window)
+            self.prev = val
+        elif leaving is not None:
+            self._remove(leaving)
+        self._add(val)
+        if self.nobs == 0:
+            return math.nan
+        result = self.sum / self.nobs
+        if self.same >= self.nobs:
+            result = self.prev
+        elif self.neg == 0 and result < 0:
+            result = 0.0
+        elif self.neg == self.nobs and result > 0:
+            result = 0.0
+        return result
+
+    def state(self) -> List[Any]:
+        return [self.nobs, self.sum, self.neg, self.comp_add, self.comp_rem, self.same, self.prev]
+
+    def load(self, st: List[Any]) -> None:
+        self.nobs, self.sum, self.neg, self.comp_add, self.comp_rem, self.same, self.prev = st
+
+# --- Indicators -------------------------------------------------------------
+
+def _sma(values: np.ndarray, *, window: int) -> np.ndarray:
+    return pd.Series(values).rolling(int(window), min_periods=1).mean().to_numpy()
+
+def _returns(values: np.ndarray, *, periods: int = 1) -> np.ndarray:
+    out = np.full(len(values), np.nan)
+    p = int(periods)
+    if len(values) > p:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            out[p:] = values[p:] / values[:-p] - 1.0
+    return out
+
+def _volatility(values: np.ndarray, *, window: int) -> np.ndarray:
+    return pd.Series(_returns(values)).rolling(int(window), min_periods=2).std().to_numpy()
+
+@dataclass(frozen=True)
+class Indicator:
+    """How to compute a named indicator over one symbol's values, and how to extend it.
+
+    lookback: rows of history that exactly determine a value (stateless window), so
+        appended bars are computed from a short tail slice.
+    Indicators without one (e.g. sma: pandas' compensated rolling sums carry rounding
+    state from the whole history) are recomputed in full, vectorised, when bars are appended.
+    """
+    compute: Callable[..., np.ndarray]
+    lookback: Optional[Callable[..., int]] = None
+
+_INDICATORS: Dict[str, Indicator] = {
+    "sma": Indicator(_sma),
+    "returns": Indicator(_returns, lookback=lambda periods=1: int(periods) + 1),
+    "volatility": Indicator(_volatility),
+}
+
+def register_indicator(name: str, indicator: Indicator) -> None:
+    _INDICATORS[name] = indicator
+
+# --- Cache ------------------------------------------------------------------
+
+def _fingerprint(ts: np.ndarray, values: np.ndarray, n: int) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    h.update(np.ascontiguousarray(ts[:n]).tobytes())
+    h.update(np.ascontiguousarray(values[:n]).tobytes())
+    return h.hexdigest()
+
+@dataclass
+class _Entry:
+    n: int
+    fp: str
+    values: np.ndarray
+    dirty: bool = False  # not yet written to cache_dir
+
+class FeatureCache:
+    """Memoizes named indicators per (symbol, first ts, indicator, params).
+
+    Entries are validated against a fingerprint of the input rows (ts + values), so a
+    changed history is recomputed, while a history with bars appended is extended.
+    In-memory entries are evicted LRU beyond `max_bytes`; with `cache_dir` set, entries
+    are read from disk and written there when evicted or on flush()/close(), so other
+    processes reuse them.
+    """
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024, cache_dir: Optional[str | Path] = None):
+        self.max_bytes = max_bytes
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        if self.cache_dir:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._entries: "OrderedDict[Tuple, _Entry]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.RLock()
+        self.stats = {"hits": 0, "extends": 0, "misses": 0, "disk_hits": 0}
+
+    def get(self, name: str, ts: np.ndarray, values: np.ndarray, *, symbol: Any = "", **params: Any) -> np.ndarray:
+        """Indicator `name` over one symbol's series (ts as int64 ns, ascending). Returns a read-only array."""
+        ind = _INDICATORS.get(name)
+        if ind is None:
+            raise KeyError(f"unknown indicator: {name}")
+        values = np.asarray(values, dtype="float64")
+        ts = np.asarray(ts, dtype="int64")
+        m = len(values)
+        if m == 0:
+            return np.empty(0)
+        key = (str(symbol), int(ts[0]), name, tuple(sorted(params.items())))
+        fp = _fingerprint(ts, values, m)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._load(key)
+                if entry is not None:
+                    self._put(key, entry)
+            if entry is not None and entry.n == m and entry.fp == fp:
+                self._entries.move_to_end(key)
+                self.stats["hits"] += 1
+                return entry.values
+            if entry is not None and entry.n < m and entry.fp == _fingerprint(ts, values, entry.n):
+                out = self._extend(ind, entry.values, values, params)
+                self.stats["extends"] += 1
+            else:
+                out = ind.compute(values, **params)
+                entry = _Entry(0, "", out)
+                self.stats["misses"] += 1
+            out.setflags(write=False)
+            entry.n, entry.fp, entry.values, entry.dirty = m, fp, out, True
+            self._put(key, entry)
+            return out
+
+    def frame(self, df: pd.DataFrame, name: str, *, column: str = "close", **params: Any) -> np.ndarray:
+        """Indicator over a frame sorted by (symbol, ts), aligned with its rows."""
+        sym = df["symbol"].to_numpy() if "symbol" in df.columns else np.full(len(df), "", dtype=object)
+        ts = pd.DatetimeIndex(pd.to_datetime(df["ts"], utc=True)).as_unit("ns").asi8
+        vals = df[column].to_numpy(dtype="float64")
+        out = np.empty(len(df))
+        starts = np.flatnonzero(np.r_[True, sym[1:] != sym[:-1]]) if len(sym) else np.array([], dtype=int)
+        for lo, hi in zip(starts.tolist(), np.r_[starts[1:], len(sym)].tolist()):
+            out[lo:hi] = self.get(name, ts[lo:hi], vals[lo:hi], symbol=sym[lo], **params)
+        return out
+
+    def flush(self) -> None:
+        """Write entries not yet on disk to cache_dir (no-op without one)."""
+        with self._lock:
+            for key, entry in self._entries.items():
+                self._save(key, entry)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def close(self) -> None:
+        """flush() and drop the in-memory entries."""
+        with self._lock:
+            self.flush()
+            self.clear()
+
+    # -- internals --
+
+    def _extend(self, ind: Indicator, cached: np.ndarray, values: np.ndarray, params: Dict[str, Any]) -> np.ndarray:
+        if ind.lookback is None:
+            return ind.compute(values, **params)
+        n = len(cached)
+        lb = ind.lookback(**params)
+        lo = max(0, n - lb + 1)
+        tail = ind.compute(values[lo:], **params)[n - lo:]
+        return np.concatenate([cached, tail])
+
+    def _put(self, key: Tuple, entry: _Entry) -> None:
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._bytes -= old.values.nbytes
+        self._entries[key] = entry
+        self._bytes += entry.values.nbytes
+        while self._bytes > self.max_bytes and len(self._entries) > 1:
+            ev_key, ev = self._entries.popitem(last=False)
+            self._bytes -= ev.values.nbytes
+            self._save(ev_key, ev)
+
+    def _path(self, key: Tuple) -> Path:
+        digest = hashlib.sha256(repr(key).encode("utf-8")).hexdigest()
+        return self.cache_dir / f"{digest}.npz"
+
+    def _save(self, key: Tuple, entry: _Entry) -> None:
+        if not self.cache_dir or not entry.dirty:
+            return
+        tmp = self._path(key).with_suffix(".tmp.npz")
+        np.savez(tmp, values=entry.values, n=entry.n, fp=entry.fp)
+        tmp.replace(self._path(key))
+        entry.dirty = False
+
+    def _load(self, key: Tuple) -> Optional[_Entry]:
+        if not self.cache_dir:
+            return None
+        p = self._path(key)
+        if not p.exists():
+            return None
+        try:
+            with np.load(p) as z:
+                entry = _Entry(int(z["n"]), str(z["fp"]), z["values"].copy())
+        except Exception:
+            return None
+        self.stats["disk_hits"] += 1
+        return entry
+
+# The cache strategies share while a run is in progress (see feature_scope); none by default,
+# so long-lived processes do not hold indicator arrays between runs.
+_ACTIVE: ContextVar[Optional[FeatureCache]] = ContextVar("pimiopilot_feature_cache", default=None)
+
+@contextmanager
+def feature_scope(cache: Optional[FeatureCache] = None) -> Iterator[FeatureCache]:
+    """Share `cache` (a new in-memory one by default) between strategies inside the block.
+
+    The cache is closed on exit: entries are flushed to its cache_dir, if any, and dropped.
+    """
+    cache = cache if cache is not None else FeatureCache()
+    token = _ACTIVE.set(cache)
+    try:
+        yield cache
+    finally:
+        _ACTIVE.reset(token)
+        cache.close()
+
+def active_cache() -> Optional[FeatureCache]:
+    return _ACTIVE.get()
+
+def indicator(name: str, ts: np.ndarray, values: np.ndarray, *, cache: Optional[FeatureCache] = None,
+              symbol: Any = "", **params: Any) -> np.ndarray:
+    """Indicator `name` from `cache` or the active feature_scope(); computed directly without either."""
+    cache = cache if cache is not None else _ACTIVE.get()
+    if cache is not None:
+        return cache.get(name, ts, values, symbol=symbol, **params)
+    ind = _INDICATORS.get(name)
+    if ind is None:
+        raise KeyError(f"unknown indicator: {name}")
+    return ind.compute(np.asarray(values, dtype="float64"), **params)
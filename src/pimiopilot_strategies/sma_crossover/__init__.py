@@ -1,56 +1,285 @@
+from collections import deque
+import numpy as np
 import pandas as pd
+from pandas.api.indexers import BaseIndexer
 from datetime import datetime, timezone
-from typing import Any, Dict, Optional, List
+from typing import Any, Deque, Dict, Iterable, Optional, List
+
+from ..features import RollingMean, FeatureCache, indicator
+
+_SIGNALS_FORMATS = ("records", "frame")
+_SIGNALS_MODES = ("all", "events")
+
+def _utc_iso_series(ts: pd.Series) -> np.ndarray:
+    """Vectorized equivalent of `pd.Timestamp(x)` -> UTC -> `.isoformat()` for every element."""
+    utc = pd.to_datetime(ts, utc=True)
+    # Bars share timestamps across symbols: format each distinct instant once
+    codes, uniques = pd.factorize(utc, use_na_sentinel=False)
+    naive = uniques.tz_localize(None).to_numpy(dtype="datetime64[s]")
+    out = np.datetime_as_string(naive, unit="s").astype(object) + "+00:00"
+    # isoformat() renders sub-second parts and NaT differently; format those one by one
+    odd = np.asarray(uniques.isna() | (uniques.microsecond != 0) | (uniques.nanosecond != 0))
+    if odd.any():
+        out[odd] = [t.isoformat() for t in uniques[odd]]
+    return out[codes]
+
+def _events(frame: pd.DataFrame) -> pd.DataFrame:
+    """Rows where a symbol's action changes (its first bar included) plus each symbol's last bar."""
+    sym = frame["symbol"].to_numpy()
+    act = frame["action"].to_numpy()
+    if len(sym) == 0:
+        return frame
+    new_sym = np.r_[True, sym[1:] != sym[:-1]]
+    last = np.r_[new_sym[1:], True]
+    keep = new_sym | last | np.r_[True, act[1:] != act[:-1]]
+    return frame[keep].reset_index(drop=True)
+
+class _SymbolState:
+    __slots__ = ("closes", "fast", "slow", "last_ts", "last_action")
+
+    def __init__(self, fast: int, slow: int):
+        self.closes: Deque[float] = deque(maxlen=slow)  # ring buffer of the slow window
+        self.fast = RollingMean(fast)
+        self.slow = RollingMean(slow)
+        self.last_ts: Optional[int] = None  # ns since epoch, UTC
+        self.last_action: Optional[str] = None
+
+    def push(self, close: float) -> float:
+        """Add one bar; returns fast_ma - slow_ma."""
+        buf = self.closes
+        first = not buf
+        fast_out = buf[-self.fast.window] if len(buf) >= self.fast.window else None
+        slow_out = buf[0] if len(buf) == buf.maxlen else None
+        diff = self.fast.push(close, fast_out, first) - self.slow.push(close, slow_out, first)
+        buf.append(close)
+        return diff
 
 class SMACrossover:
     """Reference strategy implementing the PimioPilot interface."""
-    def __init__(self, fast: int = 10, slow: int = 30):
+    input_columns = ("symbol", "ts", "close")
+
+    def __init__(self, fast: int = 10, slow: int = 30, signals_format: str = "records",
+                 feature_cache: Optional[FeatureCache] = None, signals_mode: str = "all"):
         if fast <= 0 or slow <= 0 or fast >= slow:
             raise ValueError("invalid window sizes: expect 0 < fast < slow")
+        if signals_format not in _SIGNALS_FORMATS:
+            raise ValueError(f"invalid signals_format: expect one of {_SIGNALS_FORMATS}")
+        if signals_mode not in _SIGNALS_MODES:
+            raise ValueError(f"invalid signals_mode: expect one of {_SIGNALS_MODES}")
         self.fast, self.slow = fast, slow
+        self.signals_format = signals_format
+        # "events": only action changes + each symbol's last state; a symbol's action holds until its next signal
+        self.signals_mode = signals_mode
+        # moving averages come from this cache, else the run's feature_scope() cache, else are computed
+        self.features = feature_cache
+        self._online: Dict[Any, _SymbolState] = {}
 
-    def _to_utc_iso(self, ts):
-        ts = pd.to_datetime(ts)
-        if getattr(ts, "tzinfo", None) is None or ts.tzinfo is None:
-            ts = ts.tz_localize("UTC")
-        else:
-            ts = ts.tz_convert("UTC")
-        return ts.isoformat()
-
-    def generate_signal(self, data: pd.DataFrame, *, as_of: Optional[str] = None, context: Optional[Dict[str, Any]] = None):
+    def compute_actions(self, data: pd.DataFrame, *, context: Optional[Dict[str, Any]] = None) -> pd.DataFrame:
+        """Return a frame with columns ts (UTC ISO string), symbol, action sorted by (symbol, ts)."""
         required = {"ts", "close"}
         missing = required - set(map(str, data.columns))
         if missing:
             raise ValueError(f"missing columns: {missing}")
 
-        df = data.copy()
-        if "symbol" not in df.columns:
-            df["symbol"] = (context or {}).get("symbol", "UNKNOWN")
+        # Only the columns we need; no full copy of the input
+        if "symbol" in data.columns:
+            df = data[["symbol", "ts", "close"]]
+        else:
+            df = pd.DataFrame({"symbol": (context or {}).get("symbol", "UNKNOWN"), "ts": data["ts"], "close": data["close"]})
 
         df = df.sort_values(["symbol", "ts"])
 
-        rows: List[Dict[str, Any]] = []
-        for sym, g in df.groupby("symbol", sort=False):
-            fast_ma = g["close"].rolling(self.fast, min_periods=1).mean()
-            slow_ma = g["close"].rolling(self.slow, min_periods=1).mean()
-            diff = fast_ma - slow_ma
-            action = diff.apply(lambda x: "BUY" if x > 0 else ("SELL" if x < 0 else "HOLD"))
-            out = g.assign(action=action)
-            for r in out.itertuples(index=False):
-                rows.append({
-                    "ts": self._to_utc_iso(getattr(r, "ts")),
-                    "symbol": getattr(r, "symbol", sym),
-                    "action": getattr(r, "action"),
-                })
+        # Rows are contiguous per symbol after the sort; roll each slice independently
+        sym = df["symbol"].to_numpy()
+        starts = np.flatnonzero(np.r_[True, sym[1:] != sym[:-1]]) if len(sym) else np.array([], dtype=int)
+        utc = pd.to_datetime(df["ts"], utc=True)
+        ts_ns = pd.DatetimeIndex(utc).as_unit("ns").asi8
+        close = df["close"].to_numpy(dtype="float64")
+        diff = np.empty(len(close))
+        for lo, hi in zip(starts.tolist(), np.r_[starts[1:], len(sym)].tolist()):
+            t, c = ts_ns[lo:hi], close[lo:hi]
+            diff[lo:hi] = (indicator("sma", t, c, cache=self.features, symbol=sym[lo], window=self.fast)
+                           - indicator("sma", t, c, cache=self.features, symbol=sym[lo], window=self.slow))
+        action = np.select([diff > 0, diff < 0], ["BUY", "SELL"], "HOLD").astype(object)
+
+        return pd.DataFrame({
+            "ts": _utc_iso_series(utc),
+            "symbol": sym,
+            "action": action,
+        })
+
+    def generate_signal(self, data: pd.DataFrame, *, as_of: Optional[str] = None, context: Optional[Dict[str, Any]] = None,
+                        signals_format: Optional[str] = None):
+        fmt = signals_format or self.signals_format
+        if fmt not in _SIGNALS_FORMATS:
+            raise ValueError(f"invalid signals_format: expect one of {_SIGNALS_FORMATS}")
+
+        frame = self.compute_actions(data, context=context)
+        if self.signals_mode == "events":
+            frame = _events(frame)
+        if fmt == "frame":
+            signals = frame
+        else:
+            signals = [
+                {"ts": t, "symbol": s, "action": a}
+                for t, s, a in zip(frame["ts"].tolist(), frame["symbol"].tolist(), frame["action"].tolist())
+            ]
 
         return {
             "schema_version": "1.0",
             "generated_at": datetime.now(timezone.utc).isoformat(),
             "as_of": as_of,
-            "signals": rows,
-            "metadata": {"strategy": "sma_crossover", "fast": self.fast, "slow": self.slow},
+            "signals": signals,
+            "metadata": self._metadata(),
         }
 
+    def _metadata(self) -> Dict[str, Any]:
+        meta: Dict[str, Any] = {"strategy": "sma_crossover", "fast": self.fast, "slow": self.slow}
+        if self.signals_mode != "all":
+            meta["signals_mode"] = self.signals_mode
+        return meta
+
+    # --- Online protocol: O(1) per new bar, same signals as generate_signal on the full history ---
+
+    def update(self, data: pd.DataFrame, *, as_of: Optional[str] = None, context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Consume newly arrived bars and return signals for those bars only.
+
+        Bars at or before the last seen ts of their symbol are skipped (re-polled bars).
+        The result equals generate_signal on the whole history so far, restricted to the new
+        bars: in "events" mode, the bars whose action differs from the symbol's previous one
+        plus each symbol's last new bar (its current state).
+        """
+        required = {"ts", "close"}
+        missing = required - set(map(str, data.columns))
+        if missing:
+            raise ValueError(f"missing columns: {missing}")
+        if "symbol" in data.columns:
+            df = data[["symbol", "ts", "close"]]
+        else:
+            df = pd.DataFrame({"symbol": (context or {}).get("symbol", "UNKNOWN"), "ts": data["ts"], "close": data["close"]})
+        df = df.sort_values(["symbol", "ts"])
+
+        ts_ns = pd.DatetimeIndex(pd.to_datetime(df["ts"], utc=True)).as_unit("ns").asi8.tolist()
+        keep: Dict[int, str] = {}
+        latest: Dict[Any, tuple] = {}  # symbol -> (row, action) of its last new bar
+        events = self.signals_mode == "events"
+        for i, (sym, ts, close) in enumerate(zip(df["symbol"].tolist(), ts_ns, df["close"].astype("float64").tolist())):
+            st = self._online.get(sym)
+            if st is None:
+                st = self._online[sym] = _SymbolState(self.fast, self.slow)
+            elif st.last_ts is not None and ts <= st.last_ts:
+                continue
+            st.last_ts = ts
+            diff = st.push(close)
+            action = "BUY" if diff > 0 else ("SELL" if diff < 0 else "HOLD")
+            latest[sym] = (i, action)
+            if events and action == st.last_action:
+                continue
+            st.last_action = action
+            keep[i] = action
+        if events:
+            # like _events(): each symbol's last bar is reported even without a change
+            keep.update(latest.values())
+        rows = sorted(keep)
+        actions = [keep[i] for i in rows]
+
+        new = df.iloc[rows]
+        signals = [
+            {"ts": t, "symbol": s, "action": a}
+            for t, s, a in zip(_utc_iso_series(new["ts"]).tolist(), new["symbol"].tolist(), actions)
+        ]
+        return {
+            "schema_version": "1.0",
+            "generated_at": datetime.now(timezone.utc).isoformat(),
+            "as_of": as_of,
+            "signals": signals,
+            "metadata": self._metadata(),
+        }
+
+    def snapshot(self) -> Dict[str, Any]:
+        """JSON-serializable online state (floats round-trip exactly through json)."""
+        return {
+            "strategy": "sma_crossover", "fast": self.fast, "slow": self.slow,
+            "symbols": {
+                str(sym): {"last_ts": st.last_ts, "last_action": st.last_action, "closes": list(st.closes),
+                           "fast": st.fast.state(), "slow": st.slow.state()}
+                for sym, st in self._online.items()
+            },
+        }
+
+    def restore(self, state: Dict[str, Any]) -> None:
+        if state.get("strategy") != "sma_crossover" or state.get("fast") != self.fast or state.get("slow") != self.slow:
+            raise ValueError("snapshot does not match this strategy's parameters")
+        online: Dict[Any, _SymbolState] = {}
+        for sym, st in state.get("symbols", {}).items():
+            s = _SymbolState(self.fast, self.slow)
+            s.last_ts = st["last_ts"]
+            s.last_action = st.get("last_action")
+            s.closes.extend(st["closes"])
+            s.fast.load(st["fast"])
+            s.slow.load(st["slow"])
+            online[sym] = s
+        self._online = online
+
+    def reset(self, symbols: Iterable[Any]) -> None:
+        for sym in symbols:
+            self._online.pop(sym, None)
+
+# --- Sweep hooks (used by pimiopilot_strategy_runner.sweep) ---
+# Sorting and per-symbol bounds are computed once; each window's SMA is one rolling
+# pass over all symbols (the same pandas kernel generate_signal uses, so NaN closes and
+# exact ties come out identical), memoised so parameter sets sharing a window reuse it.
+
+class _SymbolWindows(BaseIndexer):
+    """Trailing windows of `window` rows that never reach back past a symbol's first row."""
+    def get_window_bounds(self, num_values=0, min_periods=None, center=None, closed=None, step=None):
+        end = np.arange(1, num_values + 1, dtype=np.int64)
+        start = np.maximum(self.group_start, end - self.window).astype(np.int64)
+        return start, end
+
+# bytes of memoised SMA arrays kept per prepared dataset
+_SWEEP_MEMO_BYTES = 256 * 1024 * 1024
+
+def sweep_prepare(data: pd.DataFrame, *, context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    if "symbol" in data.columns:
+        df = data[["symbol", "ts", "close"]]
+    else:
+        df = pd.DataFrame({"symbol": (context or {}).get("symbol", "UNKNOWN"), "ts": data["ts"], "close": data["close"]})
+    df = df.sort_values(["symbol", "ts"])
+    sym = df["symbol"].to_numpy()
+    close = df["close"].to_numpy(dtype="float64")
+    n = len(close)
+    starts = np.flatnonzero(np.r_[True, sym[1:] != sym[:-1]]) if n else np.array([], dtype=int)
+    sizes = np.diff(np.r_[starts, n])
+    return {
+        "close": close,
+        "bounds": list(zip(starts.tolist(), np.r_[starts[1:], n].tolist())),
+        "symbols": sym[starts].tolist(),
+        "group_start": np.repeat(starts, sizes).astype(np.int64),
+        "_sma": {},
+    }
+
+def _sweep_sma(prepared: Dict[str, Any], window: int) -> np.ndarray:
+    memo = prepared["_sma"]
+    if window not in memo:
+        indexer = _SymbolWindows(window=window, group_start=prepared["group_start"])
+        values = pd.Series(prepared["close"]).rolling(indexer, min_periods=1).mean().to_numpy()
+        while memo and (len(memo) + 1) * values.nbytes > _SWEEP_MEMO_BYTES:
+            memo.pop(next(iter(memo)))  # oldest first
+        memo[window] = values
+    return memo[window]
+
+def sweep_positions(prepared: Dict[str, Any], params: Dict[str, Any]) -> np.ndarray:
+    """+1/-1/0 (BUY/SELL/HOLD) per row of prepared["close"] for one parameter set."""
+    strat = build_strategy(params)  # validates windows
+    diff = _sweep_sma(prepared, strat.fast) - _sweep_sma(prepared, strat.slow)
+    return np.select([diff > 0, diff < 0], [1, -1], 0).astype("int8")
+
 def build_strategy(config: Optional[Dict[str, Any]] = None) -> "SMACrossover":
     cfg = config or {}
-    return SMACrossover(fast=int(cfg.get("fast", 10)), slow=int(cfg.get("slow", 30)))
+    return SMACrossover(
+        fast=int(cfg.get("fast", 10)),
+        slow=int(cfg.get("slow", 30)),
+        signals_format=cfg.get("signals_format", "records"),
+        signals_mode=cfg.get("signals_mode", "all"),
+    )
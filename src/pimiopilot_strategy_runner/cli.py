@@ -1,22 +1,116 @@
 from __future__ import annotations
-import sys, json, argparse, pandas as pd
-from pimiopilot_strategy_runner.runner import StrategyRunner, StrategyRef
+import sys, json, argparse
+from contextlib import ExitStack
+from pimiopilot_strategy_runner.runner import StrategyRunner, StrategyRef, load_strategy, persist_signals
 
 def main():
-    ap = argparse.ArgumentParser(description="Run a strategy over input CSV")
-    ap.add_argument("--module", required=True, help="Strategy module, e.g. pimiopilot_strategies.sma_crossover")
+    ap = argparse.ArgumentParser(description="Run strategies over CSV/Parquet/Arrow input or a query spec")
+    ap.add_argument("--module", help="Strategy module, e.g. pimiopilot_strategies.sma_crossover")
+    ap.add_argument("--strategies", help='JSON list of {"module": ..., "params": {...}}; runs all of them in one pass')
     ap.add_argument("--params", default="{}", help="JSON dict of params")
     ap.add_argument("--mode", default="batch", choices=["batch","online"])
-    ap.add_argument("--csv", required=True, help="Input CSV with at least columns: ts, open, high, low, close, volume")
+    src = ap.add_mutually_exclusive_group(required=True)
+    src.add_argument("--csv", help="Input CSV with at least columns: ts, open, high, low, close, volume")
+    src.add_argument("--input", help="Input file: .parquet, .arrow/.feather (Arrow IPC) or .csv")
+    src.add_argument("--query", help="Query spec YAML/JSON (TimescaleDB or Parquet lake); streamed per symbol batch")
+    src.add_argument("--parquet", help="Parquet file or dataset directory; streamed per symbol batch")
+    ap.add_argument("--query-schema", default="schemas/query.schema.json", help="JSON Schema for --query")
+    ap.add_argument("--symbols", help="Comma-separated symbols to read from --parquet (default: all)")
+    ap.add_argument("--symbols-per-batch", type=int, default=1, help="Symbols per streamed batch (--query/--parquet)")
+    ap.add_argument("--signals-mode", choices=["all", "events"], help="events: only action changes + last state per symbol")
+    ap.add_argument("--output", default="json", choices=["json", "ndjson"], help="ndjson: stream one signal per line")
+    ap.add_argument("--persist", action="store_true", help="Upsert signals into the TimescaleDB strategy_signals hypertable")
     ap.add_argument("--log", default="out/strategy_runner.log", help="NDJSON log path")
+    ap.add_argument("--grid", help="JSON dict of param -> list of values; runs a parameter sweep instead")
+    ap.add_argument("--workers", type=int, default=None, help="Sweep / multi-strategy process pool size (default: all cores)")
     args = ap.parse_args()
+    if not args.module and not args.strategies:
+        ap.error("one of --module or --strategies is required")
+    if args.strategies and args.mode == "online":
+        ap.error("--mode online keeps per-strategy state and runs a single --module; it cannot be used with --strategies")
+    # pandas/pyarrow are loaded only once there is work to do (not for --help or usage errors)
+    from pimiopilot_strategy_runner.sources import load_frame, declared_columns
+    if args.grid and not (args.csv or args.input):
+        ap.error("--grid needs the whole history; use --csv or --input")
+    # --csv is CSV whatever the file is called; --input goes by suffix
+    fmt = "csv" if args.csv else None
 
     params = json.loads(args.params)
-    ref = StrategyRef(module=args.module, params=params)
-    df = pd.read_csv(args.csv)
-    r = StrategyRunner(ref, log_path=args.log)
-    out = r.run(df, mode=args.mode)
-    print(json.dumps(out, ensure_ascii=False, indent=2))
+    if args.grid:
+        from pimiopilot_strategy_runner.sweep import sweep
+        df = load_frame(args.csv or args.input, fmt=fmt)
+        table = sweep(args.module, df, json.loads(args.grid), base_params=params, max_workers=args.workers, log_path=args.log)
+        print(table.to_json(orient="records"))
+        return
+
+    if args.strategies:
+        refs = [StrategyRef(module=s["module"], params=s.get("params", {})) for s in json.loads(args.strategies)]
+    else:
+        refs = [StrategyRef(module=args.module, params=params)]
+    if args.signals_mode:
+        refs = [StrategyRef(module=r.module, params={**r.params, "signals_mode": args.signals_mode}) for r in refs]
+    # read only the columns the strategies declare they use
+    columns = declared_columns(load_strategy(r) for r in refs)
+
+    if args.query or args.parquet:
+        _run_stream(args, refs, columns)
+        return
+
+    df = load_frame(args.csv or args.input, columns=columns, fmt=fmt)
+    if args.strategies:
+        from pimiopilot_strategy_runner.multi import MultiStrategyRunner
+        with MultiStrategyRunner(refs, log_path=args.log, max_workers=args.workers) as runner:
+            outs = runner.run(df)
+    else:
+        outs = [StrategyRunner(refs[0], log_path=args.log).run(df, mode=args.mode)]
+    if args.persist:
+        outs = list(_persisted(outs, refs))
+    if args.output == "ndjson":
+        _write_ndjson(outs, refs, multi=bool(args.strategies))
+    else:
+        print(json.dumps(outs if args.strategies else outs[0], ensure_ascii=False, indent=2))
+
+def _persisted(envelopes, refs):
+    """Upsert each envelope's signals (envelopes come in refs order, repeating per batch)."""
+    for k, env in enumerate(envelopes):
+        persist_signals(env, refs[k % len(refs)])
+        yield env
+
+def _write_ndjson(envelopes, refs, multi: bool) -> None:
+    """Signals only, one per line; with several strategies each line names its strategy in `extras`."""
+    from pimiopilot_strategy_runner.writer import NDJSONSignalWriter
+    w = NDJSONSignalWriter(sys.stdout)
+    for k, env in enumerate(envelopes):
+        ref = refs[k % len(refs)]
+        w.write(env, extras={"strategy": ref.module, "params": ref.params} if multi else None)
+
+def _run_stream(args, refs, columns) -> None:
+    """Out-of-core run: one compact JSON envelope per symbol batch, printed as each batch finishes."""
+    from pimiopilot_strategy_runner import sources
+    if args.query:
+        spec = sources.load_query_spec(args.query, args.query_schema)
+        frames = sources.iter_query_batches(spec, symbols_per_batch=args.symbols_per_batch)
+    else:
+        symbols = [s.strip() for s in args.symbols.split(",") if s.strip()] if args.symbols else None
+        frames = sources.iter_parquet_batches(args.parquet, symbols=symbols, symbols_per_batch=args.symbols_per_batch, columns=columns)
+
+    with ExitStack() as stack:
+        if args.strategies:
+            from pimiopilot_strategy_runner.multi import MultiStrategyRunner
+            # one process pool for the whole stream, not one per batch
+            runner = stack.enter_context(MultiStrategyRunner(refs, log_path=args.log, max_workers=args.workers))
+            envelopes = runner.run_batches(frames)
+        else:
+            runner = StrategyRunner(refs[0], log_path=args.log)
+            envelopes = runner.run_batches(frames, mode=args.mode)
+        if args.persist:
+            envelopes = _persisted(envelopes, refs)
+        if args.output == "ndjson":
+            _write_ndjson(envelopes, refs, multi=bool(args.strategies))
+            return
+        for env in envelopes:
+            sys.stdout.write(json.dumps(env, ensure_ascii=False, default=str) + "\n")
+            sys.stdout.flush()
 
 if __name__ == "__main__":
     main()
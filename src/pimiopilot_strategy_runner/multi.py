@@ -0,0 +1,155 @@
+from __future__ import annotations
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+import os
+import pandas as pd
+import time
+
+from pimiopilot_strategies.features import feature_scope
+
+from .runner import NDJSONLogger, StrategyRef, load_strategy, envelope
+
+_NUMERIC = ("open", "high", "low", "close", "adj_close", "volume")
+
+def prepare_input(df: pd.DataFrame) -> List[Tuple[Any, pd.DataFrame]]:
+    """Sort, coerce types and split by symbol once, for all strategies.
+
+    ts becomes tz-aware UTC datetimes and price/volume columns float64, so strategies
+    do not re-parse them; each partition is already in ts order.
+    """
+    d = df.copy()
+    if "symbol" not in d.columns:
+        d["symbol"] = "UNKNOWN"
+    d["ts"] = pd.to_datetime(d["ts"], utc=True)
+    for c in _NUMERIC:
+        if c in d.columns:
+            d[c] = d[c].astype("float64")
+    d = d.sort_values(["symbol", "ts"], kind="stable").reset_index(drop=True)
+    return [(sym, part) for sym, part in d.groupby("symbol", sort=False)]
+
+def _merge(outputs: List[Dict[str, Any]], rows: int, cols: int) -> Dict[str, Any]:
+    """Concatenate per-partition strategy outputs (in symbol order) into one output."""
+    if not outputs:
+        return {"signals": [], "input": {"rows": rows, "cols": cols}}
+    merged = dict(outputs[-1])
+    parts = [o.get("signals", []) for o in outputs]
+    if parts and isinstance(parts[0], pd.DataFrame):
+        merged["signals"] = pd.concat(parts, ignore_index=True)
+    else:
+        merged["signals"] = [s for p in parts for s in p]
+    merged["input"] = {"rows": rows, "cols": cols}
+    return merged
+
+# Strategies are built once per worker process by the pool initializer
+_WORKER: Dict[str, Any] = {}
+
+def _init_worker(refs: List[StrategyRef]) -> None:
+    _WORKER["strategies"] = [load_strategy(r) for r in refs]
+
+def _run_batch(parts: List[pd.DataFrame]) -> List[Tuple[Optional[List[Dict[str, Any]]], Optional[str], float]]:
+    """Run every strategy over a batch of symbol partitions: (outputs, error, seconds) per strategy.
+
+    The strategies share one feature cache for the batch, so an indicator used by several
+    of them is computed once; it is dropped when the batch is done.
+    """
+    results = []
+    with feature_scope():
+        for strat in _WORKER["strategies"]:
+            t0 = time.perf_counter()
+            try:
+                results.append(([strat.generate_signal(p) for p in parts], None, time.perf_counter() - t0))
+            except Exception as e:
+                results.append((None, f"{type(e).__name__}: {e}", time.perf_counter() - t0))
+    return results
+
+class MultiStrategyRunner:
+    """Run several strategies over the same bars in one pass, parallel across symbols.
+
+    Strategies are assumed to be per-symbol (a symbol's signals only depend on its own
+    bars), which holds for the bundled strategies. A failing strategy is reported with
+    status "error" in its envelope without affecting the others.
+
+    The process pool is started on first use and reused by every run() (e.g. one per
+    streamed symbol batch) until close(); use the runner as a context manager.
+    """
+    def __init__(self, refs: List[StrategyRef], log_path: str | Path = "out/strategy_runner.log",
+                 max_workers: Optional[int] = None, symbols_per_task: Optional[int] = None):
+        self.refs = list(refs)
+        for r in self.refs:
+            load_strategy(r)  # fail fast on bad modules/params before any work is scheduled
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.symbols_per_task = symbols_per_task
+        self.logger = NDJSONLogger(log_path)
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self.logger.log("multi_runner_init", modules=[r.module for r in self.refs], workers=self.max_workers)
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.max_workers, initializer=_init_worker, initargs=(self.refs,))
+            self.logger.log("pool_start", workers=self.max_workers)
+        return self._pool
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+        self.logger.close()
+
+    def __enter__(self) -> "MultiStrategyRunner":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def run(self, df: pd.DataFrame) -> List[Dict[str, Any]]:
+        t0 = time.time()
+        rows, cols = int(df.shape[0]), int(df.shape[1])
+        self.logger.log("run_start", mode="batch", rows=rows, cols=cols, strategies=len(self.refs))
+
+        parts = [p for _, p in prepare_input(df)]
+        self.logger.log("input_prepared", symbols=len(parts), seconds=round(time.time() - t0, 6))
+
+        # a few tasks per worker keeps the pool busy when symbol sizes differ
+        size = self.symbols_per_task or max(1, len(parts) // (self.max_workers * 4))
+        batches = [parts[i:i + size] for i in range(0, len(parts), size)]
+        if self.max_workers == 1 or len(batches) <= 1:
+            _init_worker(self.refs)
+            batch_results = [_run_batch(b) for b in batches]
+        else:
+            batch_results = list(self._executor().map(_run_batch, batches))
+
+        envelopes = []
+        for k, ref in enumerate(self.refs):
+            outputs: List[Dict[str, Any]] = []
+            errors = []
+            seconds = 0.0
+            for res in batch_results:
+                outs, err, sec = res[k]
+                seconds += sec
+                if err:
+                    errors.append(err)
+                else:
+                    outputs.extend(outs)
+            if errors:
+                out = {"error": errors[0], "input": {"rows": rows, "cols": cols}}
+                envelopes.append(envelope(out, ref.module, "batch", status="error"))
+            else:
+                envelopes.append(envelope(_merge(outputs, rows, cols), ref.module, "batch"))
+            self.logger.log("strategy_done", module=ref.module, cpu_seconds=round(seconds, 6), status=envelopes[-1]["status"])
+
+        self.logger.log("run_end", seconds=round(time.time() - t0, 6), strategies=len(self.refs))
+        self.logger.flush()
+        return envelopes
+
+    def run_batches(self, frames: Iterable[pd.DataFrame]) -> Iterator[Dict[str, Any]]:
+        """run() over input arriving one symbol batch at a time; yields every strategy's envelope per batch."""
+        t0 = time.time()
+        batches = rows = 0
+        for df in frames:
+            if df.empty:
+                continue
+            yield from self.run(df)
+            batches += 1
+            rows += int(df.shape[0])
+        self.logger.log("stream_end", batches=batches, rows=rows, seconds=round(time.time() - t0, 6))
@@ -1,25 +1,15 @@
 from __future__ import annotations
 from dataclasses import dataclass
-from typing import Dict, Any, Callable, Optional, Literal
+from typing import TYPE_CHECKING, Dict, Any, Callable, Iterable, Iterator, List, Optional, Literal
 from importlib import import_module
 from pathlib import Path
 from datetime import datetime, timezone
-import pandas as pd
-import time, json
-
-# Reuse NDJSON logger from data module if available
-try:
-    from pimiopilot_data.io.ndjson_logger import NDJSONLogger
-except Exception:
-    class NDJSONLogger:  # fallback
-        def __init__(self, path: str | Path):
-            self.path = Path(path)
-            self.path.parent.mkdir(parents=True, exist_ok=True)
-            self.path.write_text("", encoding="utf-8")
-        def log(self, event: str, **fields):
-            rec = {"ts": time.time(), "event": event} | fields
-            with self.path.open("a", encoding="utf-8") as f:
-                f.write(json.dumps(rec) + "\n")
+import time
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+from pimiopilot_data.io.ndjson_logger import NDJSONLogger
 
 SCHEMA_VERSION = "1.0"
 
@@ -28,6 +18,33 @@ class StrategyRef:
     module: str   # e.g., "pimiopilot_strategies.sma_crossover"
     params: Dict[str, Any]
 
+def load_strategy(ref: StrategyRef):
+    mod = import_module(ref.module)
+    if not hasattr(mod, "build_strategy"):
+        raise ImportError(f"strategy module {ref.module} missing build_strategy()")
+    return mod.build_strategy(ref.params)
+
+def envelope(out: Dict[str, Any], module: str, mode: str, status: str = "ok") -> Dict[str, Any]:
+    """Minimal runner envelope around a strategy output."""
+    return {
+        "schema": {"runner_schema": "schemas/strategy_runner.schema.json", "version": SCHEMA_VERSION},
+        "strategy_output": out,
+        "runner": {"module": module, "mode": mode},
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "status": status,
+    }
+
+# Output-shape params: they do not change which action a bar gets, so they are not part of the stored key
+_PRESENTATION_PARAMS = ("signals_format", "signals_mode")
+
+def persist_signals(env: Dict[str, Any], ref: StrategyRef) -> int:
+    """Upsert an envelope's signals into the TimescaleDB signals hypertable (see sinks.signals)."""
+    from pimiopilot_data.sinks.signals import upsert_signals
+    if env.get("status") != "ok":
+        return 0
+    params = {p: v for p, v in ref.params.items() if p not in _PRESENTATION_PARAMS}
+    return upsert_signals(env, strategy=ref.module, params=params)
+
 class StrategyRunner:
     def __init__(self, strat: StrategyRef, log_path: str | Path = "out/strategy_runner.log"):
         self.ref = strat
@@ -35,22 +52,19 @@ class StrategyRunner:
 
         self.logger.log("runner_init", module=strat.module, params=strat.params)
 
-        mod = import_module(self.ref.module)
-        if not hasattr(mod, "build_strategy"):
-            raise ImportError(f"strategy module {self.ref.module} missing build_strategy()")
-        self.strategy = mod.build_strategy(self.ref.params)
+        self.strategy = load_strategy(self.ref)
         self.logger.log("strategy_loaded", module=self.ref.module)
 
     def run(self, df: pd.DataFrame, mode: Literal["batch","online"]="batch") -> Dict[str, Any]:
         t0 = time.time()
         self.logger.log("run_start", mode=mode, rows=int(df.shape[0]), cols=int(df.shape[1]))
 
-        if mode == "online":
-            # online: only use available data "up to now", same interface to strategy
-            # The strategy itself decides how to interpret the full df for an online tick
-            pass  # no special slicing by default
-
-        out = self.strategy.generate_signal(df)
+        if mode == "online" and hasattr(self.strategy, "update"):
+            # online: df holds only the new bars; the strategy keeps per-symbol state (O(1) per bar)
+            out = self.strategy.update(df)
+        else:
+            # batch, or a strategy without the online protocol: recompute over the given history
+            out = self.strategy.generate_signal(df)
 
         # Normalize: ensure 'input' exists for downstream consumers/tests
         if isinstance(out, dict) and "input" not in out:
@@ -58,11 +72,44 @@ class StrategyRunner:
 
         elapsed = round(time.time() - t0, 6)
         self.logger.log("run_end", seconds=elapsed, output_keys=list(out.keys()))
+        self.logger.flush()  # one write per run
         # normalize minimal envelope
-        return {
-            "schema": {"runner_schema": "schemas/strategy_runner.schema.json", "version": SCHEMA_VERSION},
-            "strategy_output": out,
-            "runner": {"module": self.ref.module, "mode": mode},
-            "generated_at": datetime.now(timezone.utc).isoformat(),
-            "status": "ok",
-        }
+        return envelope(out, self.ref.module, mode)
+
+    def run_batches(self, frames: Iterable[pd.DataFrame], mode: Literal["batch","online"]="batch") -> Iterator[Dict[str, Any]]:
+        """Run over input arriving in pieces (e.g. one symbol batch at a time), yielding one envelope per piece.
+
+        Only the current piece is held, so memory follows the largest piece rather than the
+        whole input. Assumes per-symbol strategies: each symbol must be in a single piece
+        (batch mode) or pieces must be in ts order per symbol (online mode).
+        """
+        t0 = time.time()
+        batches = rows = 0
+        for df in frames:
+            if df.empty:
+                continue
+            yield self.run(df, mode=mode)
+            batches += 1
+            rows += int(df.shape[0])
+        self.logger.log("stream_end", batches=batches, rows=rows, seconds=round(time.time() - t0, 6))
+
+    def snapshot_state(self) -> Dict[str, Any]:
+        """Online state of the strategy (see OnlineStrategy.snapshot)."""
+        if not hasattr(self.strategy, "snapshot"):
+            raise TypeError(f"strategy module {self.ref.module} does not support online state")
+        state = self.strategy.snapshot()
+        self.logger.log("state_snapshot", module=self.ref.module, symbols=len(state.get("symbols", {})))
+        return state
+
+    def restore_state(self, state: Dict[str, Any]) -> None:
+        if not hasattr(self.strategy, "restore"):
+            raise TypeError(f"strategy module {self.ref.module} does not support online state")
+        self.strategy.restore(state)
+        self.logger.log("state_restore", module=self.ref.module, symbols=len(state.get("symbols", {})))
+
+    def reset_state(self, symbols: List[str]) -> None:
+        """Forget the online state of `symbols` (see OnlineStrategy.reset)."""
+        if not hasattr(self.strategy, "reset"):
+            raise TypeError(f"strategy module {self.ref.module} does not support resetting online state")
+        self.strategy.reset(symbols)
+        self.logger.log("state_reset", module=self.ref.module, symbols=len(symbols))
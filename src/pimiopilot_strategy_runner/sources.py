@@ -0,0 +1,152 @@
+from __future__ import annotations
+import copy
+import csv
+import json
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+_NUMERIC = ("open", "high", "low", "close", "adj_close", "volume", "dividends", "stock_splits")
+_SUFFIX_FORMATS = {".csv": "csv", ".parquet": "parquet", ".pq": "parquet",
+                   ".arrow": "arrow", ".feather": "arrow", ".ipc": "arrow"}
+
+def _batches(symbols: Sequence[str], size: int) -> Iterator[List[str]]:
+    size = max(1, int(size))
+    for i in range(0, len(symbols), size):
+        yield list(symbols[i:i + size])
+
+def _sorted(df: pd.DataFrame) -> pd.DataFrame:
+    if df.empty or "symbol" not in df.columns or "ts" not in df.columns:
+        return df
+    return df.sort_values(["symbol", "ts"], kind="stable").reset_index(drop=True)
+
+def declared_columns(strategies: Iterable[Any]) -> Optional[List[str]]:
+    """Union of the strategies' `input_columns`, or None (read everything) if any does not declare them."""
+    cols: List[str] = []
+    for strat in strategies:
+        declared = getattr(strat, "input_columns", None)
+        if declared is None:
+            return None
+        cols.extend(declared)
+    return list(dict.fromkeys(cols))
+
+def _utc_ts(arr: pa.ChunkedArray) -> pa.ChunkedArray:
+    """ts as timestamp[ns, UTC], like pd.to_datetime(utc=True): naive values are taken as UTC."""
+    utc = pa.timestamp("ns", tz="UTC")
+    if pa.types.is_timestamp(arr.type):
+        if arr.type.tz is None:
+            return pc.assume_timezone(arr.cast(pa.timestamp("ns")), "UTC")
+        return arr.cast(utc)
+    if pa.types.is_string(arr.type) or pa.types.is_large_string(arr.type):
+        try:
+            return arr.cast(utc)  # ISO 8601 with offsets / Z
+        except pa.ArrowInvalid:
+            pass
+        try:
+            return pc.assume_timezone(arr.cast(pa.timestamp("ns")), "UTC")  # naive ISO 8601
+        except pa.ArrowInvalid:
+            pass
+    # mixed or unusual formats: let pandas parse each distinct value once
+    codes, uniques = pd.factorize(arr.to_pandas(), use_na_sentinel=False)
+    parsed = pd.DatetimeIndex(pd.to_datetime(pd.Index(uniques), utc=True)).as_unit("ns").take(codes)
+    return pa.chunked_array([pa.array(parsed, type=utc)])
+
+def _typed(table: pa.Table) -> pa.Table:
+    for i, name in enumerate(table.column_names):
+        col = table.column(i)
+        if name == "ts":
+            table = table.set_column(i, name, _utc_ts(col))
+        elif name in _NUMERIC and col.type != pa.float64():
+            table = table.set_column(i, name, col.cast(pa.float64()))
+    # pandas metadata would convert the typed columns back to their original dtypes
+    return table.replace_schema_metadata(None)
+
+def load_frame(path: str | Path, columns: Optional[Sequence[str]] = None, fmt: Optional[str] = None) -> pd.DataFrame:
+    """Load bars from CSV, Parquet or Arrow IPC with Arrow's multithreaded readers.
+
+    Only `columns` (plus symbol/ts when present) are read. `ts` is parsed once to
+    tz-aware UTC and price/volume columns are float64, so strategies need not convert.
+    """
+    path = Path(path)
+    fmt = fmt or _SUFFIX_FORMATS.get(path.suffix.lower())
+    if fmt not in ("csv", "parquet", "arrow"):
+        raise ValueError(f"Unsupported input format: {path.name} (expected .csv, .parquet, .arrow/.feather)")
+    wanted = list(dict.fromkeys(["symbol", "ts"] + list(columns))) if columns else None
+
+    if fmt == "csv":
+        with path.open("r", encoding="utf-8", newline="") as f:
+            header = next(csv.reader(f), [])
+        names = [c for c in header if wanted is None or c in wanted]
+        types = {c: pa.float64() for c in names if c in _NUMERIC}
+        types.update({c: pa.string() for c in ("symbol", "ts") if c in names})
+        table = pacsv.read_csv(
+            path,
+            read_options=pacsv.ReadOptions(use_threads=True, block_size=16 << 20),
+            convert_options=pacsv.ConvertOptions(include_columns=names, column_types=types),
+        )
+    elif fmt == "parquet":
+        names = pq.read_schema(path).names
+        table = pq.read_table(path, columns=[c for c in names if wanted is None or c in wanted], use_threads=True)
+    else:
+        from pimiopilot_data.io.arrow_ipc import read_arrow_ipc
+        table = read_arrow_ipc(path)
+        if wanted is not None:
+            table = table.select([c for c in table.column_names if c in wanted])
+    return _typed(table).to_pandas()
+
+def load_query_spec(path: str | Path, schema_path: str | Path = Path("schemas") / "query.schema.json") -> Dict[str, Any]:
+    """Load a query spec (YAML/JSON) as input for a strategy run; `output` is not required."""
+    from pimiopilot_data.validator import DefaultFillingValidator, yaml_safe_load
+    spec = yaml_safe_load(path)
+    schema = json.loads(Path(schema_path).read_text(encoding="utf-8"))
+    schema["required"] = [r for r in schema.get("required", []) if r != "output"]
+    DefaultFillingValidator(schema).validate(spec)
+    return spec
+
+def iter_query_batches(spec: Dict[str, Any], symbols_per_batch: int = 1) -> Iterator[pd.DataFrame]:
+    """Answer a query spec a few symbols at a time (TimescaleDB or Parquet lake, per spec.backend).
+
+    Each batch is a separate query restricted to its symbols, so only one batch is held
+    in memory. `limit` is dropped: it would apply per batch, not to the whole run.
+    """
+    from pimiopilot_data.query_runner import resolve_time_range, _select_backend
+    spec = resolve_time_range(copy.deepcopy(spec))
+    spec.pop("limit", None)
+    _, fetch_df, _ = _select_backend(spec)
+    for batch in _batches(spec["symbols"], symbols_per_batch):
+        yield _sorted(fetch_df({**spec, "symbols": batch, "order_by": ["symbol ASC", "ts ASC"]}))
+
+def parquet_symbols(dataset: ds.Dataset) -> List[str]:
+    """Distinct symbols of a dataset, reading only the symbol column batch by batch."""
+    seen: set = set()
+    for rb in dataset.to_batches(columns=["symbol"]):
+        seen.update(pc.unique(rb.column(0)).to_pylist())
+    seen.discard(None)
+    return sorted(seen)
+
+def iter_parquet_batches(
+    path: str | Path,
+    symbols: Optional[Sequence[str]] = None,
+    symbols_per_batch: int = 1,
+    columns: Optional[Sequence[str]] = None,
+) -> Iterator[pd.DataFrame]:
+    """Stream a Parquet file or (hive-partitioned) directory a few symbols at a time.
+
+    The symbol filter is pushed down to the scan, so row groups of other symbols are
+    skipped where statistics allow and peak memory follows the largest batch.
+    """
+    dataset = ds.dataset(str(path), format="parquet", partitioning="hive")
+    names = dataset.schema.names
+    cols = [c for c in dict.fromkeys(["symbol", "ts"] + list(columns)) if c in names] if columns else None
+    if "symbol" not in names:
+        # single-symbol file: nothing to split
+        yield _sorted(_typed(dataset.to_table(columns=cols)).to_pandas())
+        return
+    for batch in _batches(list(symbols) if symbols else parquet_symbols(dataset), symbols_per_batch):
+        table = dataset.to_table(columns=cols, filter=ds.field("symbol").isin(batch))
+        yield _sorted(_typed(table).to_pandas())
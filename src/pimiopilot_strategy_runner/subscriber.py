@@ -0,0 +1,194 @@
+from __future__ import annotations
+import argparse
+import json
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+import pandas as pd
+
+from .runner import StrategyRunner, StrategyRef, persist_signals
+from .sources import declared_columns, iter_parquet_batches, iter_query_batches
+from .writer import NDJSONSignalWriter
+
+# replays read a symbol's whole stored history
+_HISTORY_START = "1970-01-01T00:00:00+00:00"
+
+class SignalSubscriber:
+    """Recompute signals when ingestion completion events arrive, for the affected symbols only.
+
+    The strategy runs in online mode with its state persisted in `state_path` (together
+    with the event bus offset), so each event only costs the bars that are new for its
+    symbols. Bars are read from the event's Parquet artifact when it has one, otherwise
+    through a query spec over the event's symbols and ts range.
+
+    The state belongs to one bar interval: `interval`, or the first event's when None.
+    Events for other intervals are skipped. A symbol whose event reaches back before the
+    bars it was computed from (an out-of-order run, or an event marked `repair` by gap
+    repair) is reset and replayed from its stored history through the query backend, and
+    its signals from the event's start on are emitted again.
+    """
+    def __init__(self, ref: StrategyRef, *, state_path: str | Path = "out/subscriber_state.json",
+                 out: Optional[str | Path] = None, persist: bool = False,
+                 log_path: str | Path = "out/strategy_subscriber.log", query_backend: Optional[str] = None,
+                 interval: Optional[str] = None):
+        self.ref = ref
+        self.runner = StrategyRunner(ref, log_path=log_path)
+        self.logger = self.runner.logger
+        self.state_path = Path(state_path)
+        self.writer = NDJSONSignalWriter(out, append=True) if out else None
+        self.persist = persist
+        self.query_backend = query_backend
+        self.columns = declared_columns([self.runner.strategy])
+        self.offset = 0
+        self.interval = interval
+        # symbol -> [first, last] ts (UTC ISO) of the bars its state was computed from
+        self.seen: Dict[str, List[str]] = {}
+        if self.state_path.exists():
+            state = json.loads(self.state_path.read_text(encoding="utf-8"))
+            self.offset = int(state.get("offset", 0))
+            saved = state.get("interval")
+            if interval is not None and saved is not None and saved != interval:
+                raise ValueError(f"{self.state_path} holds state for interval {saved}, not {interval}")
+            self.interval = interval or saved
+            self.seen = state.get("seen") or {}
+            if state.get("strategy") is not None:
+                self.runner.restore_state(state["strategy"])
+
+    def _save(self) -> None:
+        state: Dict[str, Any] = {"offset": self.offset, "interval": self.interval, "seen": self.seen, "strategy": None}
+        if hasattr(self.runner.strategy, "snapshot"):
+            state["strategy"] = self.runner.snapshot_state()
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.state_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(state), encoding="utf-8")
+        tmp.replace(self.state_path)
+
+    def _bars(self, event: Dict[str, Any], symbols: List[str]) -> Iterator[pd.DataFrame]:
+        parquet = event.get("parquet")
+        if parquet and Path(parquet).exists():
+            # bars already processed are skipped by the online strategy
+            yield from iter_parquet_batches(parquet, symbols=symbols, symbols_per_batch=len(symbols), columns=self.columns)
+            return
+        yield from self._query(symbols, event["start"], event["end"])
+
+    def _query(self, symbols: List[str], start: str, end: str) -> Iterator[pd.DataFrame]:
+        end = (pd.Timestamp(end) + pd.Timedelta(microseconds=1)).isoformat()  # end is the last bar, inclusive
+        spec = {
+            "symbols": symbols,
+            "intervals": [self.interval],
+            "time_range": {"start": start, "end": end},
+            "columns": self.columns or [],
+        }
+        if not spec["columns"]:
+            spec.pop("columns")
+        if self.query_backend:
+            spec["backend"] = self.query_backend
+        yield from iter_query_batches(spec, symbols_per_batch=len(symbols))
+
+    def _track(self, frames: Iterator[pd.DataFrame]) -> Iterator[pd.DataFrame]:
+        """Pass frames through, widening each symbol's seen range."""
+        for df in frames:
+            if not df.empty:
+                ts = pd.to_datetime(df["ts"], utc=True).groupby(df["symbol"].to_numpy()).agg(["min", "max"])
+                for sym, lo, hi in zip(ts.index.astype(str), ts["min"], ts["max"]):
+                    cur = self.seen.get(sym)
+                    lo, hi = lo.isoformat(), hi.isoformat()
+                    if cur is not None:
+                        lo = min(lo, cur[0], key=pd.Timestamp)
+                        hi = max(hi, cur[1], key=pd.Timestamp)
+                    self.seen[sym] = [lo, hi]
+            yield df
+
+    def _stale(self, event: Dict[str, Any]) -> List[str]:
+        """Symbols whose state misses bars of this event: it reaches back before their first
+        processed bar, or it is a repair landing inside their processed range."""
+        start = pd.Timestamp(event["start"])
+        stale = []
+        for sym in event["symbols"]:
+            cur = self.seen.get(sym)
+            if cur is None or start > pd.Timestamp(cur[1]):
+                continue  # new symbol, or only bars after the last processed one
+            if event.get("repair") or start < pd.Timestamp(cur[0]):
+                stale.append(sym)
+        return stale
+
+    def _emit(self, frames: Iterator[pd.DataFrame], since: Optional[pd.Timestamp] = None) -> int:
+        emitted = 0
+        for env in self.runner.run_batches(self._track(frames), mode="online"):
+            if since is not None:
+                out = env["strategy_output"]
+                out["signals"] = [s for s in out.get("signals", []) if pd.Timestamp(s["ts"]) >= since]
+            emitted += len(env["strategy_output"].get("signals", []))
+            if self.writer is not None:
+                self.writer.write(env)
+            if self.persist:
+                persist_signals(env, self.ref)
+        return emitted
+
+    def handle(self, event: Dict[str, Any]) -> int:
+        """Process one ingestion event; returns the number of signals emitted."""
+        if not event.get("symbols") or not event.get("start"):
+            return 0
+        if self.interval is None:
+            self.interval = event["interval"]
+        elif event.get("interval") != self.interval:
+            self.logger.log("event_skipped", task_id=event.get("task_id"), interval=event.get("interval"),
+                            reason=f"subscriber state is for interval {self.interval}")
+            return 0
+        t0 = time.time()
+        emitted = 0
+        stale = self._stale(event)
+        if stale:
+            # rebuild from the stored history: the state cannot take bars before its last one
+            until = max([event["end"]] + [self.seen[s][1] for s in stale], key=pd.Timestamp)
+            self.runner.reset_state(stale)
+            for sym in stale:
+                self.seen.pop(sym)
+            emitted += self._emit(self._query(stale, _HISTORY_START, until), since=pd.Timestamp(event["start"]))
+            self.logger.log("symbols_replayed", task_id=event.get("task_id"), symbols=len(stale),
+                            start=event["start"], end=until)
+        fresh = [s for s in event["symbols"] if s not in stale]
+        if fresh:
+            emitted += self._emit(self._bars(event, fresh))
+        # lag: event published -> signals out
+        lag = round(time.time() - pd.Timestamp(event["created_at"]).timestamp(), 3) if event.get("created_at") else None
+        self.logger.log("event_handled", task_id=event.get("task_id"), symbols=len(event["symbols"]),
+                        signals=emitted, seconds=round(time.time() - t0, 6), lag_seconds=lag)
+        return emitted
+
+    def run(self, bus, timeout: Optional[float] = None) -> int:
+        """Consume events until the bus goes quiet for `timeout` seconds (forever if None)."""
+        from pimiopilot_data.events import INGEST_COMPLETE
+        handled = 0
+        for offset, event in bus.subscribe(offset=self.offset, timeout=timeout):
+            if event.get("event") == INGEST_COMPLETE:
+                self.handle(event)
+                handled += 1
+            self.offset = offset or self.offset
+            self._save()
+            self.logger.flush()
+        return handled
+
+def main():
+    from pimiopilot_data.events import bus_from_url
+    ap = argparse.ArgumentParser(description="Recompute strategy signals when new data lands")
+    ap.add_argument("--module", required=True, help="Strategy module, e.g. pimiopilot_strategies.sma_crossover")
+    ap.add_argument("--params", default="{}", help="JSON dict of params")
+    ap.add_argument("--events", default=None, help='Event bus: "file:PATH" or "postgres[:CHANNEL]" (default: PPDATA_EVENTS)')
+    ap.add_argument("--state", default="out/subscriber_state.json", help="Strategy state + bus offset")
+    ap.add_argument("--out", help="Append signals as NDJSON to this file")
+    ap.add_argument("--persist", action="store_true", help="Upsert signals into the TimescaleDB strategy_signals hypertable")
+    ap.add_argument("--log", default="out/strategy_subscriber.log", help="NDJSON log path")
+    ap.add_argument("--interval", help="Bar interval to follow (default: the first event's); other intervals are skipped")
+    ap.add_argument("--query-backend", choices=["timescaledb", "parquet"], help="Where replays read stored bars (default: PPDATA_QUERY_BACKEND)")
+    args = ap.parse_args()
+
+    bus = bus_from_url(args.events)
+    if bus is None:
+        ap.error("no event bus configured")
+    ref = StrategyRef(module=args.module, params=json.loads(args.params))
+    SignalSubscriber(ref, state_path=args.state, out=args.out, persist=args.persist, log_path=args.log,
+                     query_backend=args.query_backend, interval=args.interval).run(bus)
+
+if __name__ == "__main__":
+    main()
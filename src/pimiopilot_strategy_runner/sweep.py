@@ -0,0 +1,122 @@
+from __future__ import annotations
+from concurrent.futures import ProcessPoolExecutor
+from importlib import import_module
+from itertools import product
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+import numpy as np
+import pandas as pd
+import time
+
+from pimiopilot_strategies.features import feature_scope
+
+from .runner import NDJSONLogger
+
+_ACTION_POS = {"BUY": 1, "SELL": -1, "HOLD": 0}
+_METRICS = ["bars", "buy", "sell", "hold", "changes", "gross_return"]
+
+def expand_grid(grid: Dict[str, List[Any]], base: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    keys = list(grid)
+    return [{**(base or {}), **dict(zip(keys, values))} for values in product(*(grid[k] for k in keys))]
+
+def _generic_prepare(df: pd.DataFrame) -> Dict[str, Any]:
+    """Fallback for strategies without sweep hooks: rows in (symbol, ts) order, like generate_signal."""
+    d = df.sort_values(["symbol", "ts"]) if "symbol" in df.columns else df.sort_values("ts")
+    sym = d["symbol"].to_numpy() if "symbol" in d.columns else np.full(len(d), "UNKNOWN", dtype=object)
+    starts = np.flatnonzero(np.r_[True, sym[1:] != sym[:-1]]) if len(sym) else np.array([], dtype=int)
+    bounds = list(zip(starts.tolist(), np.r_[starts[1:], len(sym)].tolist()))
+    return {"close": d["close"].to_numpy(dtype="float64"), "bounds": bounds, "df": df}
+
+def _generic_positions(strategy, prepared: Dict[str, Any]) -> np.ndarray:
+    out = strategy.generate_signal(prepared["df"])
+    signals = out["signals"]
+    actions = signals["action"] if isinstance(signals, pd.DataFrame) else [s.get("action", "HOLD") for s in signals]
+    return np.fromiter((_ACTION_POS.get(a, 0) for a in actions), dtype="int8", count=len(actions))
+
+def _next_returns(prepared: Dict[str, Any]) -> tuple[np.ndarray, np.ndarray]:
+    """Next-bar simple return per row (0 on each symbol's last bar) and a same-symbol-next mask; cached."""
+    if "_next_ret" not in prepared:
+        close = prepared["close"]
+        same = np.ones(len(close), dtype=bool)
+        same[[hi - 1 for _, hi in prepared["bounds"]]] = False
+        ret = np.zeros(len(close))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ret[:-1] = close[1:] / close[:-1] - 1.0
+        prepared["_next_ret"] = (np.where(same & np.isfinite(ret), ret, 0.0), same)
+    return prepared["_next_ret"]
+
+def _score(prepared: Dict[str, Any], pos: np.ndarray) -> Dict[str, Any]:
+    """Compact per-combination metrics: action counts, position changes, next-bar return captured."""
+    ret, same = _next_returns(prepared)
+    changes = int(np.count_nonzero(same[:-1] & (pos[1:] != pos[:-1]))) if len(pos) else 0
+    return {
+        "bars": int(len(pos)),
+        "buy": int(np.count_nonzero(pos == 1)),
+        "sell": int(np.count_nonzero(pos == -1)),
+        "hold": int(np.count_nonzero(pos == 0)),
+        "changes": changes,
+        "gross_return": float(np.dot(pos, ret)),
+    }
+
+# Per-process state, set once by the pool initializer so prepared arrays are not re-pickled per task
+_WORKER: Dict[str, Any] = {}
+
+def _init_worker(module: str, prepared: Dict[str, Any]) -> None:
+    _WORKER["mod"] = import_module(module)
+    _WORKER["prepared"] = prepared
+
+def _evaluate(mod, prepared: Dict[str, Any], params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    try:
+        strategy = mod.build_strategy(params)
+    except ValueError:
+        return None  # invalid combination (e.g. fast >= slow); errors from the data still propagate
+    if hasattr(mod, "sweep_positions"):
+        pos = mod.sweep_positions(prepared, params)
+    else:
+        pos = _generic_positions(strategy, prepared)
+    return {**params, **_score(prepared, pos)}
+
+def _evaluate_batch(batch: List[Dict[str, Any]]) -> List[Optional[Dict[str, Any]]]:
+    # parameter sets without sweep hooks share indicators through the batch's feature cache
+    with feature_scope():
+        return [_evaluate(_WORKER["mod"], _WORKER["prepared"], p) for p in batch]
+
+def sweep(
+    module: str,
+    df: pd.DataFrame,
+    grid: Dict[str, List[Any]],
+    *,
+    base_params: Optional[Dict[str, Any]] = None,
+    max_workers: Optional[int] = None,
+    batch_size: int = 64,
+    log_path: str | Path = "out/strategy_sweep.log",
+) -> pd.DataFrame:
+    """Evaluate every combination of `grid` for one strategy module over `df`.
+
+    Shared intermediates are built once with the module's `sweep_prepare(df)` hook
+    (falling back to plain sort/grouping), then combinations are evaluated in batches
+    on a process pool. Invalid combinations are skipped. Returns one row per valid
+    combination: the parameters followed by `_METRICS`.
+    """
+    logger = NDJSONLogger(log_path)
+    t0 = time.time()
+    mod = import_module(module)
+    combos = expand_grid(grid, base_params)
+    logger.log("sweep_start", module=module, combos=len(combos), rows=int(df.shape[0]))
+
+    prepared = mod.sweep_prepare(df) if hasattr(mod, "sweep_prepare") else _generic_prepare(df)
+    logger.log("sweep_prepared", seconds=round(time.time() - t0, 6))
+
+    if max_workers == 1 or len(combos) <= batch_size:
+        with feature_scope():
+            results = [_evaluate(mod, prepared, p) for p in combos]
+    else:
+        batches = [combos[i:i + batch_size] for i in range(0, len(combos), batch_size)]
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker, initargs=(module, prepared)) as ex:
+            results = [r for chunk in ex.map(_evaluate_batch, batches) for r in chunk]
+
+    rows = [r for r in results if r is not None]
+    table = pd.DataFrame(rows, columns=(list(combos[0]) if combos else []) + _METRICS)
+    logger.log("sweep_end", seconds=round(time.time() - t0, 6), evaluated=len(rows), skipped=len(results) - len(rows))
+    logger.close()
+    return table
@@ -0,0 +1,55 @@
+from __future__ import annotations
+import json
+from pathlib import Path
+from typing import Any, Dict, Optional, TextIO
+import pandas as pd
+
+class NDJSONSignalWriter:
+    """Stream strategy signals as NDJSON, one signal per line, as outputs arrive.
+
+    Each line is a signal item of strategy.output.schema.json. `extras` (e.g. the
+    strategy module and params when several strategies share one stream) is added
+    to every line under the schema's `extras` key.
+    """
+    def __init__(self, out: TextIO | str | Path, extras: Optional[Dict[str, Any]] = None, append: bool = False):
+        if isinstance(out, (str, Path)):
+            Path(out).parent.mkdir(parents=True, exist_ok=True)
+            self._fh: TextIO = open(out, "a" if append else "w", encoding="utf-8")
+            self._owned = True
+        else:
+            self._fh = out
+            self._owned = False
+        self.extras = extras
+        self.rows = 0
+
+    def write(self, output: Any, extras: Optional[Dict[str, Any]] = None) -> int:
+        """Write the signals of a strategy output, runner envelope, list or DataFrame; returns lines written."""
+        if isinstance(output, dict):
+            output = output.get("strategy_output", output).get("signals", [])
+        extras = extras if extras is not None else self.extras
+        if isinstance(output, pd.DataFrame):
+            if output.empty:
+                return 0
+            frame = output.assign(extras=[extras] * len(output)) if extras else output
+            # vectorized serialization; ends with a newline
+            self._fh.write(frame.to_json(orient="records", lines=True, force_ascii=False, date_format="iso"))
+            n = len(frame)
+        else:
+            dumps = json.dumps
+            lines = [dumps({**s, "extras": extras} if extras else s, ensure_ascii=False, default=str) for s in output]
+            if lines:
+                self._fh.write("\n".join(lines) + "\n")
+            n = len(lines)
+        self._fh.flush()
+        self.rows += n
+        return n
+
+    def close(self) -> None:
+        if self._owned:
+            self._fh.close()
+
+    def __enter__(self) -> "NDJSONSignalWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
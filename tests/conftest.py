@@ -0,0 +1,39 @@
+from datetime import datetime, timedelta, timezone
+
+import pandas as pd
+import pytest
+
+from pimiopilot_data.io.parquet_writer import write_parquet
+
+def _write_run(out_dir, interval, start_close=100.0, n=10, symbols=("2330.TW", "2317.TW")):
+    ts0 = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    rows = []
+    for sym in symbols:
+        for i in range(n):
+            c = start_close + i
+            rows.append({"ts": ts0 + timedelta(days=i), "symbol": sym, "open": c, "high": c + 1,
+                         "low": c - 1, "close": c, "volume": 1000 + i, "adj_close": c})
+    meta = {"pimiopilot.schema_version": "CandleV1", "pimiopilot.interval": interval}
+    write_parquet(pd.DataFrame(rows), out_dir, "data.parquet", metadata=meta)
+
+@pytest.fixture
+def write_run():
+    """write_run(out_dir, interval, start_close=100.0, n=10, symbols=...): one daily CandleV1 run file."""
+    return _write_run
+
+@pytest.fixture
+def lake_spec(tmp_path):
+    """lake_spec(**overrides): a parquet-backend query spec over tmp_path/lake."""
+    def make(**kw):
+        spec = {
+            "symbols": ["2330.TW"],
+            "time_range": {"start": "2025-01-03T00:00:00Z", "end": "2025-01-06T00:00:00Z"},
+            "intervals": ["1d"],
+            "columns": ["ts", "symbol", "close", "src_interval"],
+            "backend": "parquet",
+            "lake_path": str(tmp_path / "lake"),
+            "output": {"format": "csv", "path": str(tmp_path / "queries"), "filename": "lake"},
+        }
+        spec.update(kw)
+        return spec
+    return make
@@ -0,0 +1,53 @@
+import json
+from pathlib import Path
+
+import pandas as pd
+import pytest
+from jsonschema import Draft202012Validator
+
+import pyarrow as pa
+
+from pimiopilot_data.io.arrow_ipc import query_schema, write_arrow_ipc, read_arrow_ipc
+from pimiopilot_data.query_runner import run_query
+
+def test_chunked_roundtrip_with_lz4(tmp_path):
+    frames = [pd.DataFrame({"symbol": ["A"] * 3, "close": [1.0, 2.0, 3.0]}) for _ in range(4)]
+    path = tmp_path / "x.arrow"
+    assert write_arrow_ipc(iter(frames), path, compression="lz4") == 12
+    table = read_arrow_ipc(path)
+    assert table.num_rows == 12 and table.column_names == ["symbol", "close"]
+
+    with pytest.raises(ValueError):
+        write_arrow_ipc(iter(frames), path, compression="gzip")
+
+def test_run_query_feather_output(tmp_path, write_run, lake_spec):
+    write_run(tmp_path / "lake" / "run-a", "1d")
+    spec = lake_spec()
+    spec["output"] = {"format": "feather", "path": str(tmp_path / "queries"), "filename": "f", "chunk_size": 1000}
+    summary, _ = run_query(spec)
+    assert summary["artifacts"]["rows"] == 3
+    assert summary["artifacts"]["data"].endswith("data.feather")
+    df = read_arrow_ipc(summary["artifacts"]["data"]).to_pandas()
+    assert df["close"].tolist() == [102.0, 103.0, 104.0]
+
+def test_query_schema_for_null_and_empty_chunks(tmp_path):
+    schema = query_schema(["ts", "symbol", "close", "volume"])
+    frames = [pd.DataFrame({"ts": pd.to_datetime(["2025-01-01"], utc=True), "symbol": ["A"], "close": [None], "volume": [10]}),
+              pd.DataFrame({"ts": ["2025-01-02T00:00:00Z"], "symbol": ["A"], "close": [1.5], "volume": [11.0]})]
+    assert write_arrow_ipc(iter(frames), tmp_path / "x.arrow", schema=schema) == 2
+    table = read_arrow_ipc(tmp_path / "x.arrow")
+    assert table.schema == schema and table.column("close").to_pylist() == [None, 1.5]
+
+    assert write_arrow_ipc(iter([]), tmp_path / "empty.arrow", schema=schema) == 0
+    empty = read_arrow_ipc(tmp_path / "empty.arrow")
+    assert empty.num_rows == 0 and empty.schema == schema
+    assert empty.schema.field("ts").type == pa.timestamp("us", tz="UTC")
+
+def test_schema_rejects_gzip_for_arrow(lake_spec):
+    schema = json.loads(Path("schemas/query.schema.json").read_text(encoding="utf-8"))
+    validator = Draft202012Validator(schema)
+    spec = lake_spec()
+    for fmt, compression, ok in [("arrow", "gzip", False), ("feather", "gzip", False), ("arrow", "zstd", True),
+                                 ("csv", "gzip", True)]:
+        errors = list(validator.iter_errors({**spec, "output": {**spec["output"], "format": fmt, "compression": compression}}))
+        assert not errors if ok else errors
@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from pimiopilot_backtest import run_backtest
+
+def _bars():
+    ts = ["2025-01-01T00:00:00Z", "2025-01-02T00:00:00Z", "2025-01-03T00:00:00Z", "2025-01-04T00:00:00Z"]
+    return pd.DataFrame({
+        "ts": ts * 2,
+        "symbol": ["A"] * 4 + ["B"] * 4,
+        "close": [100.0, 110.0, 99.0, 99.0, 50.0, 50.0, 55.0, 44.0],
+    })
+
+def test_actions_positions_and_pnl():
+    signals = [
+        {"ts": "2025-01-01T00:00:00+00:00", "symbol": "A", "action": "BUY"},
+        {"ts": "2025-01-02T00:00:00+00:00", "symbol": "A", "action": "HOLD"},   # keeps long
+        {"ts": "2025-01-03T00:00:00+00:00", "symbol": "A", "action": "SELL"},
+        {"ts": "2025-01-02T00:00:00+00:00", "symbol": "B", "action": "BUY"},
+    ]
+    res = run_backtest(_bars(), {"signals": signals}, cost_bps=10)
+    assert res.weights["A"].tolist() == [0.5, 0.5, -0.5, -0.5]
+    assert res.weights["B"].tolist() == [0.0, 0.5, 0.5, 0.5]
+    # bar 2: A +10% * 0.5; bar 3: A -10% * 0.5 + B +10% * 0.5; bar 4: B -20% * 0.5
+    np.testing.assert_allclose(res.portfolio["gross"], [0.0, 0.05, 0.0, -0.1], atol=1e-12)
+    np.testing.assert_allclose(res.portfolio["turnover"], [0.5, 0.5, 1.0, 0.0])
+    np.testing.assert_allclose(res.portfolio["cost"], res.portfolio["turnover"] * 0.001)
+    assert res.stats["max_drawdown"] < 0
+    assert res.stats["bars"] == 4
+
+def test_missing_bar_keeps_the_move():
+    bars = _bars().drop(index=2).reset_index(drop=True)  # A has no bar on 01-03 (halt); it reopens at 99
+    res = run_backtest(bars, [{"ts": "2025-01-02T00:00:00Z", "symbol": "A", "action": "BUY"}])
+    # A held long (0.5) from 110 through the gap to 99: -10% lands on the next observed bar
+    assert res.returns["A"].tolist()[2] == 0.0
+    np.testing.assert_allclose(res.returns["A"].tolist()[3], 99.0 / 110.0 - 1.0)
+    np.testing.assert_allclose(res.portfolio["gross"].sum(), 0.5 * (99.0 / 110.0 - 1.0))
+
+def test_target_weight_long_only_and_envelope():
+    signals = pd.DataFrame({
+        "ts": pd.to_datetime(["2025-01-01", "2025-01-02"], utc=True),
+        "symbol": ["A", "B"],
+        "target_weight": [0.8, -0.3],
+    })
+    res = run_backtest(_bars(), {"strategy_output": {"signals": signals}}, allow_short=False)
+    assert res.weights["A"].tolist() == [0.8] * 4
+    assert res.weights["B"].tolist() == [0.0] * 4
+
+def test_deterministic_and_validates_inputs():
+    bars = _bars()
+    sig = [{"ts": "2025-01-01T00:00:00Z", "symbol": "B", "action": "BUY"}]
+    a, b = run_backtest(bars, sig), run_backtest(bars, sig)
+    pd.testing.assert_frame_equal(a.portfolio, b.portfolio)
+    with pytest.raises(ValueError):
+        run_backtest(bars.drop(columns=["close"]), sig)
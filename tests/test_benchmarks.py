@@ -0,0 +1,47 @@
+import importlib.util
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+from pimiopilot_data.quality import check_candles
+from pimiopilot_data.runner import _normalize_candle_df
+from pimiopilot_data.synthetic import as_yfinance, bar_times, synthetic_candles
+
+def _bench_module():
+    path = Path(__file__).resolve().parents[1] / "benchmarks" / "run.py"
+    spec = importlib.util.spec_from_file_location("pp_benchmarks", path)
+    mod = sys.modules[spec.name] = importlib.util.module_from_spec(spec)  # dataclasses look it up
+    spec.loader.exec_module(mod)
+    return mod
+
+def test_synthetic_candles_deterministic_and_clean():
+    a = synthetic_candles(3, "5m", years=5 / 261, seed=7)
+    b = synthetic_candles(3, "5m", years=5 / 261, seed=7)
+    pd.testing.assert_frame_equal(a, b)
+    assert len(a) == 3 * 5 * 54
+    assert not a.equals(synthetic_candles(3, "5m", years=5 / 261, seed=8))
+    assert check_candles(a)["total"] == 0
+    # TWSE session in UTC, weekdays only
+    ts = bar_times("1m", "2024-01-05", 2 / 261)  # Friday, then Monday
+    assert ts[0] == pd.Timestamp("2024-01-05 01:00", tz="UTC")
+    assert ts[-1] == pd.Timestamp("2024-01-08 05:29", tz="UTC")
+
+def test_as_yfinance_feeds_normalize():
+    df = synthetic_candles(["2330.TW", "2317.TW"], "1d", years=0.1)
+    out = _normalize_candle_df(as_yfinance(df, "2317.TW"), "2317.TW")
+    assert len(out) == len(df) // 2
+    assert set(out["symbol"]) == {"2317.TW"}
+
+def test_measure_and_compare():
+    mod = _bench_module()
+    bench = mod.Bench("tiny", lambda s, w: synthetic_candles(2, "1d", s), lambda df: len(df))
+    r = mod.measure(bench, scale=1.0, repeat=2)
+    assert r["rows"] == 2 * 261 and r["rows_per_sec"] > 0 and r["peak_mb"] >= 0
+
+    base = {"x": {"rows_per_sec": 1000.0, "peak_mb": 50.0}, "y": {"rows_per_sec": 1000.0, "peak_mb": 0.1}}
+    assert mod.compare({"x": {"rows_per_sec": 800.0, "peak_mb": 60.0}}, base, 0.25) == []
+    problems = mod.compare({"x": {"rows_per_sec": 700.0, "peak_mb": 70.0},
+                            "y": {"rows_per_sec": 1000.0, "peak_mb": 0.5},  # below the noise floor
+                            "new": {"rows_per_sec": 1.0, "peak_mb": 1e6}}, base, 0.25)
+    assert len(problems) == 2 and all(p.startswith("x:") for p in problems)
@@ -0,0 +1,73 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+from jsonschema import ValidationError
+
+from pimiopilot_data.io.json_validator import validate_json
+from pimiopilot_data.quality import check_candles
+from pimiopilot_data.validator import DefaultFillingValidator, compiled_validator
+
+def _candles(n=5):
+    ts = pd.date_range("2024-01-01", periods=n, freq="D", tz="UTC")
+    one = pd.DataFrame({
+        "ts": ts,
+        "open": np.linspace(10.0, 10.4, n),
+        "high": 11.0,
+        "low": 9.0,
+        "close": np.linspace(10.1, 10.5, n),
+        "volume": 1000.0,
+        "adj_close": np.linspace(10.1, 10.5, n),
+    })
+    return pd.concat([one.assign(symbol="A"), one.assign(symbol="B")], ignore_index=True)
+
+def test_compiled_once_and_recompiled_on_change(tmp_path):
+    path = tmp_path / "s.json"
+    path.write_text(json.dumps({"type": "object", "required": ["a"]}), encoding="utf-8")
+    v = compiled_validator(path)
+    assert compiled_validator(path) is v
+    assert compiled_validator(path, DefaultFillingValidator) is not v
+
+    validate_json({"a": 1}, path)
+    with pytest.raises(ValidationError):
+        validate_json({}, path)
+
+    path.write_text(json.dumps({"type": "object", "required": ["b"]}), encoding="utf-8")
+    st = path.stat()
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    assert compiled_validator(path) is not v
+    validate_json({"b": 1}, path)
+
+def test_clean_frame_has_no_violations():
+    report = check_candles(_candles())
+    assert report["rows"] == 10 and report["total"] == 0 and report["missing_columns"] == []
+
+def test_violation_counts():
+    df = _candles()
+    df.loc[1, "high"] = 5.0          # below open/close
+    df.loc[2, "volume"] = -1.0
+    df.loc[3, "close"] = np.nan
+    df.loc[6, "ts"] = df.loc[5, "ts"]  # duplicate ts within B
+    df.loc[8, "ts"] = df.loc[5, "ts"]  # goes back in time within B
+    df.loc[9, "close"] = 100.0       # spike, and close above high
+    v = check_candles(df)["violations"]
+    assert v["ohlc_inconsistent"] == 2
+    assert v["negative_volume"] == 1
+    assert v["nan_prices"] == 1
+    assert v["duplicate_ts"] == 1
+    assert v["ts_not_monotonic"] == 1
+    assert v["price_spikes"] == 1
+    assert v["ts_not_utc"] == 0
+
+def test_utc_awareness_and_types():
+    df = _candles()
+    assert check_candles(df.assign(ts=df["ts"].dt.tz_localize(None)))["violations"]["ts_not_utc"] == 10
+    assert check_candles(df.assign(ts=df["ts"].astype("int64") // 10**9))["violations"]["ts_not_utc"] == 0
+    strings = df["ts"].dt.strftime("%Y-%m-%dT%H:%M:%S").where(df.index != 0, "2024-01-01T00:00:00Z")
+    assert check_candles(df.assign(ts=strings))["violations"]["ts_not_utc"] == 9
+
+    report = check_candles(df.drop(columns=["adj_close"]).assign(volume=["x"] + [1.0] * 9))
+    assert report["missing_columns"] == ["adj_close"]
+    assert report["violations"]["non_numeric"] == 1
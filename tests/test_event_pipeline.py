@@ -0,0 +1,99 @@
+import json
+import numpy as np
+import pytest
+import pandas as pd
+from datetime import datetime, timezone, timedelta
+
+from pimiopilot_data.events import FileEventBus, ingest_event, bus_from_url
+from pimiopilot_data.io.parquet_writer import write_parquet
+from pimiopilot_strategies.sma_crossover import build_strategy
+from pimiopilot_strategy_runner.runner import StrategyRef
+from pimiopilot_strategy_runner.subscriber import SignalSubscriber
+from pimiopilot_strategy_runner.writer import NDJSONSignalWriter
+
+def _bars(n, symbols=("2330.TW", "2317.TW")):
+    rng = np.random.default_rng(4)
+    ts0 = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    return pd.concat([pd.DataFrame({
+        "ts": [ts0 + timedelta(days=i) for i in range(n)],
+        "symbol": sym,
+        "close": 100 + rng.standard_normal(n).cumsum(),
+    }) for sym in symbols], ignore_index=True)
+
+def test_file_bus_roundtrip_and_resume(tmp_path):
+    bus = bus_from_url(f"file:{tmp_path / 'events.ndjson'}")
+    assert isinstance(bus, FileEventBus)
+    bus.publish({"event": "a"})
+    bus.publish({"event": "b"})
+    got = list(bus.subscribe(timeout=0))
+    assert [e["event"] for _, e in got] == ["a", "b"]
+    bus.publish({"event": "c"})
+    assert [e["event"] for _, e in bus.subscribe(offset=got[-1][0], timeout=0)] == ["c"]
+    assert bus_from_url("none") is None
+
+def test_subscriber_recomputes_new_bars_incrementally(tmp_path):
+    full = _bars(60)
+    bus = FileEventBus(tmp_path / "events.ndjson")
+    ref = StrategyRef(module="pimiopilot_strategies.sma_crossover", params={"fast": 3, "slow": 10})
+    out = tmp_path / "signals.ndjson"
+
+    # two ingestion runs: the second file repeats older bars plus new ones
+    for k, (lo, hi) in enumerate([(0, 40), (30, 60)]):
+        part = full.groupby("symbol").nth(list(range(lo, hi))).reset_index(drop=True)
+        path = write_parquet(part, tmp_path / f"run{k}", "data.parquet")
+        bus.publish(ingest_event(f"t{k}", "1d", part, parquet=path))
+        # a fresh process each time: state and bus offset come from the state file
+        sub = SignalSubscriber(ref, state_path=tmp_path / "state.json", out=out, log_path=tmp_path / "sub.log")
+        assert sub.run(bus, timeout=0) == 1
+
+    lines = [json.loads(line) for line in out.read_text(encoding="utf-8").splitlines()]
+    expected = build_strategy(ref.params).generate_signal(full)["signals"]
+    key = lambda s: (s["symbol"], s["ts"])
+    assert sorted(lines, key=key) == sorted(expected, key=key)
+    state = json.loads((tmp_path / "state.json").read_text(encoding="utf-8"))
+    assert state["offset"] == (tmp_path / "events.ndjson").stat().st_size
+
+def test_subscriber_skips_other_intervals(tmp_path):
+    bars = _bars(20)
+    bus = FileEventBus(tmp_path / "events.ndjson")
+    bus.publish(ingest_event("t0", "1d", bars, parquet=write_parquet(bars, tmp_path / "run0", "data.parquet")))
+    bus.publish(ingest_event("t1", "5m", bars, parquet=write_parquet(bars, tmp_path / "run1", "data.parquet")))
+    ref = StrategyRef(module="pimiopilot_strategies.sma_crossover", params={"fast": 3, "slow": 10})
+    sub = SignalSubscriber(ref, state_path=tmp_path / "state.json", log_path=tmp_path / "sub.log")
+    assert sub.run(bus, timeout=0) == 2
+    logged = [json.loads(line) for line in (tmp_path / "sub.log").read_text(encoding="utf-8").splitlines()]
+    assert [e["interval"] for e in logged if e["event"] == "event_skipped"] == ["5m"]
+    # the interval is pinned in the state file
+    assert json.loads((tmp_path / "state.json").read_text(encoding="utf-8"))["interval"] == "1d"
+    with pytest.raises(ValueError):
+        SignalSubscriber(ref, state_path=tmp_path / "state.json", log_path=tmp_path / "sub.log", interval="5m")
+
+def test_subscriber_replays_repaired_range(tmp_path, monkeypatch):
+    monkeypatch.setenv("PPDATA_LAKE_PATH", str(tmp_path / "lake"))
+    full = _bars(60)
+    meta = {"pimiopilot.schema_version": "CandleV1", "pimiopilot.interval": "1d"}
+    ref = StrategyRef(module="pimiopilot_strategies.sma_crossover", params={"fast": 3, "slow": 10})
+    bus = FileEventBus(tmp_path / "events.ndjson")
+    sub = SignalSubscriber(ref, state_path=tmp_path / "state.json", log_path=tmp_path / "sub.log",
+                           query_backend="parquet")
+
+    # the first run misses five 2330.TW bars; gap repair fills them in later
+    ts = sorted(full["ts"].unique())
+    hole = (full["symbol"] == "2330.TW") & full["ts"].isin(ts[20:25])
+    bus.publish(ingest_event("t0", "1d", full[~hole], parquet=write_parquet(full[~hole], tmp_path / "lake" / "run0",
+                                                                           "data.parquet", metadata=meta)))
+    assert sub.run(bus, timeout=0) == 1
+    out = tmp_path / "signals.ndjson"
+    sub.writer = NDJSONSignalWriter(out, append=True)
+    path = write_parquet(full[hole], tmp_path / "lake" / "repairs" / "r0", "data.parquet", metadata=meta)
+    bus.publish(ingest_event("t0", "1d", full[hole], parquet=path, repair=True))
+    assert sub.run(bus, timeout=0) == 1
+
+    # 2330.TW is recomputed from the repaired bars on, as a batch run over the full history would
+    expected = [s for s in build_strategy(ref.params).generate_signal(full)["signals"]
+                if s["symbol"] == "2330.TW" and pd.Timestamp(s["ts"]) >= ts[20]]
+    got = [json.loads(line) for line in out.read_text(encoding="utf-8").splitlines()]
+    assert got == expected
+    fresh = build_strategy(ref.params)
+    fresh.update(full)
+    assert sub.runner.snapshot_state()["symbols"]["2330.TW"] == fresh.snapshot()["symbols"]["2330.TW"]
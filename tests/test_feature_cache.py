@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+
+from pimiopilot_strategies.features import FeatureCache
+
+def _series(n=300, seed=5):
+    rng = np.random.default_rng(seed)
+    close = 100 + rng.standard_normal(n).cumsum()
+    close[::11] = np.round(close[::11])  # ties
+    close[[17, 90]] = np.nan
+    ts = np.arange(n, dtype="int64") * 86_400_000_000_000
+    return ts, close
+
+def test_hit_and_extend_match_full_recompute():
+    ts, close = _series()
+    cache = FeatureCache()
+    for k in (50, 51, 200, 300):
+        got = cache.get("sma", ts[:k], close[:k], symbol="2330.TW", window=20)
+    again = cache.get("sma", ts, close, symbol="2330.TW", window=20)
+    expected = pd.Series(close).rolling(20, min_periods=1).mean().to_numpy()
+    assert np.array_equal(got, expected, equal_nan=True)
+    assert again is got
+    assert cache.stats == {"hits": 1, "extends": 3, "misses": 1, "disk_hits": 0}
+
+    rets = cache.get("returns", ts[:100], close[:100], symbol="2330.TW")
+    rets = cache.get("returns", ts, close, symbol="2330.TW")
+    assert np.array_equal(rets, pd.Series(close).pct_change(fill_method=None).to_numpy(), equal_nan=True)
+
+def test_changed_history_is_recomputed():
+    ts, close = _series()
+    cache = FeatureCache()
+    cache.get("sma", ts, close, symbol="A", window=5)
+    revised = close.copy()
+    revised[3] += 1.0
+    got = cache.get("sma", ts, revised, symbol="A", window=5)
+    assert np.array_equal(got, pd.Series(revised).rolling(5, min_periods=1).mean().to_numpy(), equal_nan=True)
+    assert cache.stats["misses"] == 2
+
+def test_lru_eviction_and_disk_persistence(tmp_path):
+    ts, close = _series()
+    cache = FeatureCache(max_bytes=close[:200].nbytes * 2 - 1, cache_dir=tmp_path)
+    for sym in ("A", "B", "C"):
+        cache.get("sma", ts[:200], close[:200], symbol=sym, window=10)
+    assert len(cache._entries) == 1  # only the most recent fits
+
+    other = FeatureCache(cache_dir=tmp_path)
+    got = other.get("sma", ts, close, symbol="A", window=10)  # loaded from disk, then extended
+    assert other.stats["disk_hits"] == 1 and other.stats["extends"] == 1
+    assert np.array_equal(got, pd.Series(close).rolling(10, min_periods=1).mean().to_numpy(), equal_nan=True)
+
+def test_disk_writes_on_eviction_and_close(tmp_path):
+    ts, close = _series()
+    cache = FeatureCache(cache_dir=tmp_path)
+    for k in (100, 200, 300):
+        cache.get("sma", ts[:k], close[:k], symbol="A", window=10)
+    assert not list(tmp_path.glob("*.npz"))  # nothing written per put
+    cache.close()
+    assert len(list(tmp_path.glob("*.npz"))) == 1 and not cache._entries
+    assert FeatureCache(cache_dir=tmp_path).get("sma", ts, close, symbol="A", window=10).shape == (300,)
+
+def test_feature_scope_is_per_run():
+    from pimiopilot_strategies.features import active_cache, feature_scope
+    from pimiopilot_strategies.sma_crossover import SMACrossover
+
+    n = 120
+    df = pd.DataFrame({"symbol": "A", "ts": pd.date_range("2025-01-01", periods=n, freq="D", tz="UTC"),
+                       "close": _series(n)[1]})
+    fast, slow = SMACrossover(fast=5, slow=20), SMACrossover(fast=10, slow=20)
+    assert active_cache() is None
+    plain = fast.generate_signal(df)["signals"]
+    with feature_scope() as cache:
+        assert fast.generate_signal(df)["signals"] == plain
+        slow.generate_signal(df)
+        assert cache.stats["hits"] == 1 and cache.stats["misses"] == 3  # sma(20) computed once
+    assert active_cache() is None and not cache._entries
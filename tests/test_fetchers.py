@@ -0,0 +1,87 @@
+import threading
+import time
+from datetime import date
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+
+from pimiopilot_data import fetchers
+from pimiopilot_data.fetchers.replay import RecordingFetcher, ReplayFetcher
+from pimiopilot_data.fetchers.windows import fetch_windows, plan_windows
+
+class _Fake:
+    def __init__(self):
+        self.calls = 0
+
+    def fetch(self, symbols, *, interval, start, end, options):
+        self.calls += 1
+        ts = pd.date_range("2024-03-01 09:00", periods=6, freq="h", tz="Asia/Taipei")
+        return pd.concat([pd.DataFrame({"symbol": s, "ts": ts, "close": range(6)}) for s in symbols], ignore_index=True)
+
+def test_registry_and_recording(tmp_path, monkeypatch):
+    fake = _Fake()
+    fetchers.register_fetcher("fake", lambda job: fake)
+    try:
+        job = SimpleNamespace(source="fake")
+        assert fetchers.fetcher_for(job) is fake
+        monkeypatch.setenv("PPDATA_RECORD", str(tmp_path))
+        rec = fetchers.fetcher_for(job)
+        assert isinstance(rec, RecordingFetcher)
+        rec.fetch(["A", "B"], interval="1h", start="2024-03-01", end=None, options={})
+    finally:
+        fetchers._FETCHERS.pop("fake")
+    with pytest.raises(ValueError):
+        fetchers.fetcher_for(SimpleNamespace(source="fake"))
+
+    replay = fetchers.fetcher_for(SimpleNamespace(source="replay", replay_options={"dir": str(tmp_path)}))
+    # end is exclusive; bounds are read in the bars' timezone
+    df = replay.fetch(["B", "A"], interval="1h", start="2024-03-01 11:00", end="2024-03-01 13:00", options={})
+    assert list(df["symbol"]) == ["A", "A", "B", "B"]
+    assert [t.hour for t in df["ts"]] == [11, 12, 11, 12]
+    assert fake.calls == 1
+
+    with pytest.raises(FileNotFoundError):
+        replay.fetch(["A"], interval="1h", start="2024-03-01", end=None, options={"auto_adjust": False})
+
+def test_replay_latency(tmp_path):
+    RecordingFetcher(_Fake(), tmp_path).fetch(["A"], interval="1h", start="2024-03-01", end=None, options={})
+    replay = ReplayFetcher(tmp_path, latency_seconds=0.05, latency_per_symbol=0.05)
+    t0 = time.perf_counter()
+    assert len(replay.fetch(["A"], interval="1h", start="2024-03-01", end=None, options={})) == 6
+    assert time.perf_counter() - t0 >= 0.1
+
+def test_plan_windows_clips_history_and_splits():
+    today = date(2025, 3, 31)
+    # 1m: 7-day windows over the last 29 days, however far back start asks
+    w = plan_windows("2024-01-01", None, window_days=7, history_days=29, today=today)
+    assert w[0] == ("2025-03-02", "2025-03-09") and w[-1] == ("2025-03-30", "2025-04-01")
+    assert len(w) == 5 and all(a < b for a, b in w)
+    assert all(w[i][1] == w[i + 1][0] for i in range(len(w) - 1))
+    assert plan_windows("2025-03-01", "2025-03-20", window_days=59, today=today) == [("2025-03-01", "2025-03-20")]
+    assert plan_windows("2020-01-01", "2020-02-01", window_days=7, history_days=29, today=today) == []
+
+def test_fetch_windows_concurrent_and_deduplicated():
+    active, peak, lock = [0], [0], threading.Lock()
+
+    def fetch_one(symbols, *, interval, start, end, options):
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.05)
+        with lock:
+            active[0] -= 1
+        # each window also returns its neighbour's first bar, as providers do at edges
+        ts = pd.date_range(start, end, freq="D", tz="UTC")
+        return pd.DataFrame({"symbol": symbols[0], "ts": ts, "close": float(start[-2:])})
+
+    windows = plan_windows("2025-03-01", "2025-03-21", window_days=4, today=date(2025, 3, 31))
+    t0 = time.perf_counter()
+    df = fetch_windows(fetch_one, ["A"], interval="1m", windows=windows, options={}, max_workers=5)
+    assert time.perf_counter() - t0 < 0.2 and peak[0] == 5
+    assert len(df) == 21 and df["ts"].is_unique and df["ts"].is_monotonic_increasing
+    assert df.loc[df["ts"] == pd.Timestamp("2025-03-05", tz="UTC"), "close"].item() == 5.0  # later window wins
+
+    peak[0] = 0
+    fetch_windows(fetch_one, ["A"], interval="1m", windows=windows, options={}, max_workers=2)
+    assert peak[0] == 2
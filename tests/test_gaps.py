@@ -0,0 +1,87 @@
+import json
+from pathlib import Path
+from types import SimpleNamespace
+
+import pandas as pd
+
+from pimiopilot_data.fetchers import register_fetcher
+from pimiopilot_data.gaps import find_gaps, plan_repairs, scan_and_repair
+from pimiopilot_data.io.parquet_writer import write_parquet
+from pimiopilot_data.models import RangeSpec, YFOpts
+from pimiopilot_data.trading_calendar import TradingCalendar
+
+ROOT = Path(__file__).resolve().parents[1]
+CAL = TradingCalendar.load(ROOT / "calendars" / "twse.json")
+
+def _bars(symbols, interval, start, end):
+    ts = CAL.bar_slots(interval, start, end)
+    frames = [pd.DataFrame({"ts": ts, "symbol": s, "open": 10.0, "high": 11.0, "low": 9.0, "close": 10.5,
+                            "volume": 1000.0, "adj_close": 10.5}) for s in symbols]
+    return pd.concat(frames, ignore_index=True)
+
+def test_calendar_sessions_and_slots():
+    # 2025-01-27..31 is the Lunar New Year closure, 2025-01-25/26 a weekend
+    assert CAL.sessions("2025-01-22", "2025-02-05") == [pd.Timestamp(d).date() for d in
+                                                         ("2025-01-22", "2025-02-03", "2025-02-04")]
+    slots = CAL.bar_slots("1m", "2025-02-03", "2025-02-04")
+    assert len(slots) == 270
+    assert slots[0] == pd.Timestamp("2025-02-03 01:00", tz="UTC") and slots[-1] == pd.Timestamp("2025-02-03 05:29", tz="UTC")
+    # daily bars are stamped at local midnight
+    assert CAL.bar_slots("1d", "2025-02-03", "2025-02-04")[0] == pd.Timestamp("2025-02-02 16:00", tz="UTC")
+
+def test_gaps_merge_across_non_sessions():
+    full = _bars(["A"], "1d", "2025-01-02", "2025-02-08")
+    # 2025-01-22 and 2025-02-03 are consecutive sessions (weekend + Lunar New Year between)
+    local_day = full["ts"].dt.tz_convert("Asia/Taipei").dt.strftime("%Y-%m-%d")
+    stored = full[~local_day.isin(["2025-01-08", "2025-01-22", "2025-02-03"])]["ts"]
+    gaps = find_gaps(stored, symbol="A", interval="1d", start="2025-01-02", end="2025-02-08", calendar=CAL)
+    assert [(g.start.tz_convert("Asia/Taipei").date().isoformat(), g.bars) for g in gaps] == \
+        [("2025-01-08", 1), ("2025-01-22", 2)]
+    assert find_gaps(full["ts"], symbol="A", interval="1d", start="2025-01-02", end="2025-02-08", calendar=CAL) == []
+
+def test_plan_repairs_minimal_requests():
+    full = _bars(["A", "B", "C"], "5m", "2025-03-03", "2025-03-08")
+    hour = full["ts"].dt.hour
+    day = full["ts"].dt.day
+    drop = ((full["symbol"].isin(["A", "B"])) & (day == 4) & (hour == 2)) \
+        | ((full["symbol"] == "A") & (day == 4) & (hour == 4)) \
+        | ((full["symbol"] == "C") & (day == 6))
+    gaps = []
+    for sym, part in full[~drop].groupby("symbol"):
+        gaps += find_gaps(part["ts"], symbol=sym, interval="5m", start="2025-03-03", end="2025-03-08", calendar=CAL)
+    assert len(gaps) == 4  # A has two holes on the 4th
+    reqs = plan_repairs(gaps, CAL)
+    assert [(r.symbols, r.start, r.end, r.bars) for r in reqs] == [
+        (["A", "B"], "2025-03-04", "2025-03-05", 12 + 12 + 12),
+        (["C"], "2025-03-06", "2025-03-07", 54),
+    ]
+
+def test_scan_and_repair_parquet_lake(tmp_path, monkeypatch):
+    monkeypatch.setenv("PPDATA_EVENTS", f"file:{tmp_path / 'events.ndjson'}")
+    full = _bars(["2330.TW", "2317.TW"], "1d", "2025-01-02", "2025-03-01")
+    calls = []
+
+    class _Provider:
+        def fetch(self, symbols, *, interval, start, end, options):
+            calls.append((tuple(symbols), start, end))
+            local = full["ts"].dt.tz_convert("Asia/Taipei").dt.strftime("%Y-%m-%d")
+            return full[full["symbol"].isin(symbols) & (local >= start) & (local < end)]
+
+    register_fetcher("test-gaps", lambda job: _Provider())
+    meta = {"pimiopilot.schema_version": "CandleV1", "pimiopilot.interval": "1d"}
+    holes = full["ts"].dt.tz_convert("Asia/Taipei").dt.strftime("%Y-%m-%d").isin(["2025-02-10", "2025-02-11"])
+    write_parquet(full[~holes | (full["symbol"] == "2317.TW")], tmp_path / "lake" / "run-a", "data.parquet", metadata=meta)
+
+    job = SimpleNamespace(task_id="t-gaps", source="test-gaps", symbols=["2330.TW", "2317.TW"], interval="1d",
+                          range=RangeSpec(start="2025-01-02", end="2025-03-01"), yfinance_options=YFOpts(),
+                          replay_options=None)
+    summary = scan_and_repair(job, backend="parquet", lake_path=str(tmp_path / "lake"), do_repair=True,
+                              calendar=CAL, index_path=tmp_path / "gaps.json")
+    assert summary["missing_bars"] == 2 and summary["requests"] == 1
+    assert calls == [(("2330.TW",), "2025-02-10", "2025-02-12")]
+    assert summary["repaired_rows"] == 2 and summary["remaining_bars"] == 0
+    index = json.loads((tmp_path / "gaps.json").read_text(encoding="utf-8"))
+    assert index["gaps"][0]["symbol"] == "2330.TW" and index["remaining"] == []
+    # subscribers are told to recompute the filled range
+    event = json.loads((tmp_path / "events.ndjson").read_text(encoding="utf-8"))
+    assert event["repair"] is True and event["symbols"] == ["2330.TW"] and event["rows"] == 2
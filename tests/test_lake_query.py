@@ -0,0 +1,55 @@
+import json
+import pandas as pd
+
+from pimiopilot_data.lake import lake_query_to_dataframe
+from pimiopilot_data.query_runner import run_query
+
+def test_lake_filters_projects_and_dedups(tmp_path, write_run, lake_spec):
+    write_run(tmp_path / "lake" / "run-a", "1d")
+    write_run(tmp_path / "lake" / "run-b", "1d", start_close=200.0)  # newer overlapping run wins
+    write_run(tmp_path / "lake" / "run-c", "5m")
+    pd.DataFrame({"x": [1]}).to_parquet(tmp_path / "lake" / "export.parquet")  # not CandleV1, ignored
+
+    df = lake_query_to_dataframe(lake_spec(order_by=["ts DESC"], limit=2))
+    assert list(df.columns) == ["ts", "symbol", "close", "src_interval"]
+    assert df["close"].tolist() == [204.0, 203.0]
+    assert set(df["symbol"]) == {"2330.TW"} and set(df["src_interval"]) == {"1d"}
+
+def test_run_query_parquet_backend(tmp_path, write_run, lake_spec):
+    write_run(tmp_path / "lake" / "run-a", "1d")
+    summary, _ = run_query(lake_spec())
+    assert summary["status"] == "ok"
+    assert summary["artifacts"]["rows"] == 3
+    out = pd.read_csv(summary["artifacts"]["csv"])
+    assert out["close"].tolist() == [102.0, 103.0, 104.0]
+    assert json.loads(open(summary["artifacts"]["result"]).read())["query"]["backend"] == "parquet"
+
+def test_iter_lake_chunks_bounded_and_ordered(tmp_path, monkeypatch, write_run, lake_spec):
+    from pimiopilot_data import lake
+    write_run(tmp_path / "lake" / "run-a", "1d", n=30)
+    write_run(tmp_path / "lake" / "run-b", "1d", start_close=200.0, n=20)
+    reads = []
+    real = lake.pq.read_schema
+    monkeypatch.setattr(lake.pq, "read_schema", lambda p: reads.append(p) or real(p))
+    lake._DISCOVERED.clear()
+    for order in (["ts DESC", "symbol ASC"], ["symbol DESC", "ts ASC"]):
+        spec = lake_spec(symbols=["2330.TW", "2317.TW"], order_by=order, limit=45,
+                     time_range={"start": "2025-01-01T00:00:00Z", "end": "2025-02-01T00:00:00Z"})
+        chunks = list(lake.iter_lake_chunks(spec, chunksize=8))
+        assert all(len(c) <= 8 for c in chunks) and len(chunks) > 5
+        pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True), lake_query_to_dataframe(spec))
+    assert len(reads) == 2  # each file's schema read once across every call
+
+def test_iter_lake_chunks_caps_parts_and_builds_dataset_once(tmp_path, monkeypatch, write_run, lake_spec):
+    from pimiopilot_data import lake
+    write_run(tmp_path / "lake" / "run-a", "1d", n=30)
+    built, scans = [], []
+    real_dataset, real_scan = lake.ds.dataset, lake._scan_interval
+    monkeypatch.setattr(lake.ds, "dataset", lambda *a, **kw: built.append(a) or real_dataset(*a, **kw))
+    monkeypatch.setattr(lake, "_scan_interval", lambda *a: scans.append(a) or real_scan(*a))
+    monkeypatch.setattr(lake, "_MAX_PARTS", 16)
+    # chunksize 1 would mean one window per bar over ~5 years of daily slots
+    spec = lake_spec(time_range={"start": "2021-01-01T00:00:00Z", "end": "2026-01-01T00:00:00Z"})
+    chunks = list(lake.iter_lake_chunks(spec, chunksize=1))
+    assert len(built) == 1 and len(scans) <= 16
+    pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True), lake_query_to_dataframe(spec))
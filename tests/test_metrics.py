@@ -0,0 +1,110 @@
+import threading, urllib.request
+from pathlib import Path
+
+import pytest
+
+from pimiopilot_data import metrics
+from pimiopilot_data.fetchers import register_fetcher
+from pimiopilot_data.metrics import Registry, serve_metrics, symbol_set, write_textfile, write_textfile_from_env
+from pimiopilot_data.query_runner import run_query
+from pimiopilot_data.models import Job, OutputSpec, PipelineOpts, RangeSpec, RetentionSpec, YFOpts
+from pimiopilot_data.query_service import QueryService, make_server, query_socket, split_response
+from pimiopilot_data.runner import run_job
+from pimiopilot_data.synthetic import synthetic_candles
+
+ROOT = Path(__file__).resolve().parents[1]
+
+def test_exposition_format():
+    reg = Registry()
+    c = reg.counter("pp_rows_total", "Rows", ("task_id",))
+    c.inc(3, task_id='a"b')
+    c.inc(task_id='a"b')
+    assert reg.counter("pp_rows_total", "Rows", ("task_id",)) is c
+    with pytest.raises(ValueError):
+        reg.gauge("pp_rows_total", "Rows")
+    with pytest.raises(ValueError):
+        c.inc(task_id="a", extra="b")
+    h = reg.histogram("pp_seconds", "Time", buckets=(0.1, 1.0))
+    for v in (0.05, 0.5, 5.0):
+        h.observe(v)
+    reg.gauge("pp_up", "Up").set(1)
+    text = reg.render()
+    assert '# TYPE pp_rows_total counter\npp_rows_total{task_id="a\\"b"} 4\n' in text
+    assert 'pp_seconds_bucket{le="0.1"} 1\npp_seconds_bucket{le="1"} 2\npp_seconds_bucket{le="+Inf"} 3\n' in text
+    assert "pp_seconds_sum 5.55\npp_seconds_count 3\n" in text
+    assert "# TYPE pp_up gauge\npp_up 1\n" in text
+
+def test_textfile_and_http(tmp_path, monkeypatch):
+    reg = Registry()
+    reg.counter("pp_runs_total", "Runs").inc()
+    path = write_textfile(tmp_path / "prom" / "pp.prom", reg)
+    assert path.read_text(encoding="utf-8").endswith("pp_runs_total 1\n")
+    assert [p.name for p in path.parent.iterdir()] == ["pp.prom"]
+
+    monkeypatch.setenv("PPDATA_METRICS_DIR", str(tmp_path / "collector"))
+    assert write_textfile_from_env("daily/tw", reg).name == "pimiopilot_daily_tw.prom"
+
+    srv = serve_metrics(0, host="127.0.0.1", registry=reg)
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{srv.server_address[1]}/metrics") as resp:
+            assert resp.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+            assert b"pp_runs_total 1" in resp.read()
+    finally:
+        srv.shutdown()
+        srv.server_close()
+
+def test_symbol_set_is_bounded():
+    assert symbol_set(["2330.TW", "2317.TW"]) == "2317.TW,2330.TW"
+    big = symbol_set(f"{i}.TW" for i in range(50))
+    assert big.startswith("50:") and big == symbol_set(f"{i}.TW" for i in reversed(range(50)))
+
+def test_job_and_query_metrics(tmp_path, monkeypatch, write_run, lake_spec):
+    monkeypatch.setenv("PPDATA_EVENTS", "none")
+    import pimiopilot_data.runner as runner
+    bars = synthetic_candles(["2330.TW"], "1d", years=0.2, start="2025-03-03")
+    calls = []
+
+    class _Provider:
+        def fetch(self, symbols, *, interval, start, end, options):
+            calls.append(symbols)
+            if len(calls) == 1:
+                raise ConnectionError("provider hiccup")  # the first attempt fails, its retry succeeds
+            return bars
+
+    # no database here: the job's upsert and retention phases go to stand-ins
+    monkeypatch.setattr(runner, "upsert_prices", lambda df, *, interval, cfg=None: len(df))
+    monkeypatch.setattr(runner, "purge_older_than", lambda cfg, cutoff, symbols=None: 3)
+    register_fetcher("test-metrics", lambda job: _Provider())
+    job = Job(task_id="t1", source="test-metrics", symbols=["2330.TW"], interval="1d", range=RangeSpec(relative="1m"),
+              outputs=OutputSpec(out_dir=str(tmp_path / "job"), upsert_timescaledb=True), yfinance_options=YFOpts(),
+              retention=RetentionSpec(delete_older_than="5y"), pipeline=PipelineOpts(retry_backoff_seconds=0))
+    metrics.REGISTRY.clear()
+    run_job(job)
+    run_job(job)
+    labels = metrics.job_labels("t1", ["2330.TW"], "1d")
+    assert metrics.JOBS.value(status="ok", **labels) == 2
+    assert metrics.ROWS_FETCHED.value(**labels) == 2 * len(bars)
+    assert metrics.FETCH_ERRORS.value(**labels) == 1 and metrics.FETCH_RETRIES.value(**labels) == 1
+    assert metrics.PHASE_SECONDS.count(phase="fetch", **labels) == 2
+    assert metrics.JOB_ROWS_PER_SECOND.value(**labels) > 0
+    assert metrics.ROWS_UPSERTED.value(**labels) == 2 * len(bars)
+    assert metrics.ROWS_DELETED.value(**labels) == 2 * 3
+    assert metrics.PHASE_SECONDS.count(phase="retention", **labels) == 2
+
+    write_run(tmp_path / "lake" / "run-a", "1d")
+    run_query(lake_spec())
+    assert metrics.ROWS_EXPORTED.value(format="csv", backend="parquet") == 3
+    assert metrics.BYTES_EXPORTED.value(format="csv", backend="parquet") > 0
+
+    service = QueryService(ROOT / "schemas" / "query.schema.json", log_path=tmp_path / "svc.log")
+    sock = str(tmp_path / "q.sock")
+    srv = make_server(service, socket_path=sock)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    try:
+        spec = {k: v for k, v in lake_spec().items() if k != "output"}
+        body = query_socket(sock, spec, fmt="arrow")
+    finally:
+        srv.shutdown()
+        srv.server_close()
+    assert metrics.BYTES_EXPORTED.value(format="arrow", backend="parquet") == len(split_response(body)[0])
+    assert 'pimiopilot_jobs_total{task_id="t1",symbols="2330.TW",interval="1d",status="ok"} 2' in metrics.REGISTRY.render()
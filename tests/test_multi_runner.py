@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+import pandas as pd
+from datetime import datetime, timezone, timedelta
+
+from pimiopilot_strategy_runner.runner import StrategyRunner, StrategyRef
+from pimiopilot_strategy_runner.multi import MultiStrategyRunner, prepare_input
+
+def _mk_df(n=80, symbols=("2330.TW", "2317.TW", "1101.TW", "2454.TW")):
+    rng = np.random.default_rng(11)
+    ts0 = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    rows = [{"ts": (ts0 + timedelta(minutes=i)).isoformat(), "symbol": sym, "close": 100 + rng.standard_normal()}
+            for i in range(n) for sym in symbols]
+    return pd.DataFrame(rows)
+
+REFS = [
+    StrategyRef(module="pimiopilot_strategies.sma_crossover", params={"fast": 3, "slow": 8}),
+    StrategyRef(module="pimiopilot_strategies.sma_crossover", params={"fast": 5, "slow": 20}),
+]
+
+def test_prepare_input_sorts_and_splits():
+    parts = prepare_input(_mk_df().sample(frac=1, random_state=0))
+    assert [s for s, _ in parts] == sorted(["2330.TW", "2317.TW", "1101.TW", "2454.TW"])
+    _, p = parts[0]
+    assert str(p["ts"].dt.tz) == "UTC" and p["ts"].is_monotonic_increasing
+
+def test_multi_matches_single_runner(tmp_path):
+    df = _mk_df()
+    expected = [StrategyRunner(r, log_path=tmp_path / "s.log").run(df)["strategy_output"]["signals"] for r in REFS]
+    for workers in (1, 2):
+        envs = MultiStrategyRunner(REFS, log_path=tmp_path / "m.log", max_workers=workers, symbols_per_task=1).run(df)
+        assert [e["status"] for e in envs] == ["ok", "ok"]
+        assert [e["strategy_output"]["signals"] for e in envs] == expected
+        assert envs[1]["strategy_output"]["metadata"]["slow"] == 20
+        assert envs[0]["strategy_output"]["input"]["rows"] == len(df)
+
+def test_pool_reused_across_runs(tmp_path, monkeypatch):
+    from pimiopilot_strategy_runner import multi
+    started = []
+
+    class _Pool(multi.ProcessPoolExecutor):
+        def __init__(self, *a, **kw):
+            started.append(1)
+            super().__init__(*a, **kw)
+
+    monkeypatch.setattr(multi, "ProcessPoolExecutor", _Pool)
+    df = _mk_df()
+    batches = [df[df["symbol"].isin(pair)] for pair in (["2330.TW", "2317.TW"], ["1101.TW", "2454.TW"])]
+    with MultiStrategyRunner(REFS, log_path=tmp_path / "m.log", max_workers=2, symbols_per_task=1) as runner:
+        envs = list(runner.run_batches(iter(batches)))
+    assert len(started) == 1 and runner._pool is None
+    assert len(envs) == 2 * len(REFS) and all(e["status"] == "ok" for e in envs)
+
+def test_cli_rejects_online_with_strategies(monkeypatch, capsys):
+    from pimiopilot_strategy_runner import cli
+    monkeypatch.setattr("sys.argv", ["cli", "--strategies", '[{"module": "pimiopilot_strategies.sma_crossover"}]',
+                                     "--mode", "online", "--csv", "bars.csv"])
+    with pytest.raises(SystemExit) as exc:
+        cli.main()
+    assert exc.value.code == 2 and "--strategies" in capsys.readouterr().err
@@ -0,0 +1,85 @@
+import json
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from pimiopilot_data.io.ndjson_logger import NDJSONLogger
+
+SRC = Path(__file__).resolve().parents[1] / "src"
+
+def _records(path):
+    return [json.loads(l) for l in Path(path).read_text(encoding="utf-8").splitlines()]
+
+def test_buffers_until_flush_or_size(tmp_path):
+    log = NDJSONLogger(tmp_path / "a.log", flush_interval=60, max_bytes=10_000)
+    log.log("one", n=1)
+    log.log("two", n=2)
+    assert (tmp_path / "a.log").read_text(encoding="utf-8") == ""
+    log.flush()
+    assert [r["event"] for r in _records(tmp_path / "a.log")] == ["one", "two"]
+
+    small = NDJSONLogger(tmp_path / "b.log", flush_interval=60, max_bytes=200)
+    for i in range(21):
+        small.log("evt", i=i)
+    # size-triggered flushes happened without an explicit flush
+    assert 0 < len(_records(tmp_path / "b.log")) < 21
+    small.close()
+    assert [r["i"] for r in _records(tmp_path / "b.log")] == list(range(21))
+
+def test_interval_flush(tmp_path):
+    log = NDJSONLogger(tmp_path / "a.log", flush_interval=0.05)
+    log.log("tick")
+    deadline = time.monotonic() + 5
+    while not (tmp_path / "a.log").read_text(encoding="utf-8") and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert _records(tmp_path / "a.log")[0]["event"] == "tick"
+
+def test_threads_do_not_lose_or_split_lines(tmp_path):
+    log = NDJSONLogger(tmp_path / "a.log", max_bytes=512)
+
+    def work(t):
+        for i in range(500):
+            log.log("evt", t=t, i=i)
+
+    threads = [threading.Thread(target=work, args=(t,)) for t in range(8)]
+    for th in threads:
+        th.start()
+    for th in threads:
+        th.join()
+    log.close()
+    recs = _records(tmp_path / "a.log")
+    assert len(recs) == 8 * 500
+    for t in range(8):
+        assert [r["i"] for r in recs if r["t"] == t] == list(range(500))
+
+def test_nested_spans(tmp_path):
+    log = NDJSONLogger(tmp_path / "a.log")
+    with log.span("job", task_id="t1"):
+        with log.span("fetch") as sp:
+            sp["rows"] = 10
+        with pytest.raises(ValueError):
+            with log.span("upsert"):
+                raise ValueError("boom")
+    log.close()
+    spans = {r["name"]: r for r in _records(tmp_path / "a.log") if r["event"] == "span"}
+    assert spans["job"]["parent_id"] is None and spans["job"]["task_id"] == "t1"
+    assert spans["fetch"]["parent_id"] == spans["job"]["span_id"] and spans["fetch"]["path"] == "job/fetch"
+    assert spans["fetch"]["rows"] == 10
+    assert spans["upsert"]["error"] == "ValueError: boom"
+    for r in spans.values():
+        assert r["end"] >= r["start"] and r["seconds"] >= 0
+    assert spans["job"]["seconds"] >= spans["fetch"]["seconds"]
+
+def test_flushed_at_exit(tmp_path):
+    path = tmp_path / "a.log"
+    code = (
+        "from pimiopilot_data.io.ndjson_logger import NDJSONLogger\n"
+        f"log = NDJSONLogger({str(path)!r}, flush_interval=60)\n"
+        "log.log('bye')\n"
+    )
+    subprocess.run([sys.executable, "-c", code], check=True, env={"PYTHONPATH": str(SRC)})
+    assert _records(path)[0]["event"] == "bye"
@@ -1,24 +1,45 @@
 import json, os
 from pathlib import Path
-from pimiopilot_data.models import Job, RangeSpec, OutputSpec, YFOpts
+import numpy as np
+import pandas as pd
+from pimiopilot_data.models import Job, RangeSpec, OutputSpec, YFOpts, ReplayOpts
 from pimiopilot_data.runner import run_job
+from pimiopilot_data.fetchers.replay import RecordingFetcher
 
-def test_parquet_manifest_end_to_end(tmp_path):
+class _FakeYahoo:
+    """yf_client-shaped daily bars covering the last 90 days."""
+    def fetch(self, symbols, *, interval, start, end, options):
+        dates = pd.date_range(end=pd.Timestamp.today().normalize(), periods=90, freq="D")
+        frames = []
+        for sym in symbols:
+            close = 500 + np.arange(len(dates), dtype="float64")
+            frames.append(pd.DataFrame({"symbol": sym, "ts": dates, "open": close - 1, "high": close + 2,
+                                        "low": close - 2, "close": close, "volume": 1e6}))
+        return pd.concat(frames, ignore_index=True)
+
+def test_parquet_manifest_end_to_end(tmp_path, monkeypatch):
+    monkeypatch.setenv("PPDATA_EVENTS", "none")
+    cassettes = tmp_path / "cassettes"
+    RecordingFetcher(_FakeYahoo(), cassettes).fetch(["2330.TW"], interval="1d", start="2000-01-01", end=None,
+                                                    options={"auto_adjust": True})
     job = Job(
         task_id="t1",
-        source="yfinance",
+        source="replay",
         symbols=["2330.TW"],
         interval="1d",
         range=RangeSpec(relative="1m"),
         outputs=OutputSpec(out_dir=str(tmp_path), write_parquet=True, parquet_filename="data.parquet", manifest_filename="manifest.json", logs_filename="logs.ndjson"),
         yfinance_options=YFOpts(auto_adjust=True, actions=False, prepost=False, threads="auto"),
+        replay_options=ReplayOpts(dir=str(cassettes)),
     )
     res = run_job(job)
     assert Path(res["parquet"]).exists()
+    assert 25 <= res["rows"] <= 31  # one month of the recorded 90 days
     m = json.loads(Path(tmp_path/"manifest.json").read_text(encoding="utf-8"))
     assert m["schema_version"] == "CandleV1"
     assert m["artifacts"]["parquet"] == "data.parquet"
     # Determinism: run again and compare manifest hash
     res2 = run_job(job)
     m2 = json.loads(Path(tmp_path/"manifest.json").read_text(encoding="utf-8"))
-    assert m["spec_hash"] == m2["spec_hash"]
\ No newline at end of file
+    assert m["spec_hash"] == m2["spec_hash"]
+    assert pd.read_parquet(res["parquet"]).equals(pd.read_parquet(res2["parquet"]))
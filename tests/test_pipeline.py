@@ -0,0 +1,139 @@
+import json
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+from pimiopilot_data.fetchers import register_fetcher
+from pimiopilot_data.models import Job, OutputSpec, PipelineOpts, RangeSpec, YFOpts
+from pimiopilot_data.pipeline import Stage, run_pipeline
+from pimiopilot_data.runner import run_job
+from pimiopilot_data.synthetic import synthetic_candles
+
+def _sleeper(seconds):
+    def fn(x):
+        time.sleep(seconds)
+        return x
+    return fn
+
+def test_pipeline_overlaps_stages_in_order():
+    stages = [Stage("fetch", _sleeper(0.04), workers=3), Stage("check", _sleeper(0.04)),
+              Stage("write", _sleeper(0.04), ordered=True)]
+    t0 = time.perf_counter()
+    out = run_pipeline(range(12), stages, queue_depth=2)
+    elapsed = time.perf_counter() - t0
+    assert out == list(range(12))  # fetch workers finish out of order; the sink still sees input order
+    # sequential would be 12 * 3 * 0.04 = 1.44s; pipelined ~ slowest stage (12 * 0.04) plus fill
+    assert elapsed < 0.9
+
+def test_pipeline_memory_bounded_by_queue_depth():
+    lock = threading.Lock()
+    state = {"live": 0, "peak": 0}
+
+    def produced():
+        for i in range(40):
+            with lock:
+                state["live"] += 1
+                state["peak"] = max(state["peak"], state["live"])
+            yield i
+
+    def slow_sink(x):
+        time.sleep(0.005)
+        with lock:
+            state["live"] -= 1
+        return x
+
+    out = run_pipeline(produced(), [Stage("a", lambda x: x), Stage("b", slow_sink)], queue_depth=1)
+    assert sorted(out) == list(range(40))
+    # one item in each queue, one in each worker, one held by the feeder
+    assert state["peak"] <= 2 * 1 + 2 + 1
+
+def test_pipeline_error_stops_and_reraises():
+    seen = []
+
+    def boom(x):
+        if x == 3:
+            raise ValueError("bad batch")
+        return x
+
+    def sink(x):
+        seen.append(x)
+        return x
+
+    with pytest.raises(ValueError, match="bad batch"):
+        run_pipeline(range(1000), [Stage("fetch", boom), Stage("sink", sink)], queue_depth=2)
+    assert 3 not in seen and len(seen) < 10
+
+def test_run_job_batches_match_single_batch(tmp_path, monkeypatch):
+    monkeypatch.setenv("PPDATA_EVENTS", "none")
+    symbols = [f"{2300 + i}.TW" for i in range(7)]
+    bars = synthetic_candles(symbols, "1h", years=10 / 261, start="2025-03-03")
+    calls = []
+
+    class _Provider:
+        def fetch(self, symbols, *, interval, start, end, options):
+            calls.append(list(symbols))
+            return bars[bars["symbol"].isin(symbols)].reset_index(drop=True)
+
+    register_fetcher("test-pipeline", lambda job: _Provider())
+    results = {}
+    for name, opts in {"one": PipelineOpts(batch_size=50),
+                       "many": PipelineOpts(batch_size=2, queue_depth=1, fetch_workers=2)}.items():
+        job = Job(task_id=f"t-{name}", source="test-pipeline", symbols=symbols, interval="1h",
+                  range=RangeSpec(relative="2w"), outputs=OutputSpec(out_dir=str(tmp_path / name)),
+                  yfinance_options=YFOpts(), derive_intervals=["1d"], pipeline=opts)
+        results[name] = run_job(job)
+    assert calls[0] == symbols and sorted(map(len, calls[1:])) == [1, 2, 2, 2]
+
+    one, many = results["one"], results["many"]
+    assert many["rows"] == one["rows"] == len(bars)
+    assert many["quality"] == one["quality"] and many["intervals"] == one["intervals"]
+    for name in ("data.parquet", "data.1d.parquet"):
+        a = pd.read_parquet(tmp_path / "one" / name)
+        b = pd.read_parquet(tmp_path / "many" / name)
+        pd.testing.assert_frame_equal(a, b)
+
+    spans = [json.loads(line) for line in (tmp_path / "many" / "logs.ndjson").read_text(encoding="utf-8").splitlines()]
+    fetches = [r for r in spans if r["event"] == "span" and r["name"] == "fetch"]
+    assert len(fetches) == 4 and {r["path"] for r in fetches} == {"job/fetch"}
+
+def test_run_job_upserts_every_interval_and_applies_retention(tmp_path, monkeypatch):
+    monkeypatch.setenv("PPDATA_EVENTS", "none")
+    import pimiopilot_data.runner as runner
+    from pimiopilot_data.models import RetentionSpec
+    symbols = ["2330.TW", "2317.TW", "2454.TW"]
+    bars = synthetic_candles(symbols, "1h", years=10 / 261, start="2025-03-03")
+    upserts, purges = [], []
+
+    def fake_upsert(df, *, interval, cfg=None):
+        upserts.append((interval, sorted(df["symbol"].unique()), len(df)))
+        return len(df)
+
+    def fake_purge(cfg, cutoff, symbols=None):
+        purges.append((cutoff, symbols))
+        return 5
+
+    monkeypatch.setattr(runner, "upsert_prices", fake_upsert)
+    monkeypatch.setattr(runner, "purge_older_than", fake_purge)
+
+    class _Provider:
+        def fetch(self, symbols, *, interval, start, end, options):
+            return bars[bars["symbol"].isin(symbols)].reset_index(drop=True)
+
+    register_fetcher("test-pipeline-db", lambda job: _Provider())
+    job = Job(task_id="t-db", source="test-pipeline-db", symbols=symbols, interval="1h",
+              range=RangeSpec(relative="2w"), yfinance_options=YFOpts(), derive_intervals=["1d"],
+              outputs=OutputSpec(out_dir=str(tmp_path), upsert_timescaledb=True),
+              retention=RetentionSpec(delete_older_than="2020-01-01"), pipeline=PipelineOpts(batch_size=2))
+    summary = run_job(job)
+
+    # two symbol batches, each upserted for the fetched and the derived interval
+    assert sorted((iv, syms) for iv, syms, _ in upserts) == [
+        ("1d", ["2317.TW", "2330.TW"]), ("1d", ["2454.TW"]), ("1h", ["2317.TW", "2330.TW"]), ("1h", ["2454.TW"])]
+    assert purges == [("2020-01-01", symbols)]  # once, after the last batch
+    assert summary["db"]["upserted"] == len(bars) + summary["intervals"]["1d"]["rows"]
+    assert summary["db"]["deleted"] == 5
+    spans = [json.loads(line) for line in (tmp_path / "logs.ndjson").read_text(encoding="utf-8").splitlines()]
+    paths = {r["path"] for r in spans if r["event"] == "span"}
+    assert {"job/upsert", "job/retention"} <= paths
@@ -0,0 +1,138 @@
+import http.client, json, threading, urllib.error, urllib.request
+from pathlib import Path
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+from pimiopilot_data.query_service import QueryService, make_server, query_socket, split_response
+
+ROOT = Path(__file__).resolve().parents[1]
+
+def _spec(tmp_path):
+    return {
+        "symbols": ["2330.TW"],
+        "time_range": {"start": "2025-01-01T00:00:00Z", "end": "2025-01-04T00:00:00Z"},
+        "intervals": ["1d"],
+        "columns": ["ts", "symbol", "close"],
+        "backend": "parquet",
+        "lake_path": str(tmp_path / "lake"),
+    }
+
+def _start(service, **kw):
+    srv = make_server(service, **kw)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    return srv
+
+def test_unix_socket_ndjson_and_arrow(tmp_path, write_run):
+    write_run(tmp_path / "lake" / "run-a", "1d")
+    service = QueryService(ROOT / "schemas" / "query.schema.json", log_path=tmp_path / "svc.log")
+    sock = str(tmp_path / "q.sock")
+    srv = _start(service, socket_path=sock)
+    try:
+        result, status = split_response(query_socket(sock, _spec(tmp_path)))
+        assert status == {"status": "ok", "rows": 3}
+        assert [json.loads(l)["close"] for l in result.decode().splitlines()] == [100.0, 101.0, 102.0]
+
+        result, status = split_response(query_socket(sock, _spec(tmp_path), fmt="arrow"))
+        table = pa.ipc.open_stream(result).read_all()
+        assert status["status"] == "ok" and table.column_names == ["ts", "symbol", "close"] and table.num_rows == 3
+
+        assert split_response(query_socket(sock, {"symbols": []}))[1]["status"] == "error"
+    finally:
+        srv.shutdown()
+        srv.server_close()
+    assert "query_served" in (tmp_path / "svc.log").read_text(encoding="utf-8")
+
+def test_http_endpoint(tmp_path, write_run):
+    write_run(tmp_path / "lake" / "run-a", "1d")
+    service = QueryService(ROOT / "schemas" / "query.schema.json", log_path=tmp_path / "svc.log")
+    srv = _start(service, port=0)
+    try:
+        url = f"http://127.0.0.1:{srv.server_address[1]}/query"
+        req = urllib.request.Request(url, data=json.dumps(_spec(tmp_path)).encode(), method="POST")
+        with urllib.request.urlopen(req) as resp:
+            assert resp.headers["Content-Type"] == "application/x-ndjson"
+            assert len(resp.read().decode().splitlines()) == 3
+    finally:
+        srv.shutdown()
+        srv.server_close()
+
+def test_errors_before_and_after_first_byte(tmp_path, monkeypatch):
+    service = QueryService(ROOT / "schemas" / "query.schema.json", log_path=tmp_path / "svc.log")
+    fail_after = {"n": 0}
+
+    def frames(spec):
+        for _ in range(fail_after["n"]):
+            yield pd.DataFrame({"ts": ["2025-01-01T00:00:00Z"], "symbol": ["2330.TW"], "close": [1.0]})
+        raise RuntimeError("disk gone")
+
+    monkeypatch.setattr(service, "iter_frames", frames)
+    http_srv = _start(service, port=0)
+    sock = str(tmp_path / "q.sock")
+    unix_srv = _start(service, socket_path=sock)
+    url = f"http://127.0.0.1:{http_srv.server_address[1]}/query"
+    body = json.dumps(_spec(tmp_path)).encode()
+    try:
+        # nothing sent yet: a proper error status and JSON body
+        with pytest.raises(urllib.error.HTTPError) as err:
+            urllib.request.urlopen(urllib.request.Request(url, data=body, method="POST"))
+        assert err.value.code == 500 and json.loads(err.value.read())["error"] == "disk gone"
+        assert split_response(query_socket(sock, _spec(tmp_path))) == (b"", {"status": "error", "error": "disk gone"})
+
+        # rows already sent: no error line mixed into the data, and the failure is visible
+        fail_after["n"] = 2
+        with urllib.request.urlopen(urllib.request.Request(url, data=body, method="POST")) as resp:
+            assert resp.status == 200
+            with pytest.raises(http.client.IncompleteRead):
+                resp.read()
+        # the unix socket ends every response with a status line, so a failed stream is never taken as complete
+        result, status = split_response(query_socket(sock, _spec(tmp_path)))
+        lines = result.decode().splitlines()
+        assert status == {"status": "error", "error": "disk gone"}
+        assert len(lines) == 2 and all(json.loads(l)["symbol"] == "2330.TW" for l in lines)
+        result, status = split_response(query_socket(sock, _spec(tmp_path), fmt="arrow"))
+        assert status["status"] == "error" and pa.ipc.open_stream(result).read_all().num_rows == 2
+        with pytest.raises(ValueError, match="truncated"):
+            split_response(result)  # cut off before the status line
+    finally:
+        for srv in (http_srv, unix_srv):
+            srv.shutdown()
+            srv.server_close()
+
+def test_timescaledb_stream_uses_server_side_cursor(tmp_path, monkeypatch):
+    from contextlib import contextmanager
+    service = QueryService(ROOT / "schemas" / "query.schema.json", log_path=tmp_path / "svc.log", chunk_rows=2)
+    opened = []
+
+    class _Cursor:
+        description = [("symbol",), ("close",)]
+
+        def __init__(self):
+            self.chunks = [[("2330.TW", 1.0), ("2330.TW", 2.0)], [("2330.TW", 3.0)], []]
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            pass
+
+        def execute(self, sql, params):
+            pass
+
+        def fetchmany(self, n):
+            assert n == self.itersize == 2
+            return self.chunks.pop(0)
+
+    class _Conn:
+        def cursor(self, name=None):
+            opened.append(name)
+            return _Cursor()
+
+    @contextmanager
+    def connection():
+        yield _Conn()
+
+    monkeypatch.setattr(service, "connection", connection)
+    spec = {**_spec(tmp_path), "backend": "timescaledb", "columns": ["symbol", "close"]}
+    frames = list(service.iter_frames(spec))
+    assert opened[0] and [len(f) for f in frames] == [2, 1]
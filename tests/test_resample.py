@@ -0,0 +1,67 @@
+import json
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from pimiopilot_data.fetchers import register_fetcher
+from pimiopilot_data.lake import lake_query_to_dataframe
+from pimiopilot_data.models import Job, OutputSpec, RangeSpec, YFOpts
+from pimiopilot_data.resample import check_derivable, resample_candles
+from pimiopilot_data.runner import run_job
+from pimiopilot_data.synthetic import synthetic_candles
+
+def test_resample_ohlcv_session_aligned():
+    df = synthetic_candles(["A", "B"], "5m", years=3 / 261, start="2025-03-03")
+    h = resample_candles(df, "1h")
+    # 09:00-13:30 Taipei: 09, 10, 11, 12 full hours and a half hour at 13:00
+    assert len(h) == 2 * 3 * 5
+    first = df[(df["symbol"] == "A")].iloc[:12]
+    bar = h.iloc[0]
+    assert bar["ts"] == pd.Timestamp("2025-03-03 01:00", tz="UTC") and bar["symbol"] == "A"
+    assert bar["open"] == first["open"].iloc[0] and bar["close"] == first["close"].iloc[-1]
+    assert bar["high"] == first["high"].max() and bar["low"] == first["low"].min()
+    assert bar["volume"] == first["volume"].sum()
+    assert (h.groupby(["symbol", h["ts"].dt.date]).size() == 5).all()
+
+    d = resample_candles(df, "1d")
+    assert list(d["ts"].unique()) == list(pd.DatetimeIndex(["2025-03-02 16:00", "2025-03-03 16:00", "2025-03-04 16:00"], tz="UTC"))
+    assert d["volume"].sum() == df["volume"].sum()
+    assert list(d.columns) == list(df.columns)
+
+def test_check_derivable():
+    assert check_derivable("5m", ["15m", "5m", "1h", "1d", "15m"]) == ["15m", "1h", "1d"]
+    with pytest.raises(ValueError):
+        check_derivable("15m", ["5m"])
+    with pytest.raises(ValueError):
+        check_derivable("30m", ["1h", "15m"])
+    with pytest.raises(ValueError):
+        check_derivable("1d", ["1d", "1h"])
+
+def test_run_job_fetches_once_and_derives(tmp_path, monkeypatch):
+    monkeypatch.setenv("PPDATA_EVENTS", "none")
+    bars = synthetic_candles(["2330.TW", "2317.TW"], "5m", years=10 / 261, start="2025-03-03")
+    calls = []
+
+    class _Provider:
+        def fetch(self, symbols, *, interval, start, end, options):
+            calls.append(interval)
+            return bars[bars["symbol"].isin(symbols)].reset_index(drop=True)
+
+    register_fetcher("test-derive", lambda job: _Provider())
+    job = Job(task_id="t-derive", source="test-derive", symbols=["2330.TW", "2317.TW"], interval="5m",
+              range=RangeSpec(relative="2w"), outputs=OutputSpec(out_dir=str(tmp_path / "run")),
+              yfinance_options=YFOpts(), derive_intervals=["15m", "1h", "1d"])
+    res = run_job(job)
+    assert calls == ["5m"]
+    m = json.loads((tmp_path / "run" / "manifest.json").read_text(encoding="utf-8"))
+    assert m["intervals"]["5m"] == {"derived_from": None, "rows": len(bars), "parquet": "data.parquet"}
+    assert m["intervals"]["1h"]["derived_from"] == "5m" and m["intervals"]["1h"]["parquet"] == "data.1h.parquet"
+    assert m["intervals"]["1d"]["rows"] == 2 * 10
+    assert set(res["intervals"]) == {"5m", "15m", "1h", "1d"}
+
+    # the lake serves every interval, each tagged with its own src_interval
+    spec = {"symbols": ["2330.TW"], "intervals": ["5m", "15m", "1h", "1d"], "columns": ["ts", "symbol", "src_interval"],
+            "time_range": {"start": "2025-03-01T00:00:00Z", "end": "2025-03-20T00:00:00Z"}}
+    counts = lake_query_to_dataframe(spec, root=tmp_path).groupby("src_interval").size().to_dict()
+    assert counts == {"5m": 540, "15m": 180, "1h": 50, "1d": 10}
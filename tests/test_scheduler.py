@@ -0,0 +1,47 @@
+import threading
+from datetime import datetime
+from pathlib import Path
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from pimiopilot_data.scheduler import CronSchedule, Scheduler
+
+ROOT = Path(__file__).resolve().parents[1]
+TPE = ZoneInfo("Asia/Taipei")
+
+def test_cron_fields():
+    s = CronSchedule("10 17 * * 1-5")
+    assert s.matches(datetime(2025, 1, 6, 17, 10, tzinfo=TPE))       # Monday
+    assert not s.matches(datetime(2025, 1, 5, 17, 10, tzinfo=TPE))   # Sunday
+    assert s.next_after(datetime(2025, 1, 3, 17, 10, tzinfo=TPE)) == datetime(2025, 1, 6, 17, 10, tzinfo=TPE)
+    assert CronSchedule("*/15 9-13 * * *").next_after(datetime(2025, 1, 6, 13, 50, tzinfo=TPE)).hour == 9
+    assert CronSchedule("0 0 * * 7").matches(datetime(2025, 1, 5, 0, 0, tzinfo=TPE))  # 7 is Sunday too
+    # day-of-month OR day-of-week when both are restricted
+    both = CronSchedule("0 0 1 * 1")
+    assert both.matches(datetime(2025, 1, 1, tzinfo=TPE)) and both.matches(datetime(2025, 1, 6, tzinfo=TPE))
+    with pytest.raises(ValueError):
+        CronSchedule("61 * * * *")
+
+def test_overlapping_runs_are_skipped(tmp_path):
+    job = (ROOT / "examples" / "job.yaml").read_text(encoding="utf-8")
+    (tmp_path / "job.yaml").write_text(job, encoding="utf-8")
+    (tmp_path / "schedule.yaml").write_text(
+        "jobs:\n  - config: job.yaml\n    schedule: '* * * * *'\n", encoding="utf-8")
+
+    release = threading.Event()
+    seen = []
+    def run(cfg):
+        seen.append(cfg["task_id"])
+        release.wait(5)
+
+    s = Scheduler(tmp_path / "schedule.yaml", job_schema=ROOT / "schemas" / "job.schema.json",
+                  schedule_schema=ROOT / "schemas" / "schedule.schema.json", log_path=tmp_path / "s.log", run=run)
+    t = datetime(2025, 1, 6, 9, 0, tzinfo=TPE)
+    assert s.tick(t) == ["demo-001"]
+    assert s.tick(t.replace(minute=1)) == []  # still running
+    release.set()
+    s.jobs[0].running.result(timeout=5)
+    assert s.tick(t.replace(minute=2)) == ["demo-001"]
+    s.stop()
+    assert seen == ["demo-001", "demo-001"] and s.jobs[0].skipped == 1
@@ -0,0 +1,79 @@
+import json
+from pathlib import Path
+
+import pandas as pd
+import pytest
+from jsonschema import Draft202012Validator
+
+from pimiopilot_data.queries import build_sql
+from pimiopilot_data.sinks import signals as sink
+
+def _output():
+    return {"schema_version": "1.0", "signals": [
+        {"ts": "2025-01-02T00:00:00+00:00", "symbol": "2330.TW", "action": "BUY"},
+        {"ts": "2025-01-03T00:00:00+00:00", "symbol": "2330.TW", "action": "SELL"},
+        {"ts": "2025-01-03T00:00:00+00:00", "symbol": "2330.TW", "action": "HOLD"},  # duplicate key, last wins
+        {"ts": "2025-01-03T08:00:00+08:00", "symbol": "2317.TW", "target_weight": 0.5, "extras": {"k": 1}},
+    ]}
+
+def test_params_hash_is_canonical():
+    assert sink.params_hash({"fast": 5, "slow": 20}) == sink.params_hash({"slow": 20, "fast": 5})
+    assert sink.params_hash({"fast": 5}) != sink.params_hash({"fast": 6})
+
+def test_signals_frame_rows():
+    df = sink.signals_frame(_output(), strategy="sma", params={"fast": 5})
+    assert list(df.columns) == sink._COLS
+    assert len(df) == 3
+    assert df["action"].tolist()[:2] == ["BUY", "HOLD"]
+    assert (df["ts"].iloc[2] == pd.Timestamp("2025-01-03T00:00:00Z"))
+    assert df["extras"].iloc[2] == '{"k": 1}' and df["params"].iloc[0] == '{"fast": 5}'
+
+class _Cursor:
+    def __init__(self, log):
+        self.log = log
+    def __enter__(self):
+        return self
+    def __exit__(self, *exc):
+        return False
+    def execute(self, sql, params=None):
+        self.log.append(("execute", " ".join(sql.split())))
+    def copy_expert(self, sql, f):
+        self.log.append(("copy", sql, f.read()))
+
+class _Conn(_Cursor):
+    def cursor(self):
+        return _Cursor(self.log)
+
+def test_upsert_streams_copy_then_merges(monkeypatch):
+    log = []
+    monkeypatch.setattr(sink, "_connect", lambda cfg: _Conn(log))
+    n = sink.upsert_signals(_output(), strategy="sma", params={"fast": 5}, cfg=sink.TSConfig())
+    assert n == 3
+    kinds = [entry[0] for entry in log]
+    assert kinds == ["execute", "copy", "execute"]
+    lines = log[1][2].splitlines()
+    assert len(lines) == 3 and lines[0].startswith(f"sma,{sink.params_hash({'fast': 5})},2330.TW,2025-01-02 00:00:00.000000+00,BUY")
+    assert "ON CONFLICT (strategy, params_hash, symbol, ts) DO UPDATE" in log[2][1]
+
+def test_query_spec_reads_signals():
+    spec = {"dataset": "signals", "strategy": "sma", "symbols": ["2330.TW"], "columns": ["symbol", "ts", "action"],
+            "time_range": {"start": "2025-01-01T00:00:00Z", "end": "2025-02-01T00:00:00Z"}}
+    sql, params = build_sql(spec)
+    assert "FROM strategy_signals" in sql and params == ["sma", ["2330.TW"], "2025-01-01T00:00:00Z", "2025-02-01T00:00:00Z"]
+
+    sql, params = build_sql({**spec, "latest": True, "params_hash": "abc"})
+    assert "CROSS JOIN LATERAL" in sql and "LIMIT 1" in sql
+    assert params == [["2330.TW"], "sma", "abc"]
+
+def test_latest_signals_require_params_hash():
+    spec = {"dataset": "signals", "strategy": "sma", "symbols": ["2330.TW"], "latest": True}
+    with pytest.raises(ValueError, match="params_hash"):
+        build_sql(spec)
+
+    schema = json.loads(Path("schemas/query.schema.json").read_text(encoding="utf-8"))
+    base = {**spec, "time_range": {"start": "2025-01-01T00:00:00Z", "end": "2025-02-01T00:00:00Z"},
+            "intervals": ["1d"], "columns": ["symbol", "ts", "action"], "output": {"format": "csv", "path": "out"}}
+    validator = Draft202012Validator(schema)
+    assert any("params_hash" in e.message for e in validator.iter_errors(base))
+    assert not list(validator.iter_errors({**base, "params_hash": "abc"}))
+    assert not list(validator.iter_errors({**base, "latest": False}))
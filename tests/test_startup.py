@@ -0,0 +1,42 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+# Cumulative import-time budget per entry point (microseconds) and modules it must not pull in.
+# Entry points only parse arguments at import; subcommands import their own dependencies.
+BUDGETS = {
+    "pimiopilot_data.cli": (150_000, ["pandas", "yfinance", "pyarrow", "psycopg2", "jsonschema"]),
+    "pimiopilot_strategy_runner.cli": (150_000, ["pandas", "pyarrow", "yfinance", "psycopg2"]),
+    "pimiopilot_strategy_runner.runner": (150_000, ["pandas", "yfinance", "psycopg2"]),
+    "pimiopilot_data.query_runner": (None, ["yfinance", "psycopg2", "jsonschema"]),
+}
+
+def _import_profile(module):
+    """Per-module cumulative import time (us) from `python -X importtime`, in a fresh interpreter."""
+    env = {**os.environ, "PYTHONPATH": str(ROOT / "src")}
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                          capture_output=True, text=True, env=env, cwd=ROOT, check=True)
+    times = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+def test_entry_point_import_budgets():
+    failures = []
+    for module, (budget, forbidden) in BUDGETS.items():
+        times = _import_profile(module)
+        loaded = [m for m in forbidden if m in times]
+        if loaded:
+            failures.append(f"{module} imports {loaded}")
+        total = times[module]
+        if budget is not None and total > budget:
+            top = sorted(((t, m) for m, t in times.items() if m != module), reverse=True)[:8]
+            breakdown = ", ".join(f"{m}={t / 1000:.1f}ms" for t, m in top)
+            failures.append(f"{module}: {total / 1000:.1f}ms > {budget / 1000:.0f}ms budget ({breakdown})")
+    assert not failures, "\n".join(failures)
@@ -55,3 +55,35 @@ def test_deterministic():
     out2.pop("generated_at", None)
 
     assert out1 == out2
+
+def test_frame_format_matches_records():
+    mod = import_module("pimiopilot_strategies.sma_crossover")
+    df = _mk_df()
+    records = mod.build_strategy({"fast": 5, "slow": 10}).generate_signal(df)["signals"]
+    frame = mod.build_strategy({"fast": 5, "slow": 10, "signals_format": "frame"}).generate_signal(df)["signals"]
+    assert isinstance(frame, pd.DataFrame)
+    assert frame.to_dict(orient="records") == records
+    assert records[0]["ts"] == "2025-01-01T00:00:00+00:00"
+
+def test_events_mode_keeps_transitions_and_last_state():
+    import json
+    from jsonschema import Draft202012Validator
+    mod = import_module("pimiopilot_strategies.sma_crossover")
+    df = _mk_df()
+    full = mod.build_strategy({"fast": 5, "slow": 10}).generate_signal(df)["signals"]
+    out = mod.build_strategy({"fast": 5, "slow": 10, "signals_mode": "events"}).generate_signal(df)
+    schema = json.loads((ROOT / "schemas" / "strategy.output.schema.json").read_text(encoding="utf-8"))
+    Draft202012Validator(schema).validate({k: v for k, v in out.items() if v is not None})  # as_of is optional
+    events = out["signals"]
+    assert out["metadata"]["signals_mode"] == "events"
+    assert len(events) < len(full)
+
+    # forward-filling the events per symbol reproduces every bar's action
+    state, expanded = {}, []
+    by_key = {(e["symbol"], e["ts"]): e["action"] for e in events}
+    for s in full:
+        state[s["symbol"]] = by_key.get((s["symbol"], s["ts"]), state.get(s["symbol"]))
+        expanded.append(state[s["symbol"]])
+    assert expanded == [s["action"] for s in full]
+    last = {s["symbol"]: s["ts"] for s in full}
+    assert all((sym, ts) in by_key for sym, ts in last.items())
@@ -39,3 +39,58 @@ def test_runner_batch_and_online(tmp_path):
     # check log exists and non-empty
     text = log_path.read_text(encoding="utf-8")
     assert "runner_init" in text and "run_start" in text and "run_end" in text
+
+def test_online_incremental_matches_batch(tmp_path):
+    import json
+    from pimiopilot_strategy_runner.runner import StrategyRunner, StrategyRef
+
+    ref = StrategyRef(module="pimiopilot_strategies.sma_crossover", params={"fast": 3, "slow": 8})
+    df = _mk_df(60)
+    batch = StrategyRunner(ref, log_path=tmp_path / "b.log").run(df, mode="batch")["strategy_output"]["signals"]
+
+    r = StrategyRunner(ref, log_path=tmp_path / "o.log")
+    online = []
+    for start in range(0, 30, 10):
+        online += r.run(df.iloc[start:start + 10], mode="online")["strategy_output"]["signals"]
+    # resume from a snapshot in a fresh runner, re-polling the last bar (ignored)
+    state = json.loads(json.dumps(r.snapshot_state()))
+    r2 = StrategyRunner(ref, log_path=tmp_path / "o2.log")
+    r2.restore_state(state)
+    online += r2.run(df.iloc[29:], mode="online")["strategy_output"]["signals"]
+
+    assert online == batch
+
+def test_online_events_match_batch(tmp_path):
+    from pimiopilot_strategy_runner.runner import StrategyRunner, StrategyRef
+
+    ref = StrategyRef(module="pimiopilot_strategies.sma_crossover", params={"fast": 3, "slow": 8, "signals_mode": "events"})
+    df = pd.concat([_mk_df(60).assign(symbol="A"), _mk_df(60).assign(symbol="B", close=lambda d: -d["close"])],
+                   ignore_index=True)
+    pos = df.index % 60
+    r = StrategyRunner(ref, log_path=tmp_path / "o.log")
+    seen = 0
+    for lo, hi in [(0, 10), (9, 25), (25, 26), (26, 60)]:  # (9, 25) re-polls a bar
+        online = r.run(df[(pos >= lo) & (pos < hi)], mode="online")["strategy_output"]["signals"]
+        batch = StrategyRunner(ref, log_path=tmp_path / "b.log").run(df[pos < hi], mode="batch")["strategy_output"]["signals"]
+        new = {pd.Timestamp(t) for t in df["ts"][(pos >= seen) & (pos < hi)]}
+        # online output == the batch run over the history so far, restricted to the new bars
+        assert online == [x for x in batch if pd.Timestamp(x["ts"]) in new]
+        assert {x["symbol"] for x in online} == {"A", "B"}  # each symbol reports its current state
+        seen = hi
+
+def test_ndjson_signal_writer(tmp_path):
+    import json
+    from pimiopilot_strategies.sma_crossover import build_strategy
+    from pimiopilot_strategy_runner.writer import NDJSONSignalWriter
+
+    df = _mk_df(60)
+    records = build_strategy({"fast": 5, "slow": 10, "signals_mode": "events"}).generate_signal(df)
+    frame = build_strategy({"fast": 5, "slow": 10, "signals_mode": "events", "signals_format": "frame"}).generate_signal(df)
+    path = tmp_path / "signals.ndjson"
+    with NDJSONSignalWriter(path) as w:
+        w.write(records)
+        w.write(frame, extras={"strategy": "sma"})
+    lines = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+    n = len(records["signals"])
+    assert w.rows == 2 * n and lines[:n] == records["signals"]
+    assert lines[n:] == [{**s, "extras": {"strategy": "sma"}} for s in records["signals"]]
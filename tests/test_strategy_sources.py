@@ -0,0 +1,89 @@
+import json
+
+import numpy as np
+import pandas as pd
+from datetime import datetime, timezone, timedelta
+
+from pimiopilot_data.io.parquet_writer import write_parquet
+from pimiopilot_strategy_runner.runner import StrategyRunner, StrategyRef
+from pimiopilot_strategy_runner.sources import iter_parquet_batches, iter_query_batches
+
+SYMBOLS = ("2330.TW", "2317.TW", "1101.TW")
+
+def _bars(n=80):
+    rng = np.random.default_rng(11)
+    ts0 = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    frames = [pd.DataFrame({
+        "ts": [ts0 + timedelta(days=i) for i in range(n)],
+        "symbol": sym,
+        "open": 0.0, "high": 0.0, "low": 0.0,
+        "close": 100 + rng.standard_normal(n).cumsum(),
+        "volume": 1000.0,
+    }) for sym in SYMBOLS]
+    return pd.concat(frames).sample(frac=1, random_state=2).reset_index(drop=True)
+
+def _signals(envelopes):
+    return [s for env in envelopes for s in env["strategy_output"]["signals"]]
+
+def test_parquet_stream_matches_in_memory_run(tmp_path):
+    df = _bars()
+    df.to_parquet(tmp_path / "bars.parquet", index=False)
+    ref = StrategyRef(module="pimiopilot_strategies.sma_crossover", params={"fast": 5, "slow": 20})
+    runner = StrategyRunner(ref, log_path=tmp_path / "runner.log")
+
+    batches = list(iter_parquet_batches(tmp_path / "bars.parquet", symbols_per_batch=2))
+    assert [sorted(b["symbol"].unique()) for b in batches] == [["1101.TW", "2317.TW"], ["2330.TW"]]
+
+    streamed = _signals(runner.run_batches(iter_parquet_batches(tmp_path / "bars.parquet")))
+    assert streamed == runner.run(df)["strategy_output"]["signals"]
+
+    only = list(iter_parquet_batches(tmp_path / "bars.parquet", symbols=["2317.TW"], columns=["close"]))
+    assert len(only) == 1 and set(only[0].columns) == {"close", "symbol", "ts"}
+
+def test_query_spec_stream_from_lake(tmp_path):
+    df = _bars()
+    meta = {"pimiopilot.schema_version": "CandleV1", "pimiopilot.interval": "1d"}
+    write_parquet(df, tmp_path / "lake" / "run-a", "data.parquet", metadata=meta)
+    spec = {
+        "symbols": list(SYMBOLS),
+        "time_range": {"start": "2025-01-01T00:00:00Z", "end": "2026-01-01T00:00:00Z"},
+        "intervals": ["1d"],
+        "columns": ["ts", "symbol", "close"],
+        "backend": "parquet",
+        "lake_path": str(tmp_path / "lake"),
+        "limit": 5,
+    }
+    batches = list(iter_query_batches(spec))
+    assert [b["symbol"].unique().tolist() for b in batches] == [[s] for s in SYMBOLS]
+    assert sum(len(b) for b in batches) == len(df)  # limit is not applied per batch
+    assert all(b["ts"].is_monotonic_increasing for b in batches)
+
+def test_load_frame_formats_are_typed_and_projected(tmp_path):
+    from pimiopilot_data.io.arrow_ipc import write_arrow_ipc
+    from pimiopilot_strategy_runner.sources import load_frame
+
+    df = _bars(30)
+    csv_df = df.assign(ts=df["ts"].map(lambda t: t.isoformat()))
+    csv_df.to_csv(tmp_path / "bars.csv", index=False)
+    df.to_parquet(tmp_path / "bars.parquet", index=False)
+    write_arrow_ipc([df], tmp_path / "bars.arrow")
+
+    frames = [load_frame(tmp_path / name, columns=["close"]) for name in ("bars.csv", "bars.parquet", "bars.arrow")]
+    for f in frames:
+        assert list(f.columns) == ["ts", "symbol", "close"]
+        assert str(f["ts"].dtype) == "datetime64[ns, UTC]" and f["close"].dtype == "float64"
+        pd.testing.assert_frame_equal(f, frames[0])
+
+    ref = StrategyRef(module="pimiopilot_strategies.sma_crossover", params={"fast": 3, "slow": 8})
+    runner = StrategyRunner(ref, log_path=tmp_path / "runner.log")
+    assert runner.run(frames[0])["strategy_output"]["signals"] == runner.run(pd.read_csv(tmp_path / "bars.csv"))["strategy_output"]["signals"]
+
+def test_cli_csv_flag_ignores_suffix(tmp_path, monkeypatch, capsys):
+    from pimiopilot_strategy_runner import cli
+    df = _bars(30)
+    df.assign(ts=df["ts"].map(lambda t: t.isoformat())).to_csv(tmp_path / "prices.txt", index=False)
+    monkeypatch.setattr("sys.argv", ["cli", "--module", "pimiopilot_strategies.sma_crossover", "--params",
+                                     '{"fast": 3, "slow": 8}', "--csv", str(tmp_path / "prices.txt"),
+                                     "--log", str(tmp_path / "runner.log")])
+    cli.main()
+    assert json.loads(capsys.readouterr().out)["strategy_output"]["signals"]
@@ -0,0 +1,74 @@
+import sys
+import types
+
+import numpy as np
+import pytest
+import pandas as pd
+from datetime import datetime, timezone, timedelta
+
+from pimiopilot_strategies import sma_crossover
+from pimiopilot_strategy_runner.sweep import sweep, expand_grid, _ACTION_POS
+
+def _mk_df(n=300, symbols=("2330.TW", "2317.TW", "1101.TW")):
+    rng = np.random.default_rng(7)
+    ts0 = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    frames = [pd.DataFrame({
+        "ts": [ts0 + timedelta(days=i) for i in range(n)],
+        "symbol": sym,
+        "close": 100 + rng.standard_normal(n).cumsum(),
+    }) for sym in symbols]
+    return pd.concat(frames).sample(frac=1, random_state=0).reset_index(drop=True)
+
+def test_expand_grid():
+    combos = expand_grid({"fast": [2, 3], "slow": [10]}, base={"x": 1})
+    assert combos == [{"x": 1, "fast": 2, "slow": 10}, {"x": 1, "fast": 3, "slow": 10}]
+
+def test_sweep_positions_match_generate_signal():
+    df = _mk_df()
+    prepared = sma_crossover.sweep_prepare(df)
+    for fast, slow in [(2, 5), (5, 20), (10, 60)]:
+        frame = sma_crossover.build_strategy({"fast": fast, "slow": slow}).generate_signal(df, signals_format="frame")["signals"]
+        expected = frame["action"].map(_ACTION_POS).to_numpy()
+        assert (sma_crossover.sweep_positions(prepared, {"fast": fast, "slow": slow}) == expected).all()
+
+def test_sweep_positions_match_with_nan_and_ties():
+    df = _mk_df(n=200)
+    order = df.sort_values(["symbol", "ts"]).index
+    close = df["close"].to_numpy().copy()
+    close[order[[50, 51, 230]]] = np.nan                         # NaN closes are skipped by the rolling mean
+    close[order[400:440]] = close[order[399]]                    # a flat run: both means tie exactly
+    close[order[500:560]] = 1e6 + np.tile([0.0, 1e-7], 30)       # tiny crossovers on a large price level
+    df["close"] = close
+    prepared = sma_crossover.sweep_prepare(df)
+    for fast, slow in [(2, 5), (3, 7), (5, 20), (10, 60)]:
+        frame = sma_crossover.build_strategy({"fast": fast, "slow": slow}).generate_signal(df, signals_format="frame")["signals"]
+        expected = frame["action"].map(_ACTION_POS).to_numpy()
+        assert (sma_crossover.sweep_positions(prepared, {"fast": fast, "slow": slow}) == expected).all()
+
+def test_sweep_pool_matches_serial(tmp_path):
+    df = _mk_df()
+    grid = {"fast": [2, 5, 10, 40], "slow": [5, 20, 40]}
+    serial = sweep("pimiopilot_strategies.sma_crossover", df, grid, max_workers=1, log_path=tmp_path / "s.log")
+    pooled = sweep("pimiopilot_strategies.sma_crossover", df, grid, max_workers=2, batch_size=2, log_path=tmp_path / "p.log")
+    assert len(serial) == 7  # fast >= slow combinations are skipped
+    assert list(serial.columns[:2]) == ["fast", "slow"]
+    pd.testing.assert_frame_equal(serial, pooled)
+    assert (serial["bars"] == len(df)).all()
+
+def test_sweep_data_errors_propagate(tmp_path, monkeypatch):
+    class _Strategy:
+        def __init__(self, window):
+            if window <= 0:
+                raise ValueError("invalid window")
+
+        def generate_signal(self, data):
+            raise ValueError("non-numeric close")
+
+    mod = types.ModuleType("pp_test_bad_data")
+    mod.build_strategy = lambda params: _Strategy(params["window"])
+    monkeypatch.setitem(sys.modules, mod.__name__, mod)
+    # invalid parameters are skipped...
+    assert sweep(mod.__name__, _mk_df(n=20), {"window": [0]}, max_workers=1, log_path=tmp_path / "s.log").empty
+    # ...but an error from the data is not swallowed into an empty table
+    with pytest.raises(ValueError, match="non-numeric close"):
+        sweep(mod.__name__, _mk_df(n=20), {"window": [0, 3]}, max_workers=1, log_path=tmp_path / "s.log")